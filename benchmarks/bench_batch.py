@@ -0,0 +1,85 @@
+"""Batch mode: throughput in audio seconds per wall second as the number of workers grows, and resuming.
+
+Converts corpus clips (recordings/*.pcm) with BatchConverter against the
+mock API, into a fresh temporary folder per worker count. Then deletes
+one output and runs again over the same manifest to check that only that
+file is converted a second time.
+
+Usage: python benchmarks/bench_batch.py [--workers 1 2 4 8] [--clips 0] [--ttfb-ms 300] [--pace 4]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+
+def converter(server, workers: int, output_dir: str):
+    from src.batch import BatchConverter
+    from src.el_client import ElevenLabsClient
+    from src.settings.batch import BatchSettings
+    from src.settings.network import NetworkSettings
+    network = NetworkSettings(pool_size=2 * workers, preconnect=0, keepalive_interval=0, passthrough=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = ElevenLabsClient("mock", "mock", base_url=server.url, network=network, playback=False)
+        client.client  # Finish loading the SDK outside the timing
+    return BatchConverter(client, BatchSettings(workers=workers, output_dir=output_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--clips", type=int, default=0, help="Clips to convert (0 = all)")
+    parser.add_argument("--ttfb-ms", type=float, default=300.0, help="Mock server processing time")
+    parser.add_argument("--pace", type=float, default=4.0, help="Mock audio seconds per wall second")
+    args = parser.parse_args()
+
+    inputs = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))
+    inputs = inputs[:args.clips] if args.clips else inputs
+    if not inputs:
+        print("No clips found")
+        return 1
+    server = MockServer(MockConfig(ttfb_ms=args.ttfb_ms, pace=args.pace, seed=1)).start()
+    scratch = tempfile.mkdtemp(prefix="bench-batch-")
+
+    print(f"{len(inputs)} clips, mock TTFB {args.ttfb_ms:.0f}ms, pace {args.pace:g}x\n")
+    print(f"{'workers':>7} {'done':>5} {'failed':>6} {'audio':>7} {'wall':>6} {'audio s / wall s':>16}")
+    failed = 0
+    try:
+        for workers in args.workers:
+            batch = converter(server, workers, os.path.join(scratch, f"w{workers}"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                totals = batch.run(inputs)
+            batch.close()
+            failed += totals["failed"]
+            print(f"{workers:>7} {totals['done']:>5} {totals['failed']:>6} {totals['audio_seconds']:>6.1f}s "
+                  f"{totals['seconds']:>5.1f}s {totals['throughput']:>16.2f}")
+
+        # Resume: only the missing output is converted again
+        output_dir = os.path.join(scratch, f"w{args.workers[-1]}")
+        outputs = sorted(glob.glob(os.path.join(output_dir, "**", "*.wav"), recursive=True))
+        os.remove(outputs[0])
+        batch = converter(server, args.workers[-1], output_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            totals = batch.run(inputs)
+        batch.close()
+        resumed = totals["done"] == 1 and totals["skipped"] == len(inputs) - 1
+        print(f"\nresume after deleting one output: {totals['done']} converted, {totals['skipped']} skipped "
+              f"({'ok' if resumed else 'FAILED'})")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        server.stop()
+    return 0 if resumed and not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
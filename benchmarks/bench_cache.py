@@ -0,0 +1,114 @@
+"""Converted-audio cache: miss vs hit time to first byte, key normalization and LRU eviction.
+
+Writes a small phrase set from recordings/*.pcm as WAV files, pre-renders it
+against the mock API into a temporary cache, then converts each phrase again,
+plus a stereo copy with extra silence around it, which should hit the same
+entry. Finally it pre-renders into a cache that only fits half of the
+set to show eviction.
+
+Usage: python benchmarks/bench_cache.py [--phrases 8] [--ttfb-ms 300]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+API_RATE = 22050
+
+
+def write_phrases(directory: str, count: int):
+    """WAV files from the corpus, plus a padded stereo copy of each."""
+    from src.audio_processor import wav_header
+    originals, variants = [], []
+    for i, path in enumerate(sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))[:count]):
+        pcm = open(path, "rb").read()
+        name = os.path.join(directory, f"phrase_{i:02d}.wav")
+        with open(name, "wb") as f:
+            f.write(wav_header(API_RATE, 1, len(pcm)) + pcm)
+        originals.append(name)
+
+        mono = np.frombuffer(pcm, dtype="<i2")
+        padding = np.zeros(API_RATE // 2, dtype="<i2")
+        stereo = np.repeat(np.concatenate([padding, mono, padding])[:, None], 2, axis=1).tobytes()
+        name = os.path.join(directory, f"phrase_{i:02d}_stereo.wav")
+        with open(name, "wb") as f:
+            f.write(wav_header(API_RATE, 2, len(stereo)) + stereo)
+        variants.append(name)
+    return originals, variants
+
+
+def ttfb(client, path: str):
+    from src.metrics import Timeline
+    with open(path, "rb") as f:
+        audio = io.BytesIO(f.read())
+    audio.name = os.path.basename(path)
+    timeline = Timeline()
+    start = time.perf_counter()
+    first = None
+    for _ in client.stream_convert(audio, timeline, cache=True):
+        if first is None:
+            first = time.perf_counter() - start
+    return first * 1000, bool(timeline.values.get("cache_hit"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--phrases", type=int, default=8)
+    parser.add_argument("--ttfb-ms", type=float, default=300.0, help="Mock server processing time")
+    args = parser.parse_args()
+
+    fake_devices.install()
+    from src.audio_cache import AudioCache  # noqa: E402
+    from src.el_client import ElevenLabsClient, OUTPUT_FORMAT  # noqa: E402
+    from src.settings.network import NetworkSettings  # noqa: E402
+
+    server = MockServer(MockConfig(ttfb_ms=args.ttfb_ms, pace=0)).start()
+    network = NetworkSettings(preconnect=0, keepalive_interval=0, hedge=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        originals, variants = write_phrases(tmp, args.phrases)
+        if not originals:
+            print("No clips found")
+            return 1
+        cache = AudioCache(os.path.join(tmp, "cache"), 500 * 1024 * 1024)
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = ElevenLabsClient("mock", "mock", base_url=server.url, network=network, cache=cache)
+            misses = [ttfb(client, path) for path in originals]
+            hits = [ttfb(client, path) for path in originals]
+            variant_hits = [ttfb(client, path) for path in variants]
+        requests = server.stats["requests"]
+
+        print(f"{len(originals)} phrases, mock TTFB {args.ttfb_ms:.0f}ms, {requests} API requests\n")
+        print(f"{'pass':<22} {'hits':>5} {'p50 ms':>8} {'max ms':>8}")
+        for name, results in (("first (miss)", misses), ("repeat", hits), ("padded stereo copy", variant_hits)):
+            times = [t for t, _ in results]
+            print(f"{name:<22} {sum(h for _, h in results):>5} {np.median(times):>8.2f} {max(times):>8.2f}")
+        print(f"\ncache: {len(cache)} entries, {cache.size / 1024:.0f} KB")
+
+        # Half the budget: the oldest entries make room for the newest
+        small = AudioCache(os.path.join(tmp, "small"), cache.size // 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.cache = small
+            client.prerender(originals, workers=1)
+        kept = [i for i, path in enumerate(originals)
+                if small.key(open(path, "rb").read(), "mock", client.model_id, OUTPUT_FORMAT) in small]
+        print(f"LRU: {small.size / 1024:.0f} of {small.max_bytes / 1024:.0f} KB used, "
+              f"kept phrases {kept} of 0-{len(originals) - 1}")
+        client.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
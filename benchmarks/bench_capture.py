@@ -0,0 +1,108 @@
+"""Memory/allocation benchmark: list-of-copies capture vs the preallocated capture ring.
+
+Simulates the input callback delivering float32 blocks for long utterances,
+then builds the WAV upload body and reads it the way the HTTP client does
+(64 KiB at a time). Reports wall time, time spent inside the simulated
+callback, and the tracemalloc peak for each path (measured in a separate
+run so tracing does not skew the timings).
+
+Usage: python benchmarks/bench_capture.py [--seconds 60 120 300] [--block 1024]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+from scipy.io.wavfile import write
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.audio_processor import AudioProcessor  # noqa: E402
+from src.capture_buffer import CaptureRing  # noqa: E402
+from src.settings.audio import AudioSettings  # noqa: E402
+
+READ_SIZE = 64 * 1024
+
+
+def drain(stream):
+    total = 0
+    while True:
+        data = stream.read(READ_SIZE)
+        if not data:
+            return total
+        total += len(data)
+
+
+def legacy_path(blocks, sample_rate):
+    """indata.copy() per block, then concatenate + astype + scipy wavfile.write."""
+    audio_data = []
+    cb = 0.0
+    for block in blocks:
+        t0 = time.perf_counter()
+        audio_data.append(block.copy())
+        cb += time.perf_counter() - t0
+    audio = np.concatenate(audio_data, axis=0)
+    pcm = (audio * 32767).astype(np.int16)
+    wav = BytesIO()
+    write(wav, sample_rate, pcm)
+    wav.seek(0)
+    return cb, drain(wav)
+
+
+def ring_path(blocks, ring, processor):
+    """Write blocks into the preallocated ring, then stream the WAV from ring views."""
+    cb = 0.0
+    start = ring.position
+    for block in blocks:
+        t0 = time.perf_counter()
+        ring.write(block)
+        cb += time.perf_counter() - t0
+    stream = processor.get_audio_stream(ring.slice(start, ring.position))
+    return cb, drain(stream)
+
+
+def measure(fn, *args):
+    # Timing and allocation tracing in separate runs, tracemalloc slows every allocation down
+    t0 = time.perf_counter()
+    cb, size = fn(*args)
+    wall = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return wall, cb, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[60, 120, 300])
+    parser.add_argument("--block", type=int, default=1024)
+    parser.add_argument("--rate", type=int, default=48000)
+    args = parser.parse_args()
+
+    settings = AudioSettings(sample_rate=args.rate, channels=1, max_utterance_seconds=max(args.seconds))
+    processor = AudioProcessor(settings)
+    # The ring is allocated once at startup, so it is not part of the per-utterance numbers
+    ring = CaptureRing(settings.capture_frames(), settings.channels)
+    print(f"capture ring: {ring.capacity / args.rate:.0f}s, {ring._buf.nbytes / 1e6:.1f} MB preallocated\n")
+
+    # The input device hands over one reused buffer per callback
+    block = (0.1 * np.random.default_rng(0).standard_normal((args.block, 1))).astype(np.float32)
+
+    print(f"{'utterance':>9} {'path':<8} {'wall ms':>9} {'callback us/blk':>16} {'peak MB':>9} {'WAV MB':>8}")
+    for seconds in args.seconds:
+        n_blocks = int(seconds * args.rate / args.block)
+        blocks = [block] * n_blocks
+        for name, fn, fargs in (("legacy", legacy_path, (blocks, args.rate)),
+                                ("ring", ring_path, (blocks, ring, processor))):
+            wall, cb, peak, size = measure(fn, *fargs)
+            print(f"{seconds:>8.0f}s {name:<8} {wall * 1000:>9.1f} {cb / n_blocks * 1e6:>16.2f} "
+                  f"{peak / 1e6:>9.1f} {size / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Cold vs warm time to first byte against a local TLS stand-in for the API.
+
+Starts mock_server.py behind TLS with a throwaway self-signed certificate
+(needs the openssl command) and an extra per-connection setup delay standing
+in for DNS, TCP and TLS round trips to the real API. Each scenario sends a
+short clip through ElevenLabsClient and reports time to first byte:
+
+    cold          fresh client, nothing pre-opened
+    preconnected  fresh client after warm_up()
+    reused        second request on a client's pooled keep-alive connection
+    idle          after the server has closed the idle connection
+    keepalive     same idle period, with the background keep-alive running
+
+Usage: python benchmarks/bench_connection.py [--connect-ms 150] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+
+def self_signed(directory: str):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def clip() -> bytes:
+    from src.audio_processor import wav_header
+    pcm = (np.sin(np.arange(4800) / 10) * 3000).astype("<i2").tobytes()  # 0.1 s
+    return wav_header(48000, 1, len(pcm)) + pcm
+
+
+def ttfb(client, body: bytes) -> float:
+    from src.metrics import Timeline
+    audio = io.BytesIO(body)
+    audio.name = "audio.wav"
+    timeline = Timeline()
+    for _ in client.stream_convert(audio, timeline):
+        pass
+    return timeline.durations()["time_to_first_byte"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connect-ms", type=float, default=150.0, help="Simulated setup time per new connection")
+    parser.add_argument("--ttfb-ms", type=float, default=50.0, help="Server processing time")
+    parser.add_argument("--idle-timeout", type=float, default=1.0, help="Server closes idle connections after this")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fake_devices.install()
+    from src.el_client import ElevenLabsClient, HTTP2_AVAILABLE  # noqa: E402
+    from src.settings.network import NetworkSettings  # noqa: E402
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = self_signed(tmp)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert, key)
+        config = MockConfig(ttfb_ms=args.ttfb_ms, pace=0, connect_ms=args.connect_ms, idle_timeout=args.idle_timeout)
+        server = MockServer(config, ssl_context=context).start()
+        body = clip()
+
+        def make_client(keepalive_interval):
+            network = NetworkSettings(preconnect=0, keepalive_interval=keepalive_interval, hedge=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                return ElevenLabsClient("mock", "mock", base_url=server.url, verify=cert, network=network)
+
+        results = {name: [] for name in ("cold", "preconnected", "reused", "idle", "keepalive")}
+        for _ in range(args.repeat):
+            client = make_client(keepalive_interval=0)
+            results["cold"].append(ttfb(client, body))
+            results["reused"].append(ttfb(client, body))
+            time.sleep(args.idle_timeout * 1.5)
+            results["idle"].append(ttfb(client, body))
+            client.close()
+
+            client = make_client(keepalive_interval=0)
+            client.warm_up()
+            results["preconnected"].append(ttfb(client, body))
+            client.close()
+
+            client = make_client(keepalive_interval=args.idle_timeout / 2)
+            ttfb(client, body)
+            client.start_keepalive()
+            time.sleep(args.idle_timeout * 1.5)
+            results["keepalive"].append(ttfb(client, body))
+            client.close()
+        server.stop()
+
+    print(f"TLS mock, {args.connect_ms:.0f}ms connection setup, {args.ttfb_ms:.0f}ms server time, "
+          f"HTTP/2 {'available' if HTTP2_AVAILABLE else 'not installed'}, {args.repeat} runs\n")
+    print(f"{'scenario':<14} {'p50 ms':>8} {'max ms':>8}")
+    for name, values in results.items():
+        print(f"{name:<14} {np.median(values):>8.1f} {max(values):>8.1f}")
+    print(f"\n{server.stats['connections']} connections opened for {server.stats['requests']} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Local noise suppression: quality, CPU cost and added latency vs the API's remove_background_noise.
+
+Corpus clips (recordings/*.pcm, resampled to 48 kHz) are mixed with white,
+brown and mains-hum noise at several SNRs. The noise profile is learned from
+one second of noise alone, as the VAD does between utterances; the
+"no profile" column estimates it from the utterance itself. Reports SNR
+before and after, how far noise-only input is pushed down, CPU per second of
+audio and the wall time each utterance waits for the denoiser.
+
+With --api, the same clips are also sent to the real API (API_KEY and
+VOICE_ID from the environment or .env) with remove_background_noise off and
+on, and time to first byte is compared.
+
+Usage: python benchmarks/bench_denoise.py [--limit 10] [--api]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+
+RATE = 48000
+API_RATE = 22050
+
+
+def make_noise(kind: str, n: int, rng) -> np.ndarray:
+    white = rng.standard_normal(n).astype(np.float32)
+    if kind == "white":
+        return white
+    if kind == "brown":
+        brown = np.cumsum(white)
+        # Remove the drift so it stays a stationary rumble
+        brown -= np.convolve(brown, np.ones(4800) / 4800, mode="same")
+        return brown.astype(np.float32)
+    t = np.arange(n) / RATE
+    hum = sum(np.sin(2 * np.pi * 50 * k * t) / k for k in range(1, 8))
+    return (hum + 0.1 * white).astype(np.float32)
+
+
+def mix(clean, noise, snr_db):
+    scale = np.sqrt(np.sum(clean ** 2) / (np.sum(noise ** 2) * 10 ** (snr_db / 10)))
+    return (noise * scale).astype(np.float32)
+
+
+def snr(clean, out):
+    return 10 * np.log10(np.sum(clean ** 2) / np.sum((out - clean) ** 2))
+
+
+def api_comparison(files, limit):
+    """TTFB against the real API with server-side noise removal off and on."""
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(ROOT, ".env"))
+    from src.audio_processor import wav_header
+    from src.el_client import ElevenLabsClient
+    from src.metrics import Timeline
+    from src.settings.network import NetworkSettings
+    network = NetworkSettings(hedge=False, retries=0, passthrough=False, first_byte_timeout=60, stream_timeout=60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = ElevenLabsClient(os.getenv("API_KEY"), os.getenv("VOICE_ID"), model_id=os.getenv("MODEL_ID"),
+                                  network=network)
+    results = {}
+    for remove in (False, True):
+        client.remove_background_noise = remove
+        times = []
+        for path in files[:limit]:
+            pcm = open(path, "rb").read()
+            audio = io.BytesIO(wav_header(API_RATE, 1, len(pcm)) + pcm)
+            audio.name = "audio.wav"
+            timeline = Timeline()
+            for _ in client.stream_convert(audio, timeline):
+                pass
+            times.append(timeline.durations()["time_to_first_byte"])
+        results[remove] = times
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=10, help="Corpus clips to use")
+    parser.add_argument("--snr", type=float, nargs="*", default=[0.0, 5.0, 10.0, 20.0])
+    parser.add_argument("--strength", type=float, default=2.0)
+    parser.add_argument("--floor-db", type=float, default=-15.0)
+    parser.add_argument("--api", action="store_true", help="Also time the real API's remove_background_noise")
+    parser.add_argument("--api-clips", type=int, default=3)
+    args = parser.parse_args()
+
+    fake_devices.install()
+    from src.denoise import SpectralDenoiser  # noqa: E402
+    from src.resampler import StreamingResampler  # noqa: E402
+
+    files = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))[:args.limit]
+    if not files:
+        print("No clips found")
+        return 1
+    clips = []
+    for path in files:
+        resampler = StreamingResampler(API_RATE, RATE)
+        data = open(path, "rb").read()
+        clips.append(np.concatenate([resampler.process_pcm16(data), resampler.flush()]) / np.float32(32767))
+    audio_seconds = sum(len(c) for c in clips) / RATE
+    rng = np.random.default_rng(0)
+
+    print(f"{len(clips)} clips, {audio_seconds:.1f}s of speech, strength {args.strength}, floor {args.floor_db:.0f} dB\n")
+    print(f"{'noise':<7} {'SNR in':>7} {'SNR out':>8} {'no profile':>11} {'noise-only':>11}")
+    cpu = 0.0
+    walls = []
+    for kind in ("white", "brown", "hum"):
+        for snr_db in args.snr:
+            with_profile, without, attenuation = [], [], []
+            for clean in clips:
+                noise = make_noise(kind, len(clean) + RATE, rng)
+                noise = mix(clean, noise, snr_db) if np.any(clean) else noise * 0.01
+                silence, noise = noise[:RATE], noise[RATE:]
+                noisy = (clean + noise)[:, None]
+
+                denoiser = SpectralDenoiser(RATE, strength=args.strength, floor_db=args.floor_db)
+                denoiser.profile.update(silence)
+                c0, w0 = time.process_time(), time.perf_counter()
+                out = denoiser.process(noisy)[:, 0]
+                cpu += time.process_time() - c0
+                walls.append((time.perf_counter() - w0) * 1000)
+                with_profile.append(snr(clean, out))
+                residual = denoiser.process(noise[:, None])[:, 0]
+                attenuation.append(10 * np.log10(np.sum(noise ** 2) / np.sum(residual ** 2)))
+
+                blind = SpectralDenoiser(RATE, strength=args.strength, floor_db=args.floor_db)
+                without.append(snr(clean, blind.process(noisy)[:, 0]))
+            print(f"{kind:<7} {snr_db:>5.0f}dB {np.mean(with_profile):>6.1f}dB {np.mean(without):>9.1f}dB "
+                  f"{-np.mean(attenuation):>8.1f}dB")
+
+    runs = 3 * len(args.snr)
+    per_second = cpu / (audio_seconds * runs) * 1000
+    print(f"\nCPU: {per_second:.1f}ms per second of audio ({per_second / 10:.2f}% of real time)")
+    print(f"added latency per utterance: p50 {np.percentile(walls, 50):.1f}ms  p95 {np.percentile(walls, 95):.1f}ms  "
+          f"max {max(walls):.1f}ms (clips {min(len(c) for c in clips) / RATE:.1f}-{max(len(c) for c in clips) / RATE:.1f}s)")
+
+    if args.api:
+        results = api_comparison(files, args.api_clips)
+        off, on = np.median(results[False]), np.median(results[True])
+        print(f"API time to first byte: p50 {off:.0f}ms without, {on:.0f}ms with remove_background_noise "
+              f"(+{on - off:.0f}ms over {len(results[True])} clips)")
+    else:
+        print("API remove_background_noise: not measured (run with --api and API_KEY/VOICE_ID set); "
+              "el_client notes 5+ seconds added")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Multi-voice fan-out: time to first audio and to every voice as the number of voices grows.
+
+Converts corpus clips (recordings/*.pcm) into N voices against the mock
+API through VoiceFanout: one WAV upload per clip, sent N times, on the
+bounded voice pool, with the chunks mixed as they arrive. For comparison,
+the same voices are also converted one after another with the
+single-voice client.
+
+Reports per voice count:
+    first audio   request -> first mixed chunk (what the listener hears first)
+    last voice    request -> first byte of the slowest voice
+    done          request -> end of the mixed stream
+    sequential    request -> first byte of the last voice, one voice at a time
+
+Usage: python benchmarks/bench_fanout.py [--voices 1 2 4 8] [--workers 0] [--clips 6] [--ttfb-ms 300]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+API_RATE = 22050
+
+
+def upload(pcm: bytes) -> io.BytesIO:
+    from src.audio_processor import wav_header
+    audio = io.BytesIO(wav_header(API_RATE, 1, len(pcm)) + pcm)
+    audio.name = "audio.wav"
+    return audio
+
+
+def fan_out(fanout, pcm: bytes):
+    """One clip through the fan-out and the mixer: (first audio, last voice first byte, done) in ms."""
+    from src.metrics import Timeline
+    timeline = Timeline()
+    start = time.perf_counter()
+    first = None
+    for _ in fanout.mix(fanout.stream(upload(pcm), timeline, threading.Event(), cache=False)):
+        if first is None:
+            first = time.perf_counter() - start
+    done = time.perf_counter() - start
+    ttfb = [t for t in timeline.values["voice_ttfb_ms"] if t is not None]
+    return first * 1000, max(ttfb), done * 1000
+
+
+def sequential(client, voices, pcm: bytes) -> float:
+    """The voices one after another: ms until the last one's first byte."""
+    start = time.perf_counter()
+    last = None
+    for voice in voices:
+        for _ in client.stream_convert(upload(pcm), cache=False, voice_id=voice.voice_id):
+            last = time.perf_counter() - start
+            break
+    return last * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--voices", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=0, help="FANOUT_WORKERS (0 = one per voice)")
+    parser.add_argument("--clips", type=int, default=6)
+    parser.add_argument("--ttfb-ms", type=float, default=300.0, help="Mock server processing time")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="Random extra delay per mock chunk")
+    parser.add_argument("--pace", type=float, default=4.0, help="Mock audio seconds per wall second")
+    args = parser.parse_args()
+
+    fake_devices.install()
+    from src.el_client import ElevenLabsClient  # noqa: E402
+    from src.fanout import Voice, VoiceFanout  # noqa: E402
+    from src.settings.network import NetworkSettings  # noqa: E402
+
+    clips = [open(f, "rb").read() for f in sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))[:args.clips]]
+    if not clips:
+        print("No clips found")
+        return 1
+    server = MockServer(MockConfig(ttfb_ms=args.ttfb_ms, jitter_ms=args.jitter_ms, pace=args.pace, seed=1)).start()
+    most = max(args.voices)
+    network = NetworkSettings(pool_size=2 * most, preconnect=0, keepalive_interval=0, hedge=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = ElevenLabsClient("mock", "mock", base_url=server.url, network=network, playback=False)
+        client.warm_up(most)
+        client.client  # Finish loading the SDK
+
+    print(f"{len(clips)} clips, mock TTFB {args.ttfb_ms:.0f}ms + up to {args.jitter_ms:.0f}ms per chunk, "
+          f"pace {args.pace:g}x\n")
+    print(f"{'voices':>6} {'first audio p50':>15} {'p95':>6} {'last voice p50':>14} {'done p50':>8} "
+          f"{'sequential p50':>14}")
+    for count in args.voices:
+        voices = [Voice(f"voice-{i}", 1.0 / count) for i in range(count)]
+        fanout = VoiceFanout(client, voices, "mix", args.workers or count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [fan_out(fanout, pcm) for pcm in clips]
+            serial = [sequential(client, voices, pcm) for pcm in clips]
+        fanout.pool.shutdown()
+        first, last, done = (np.array([r[i] for r in results]) for i in range(3))
+        print(f"{count:>6} {np.percentile(first, 50):>13.0f}ms {np.percentile(first, 95):>4.0f}ms "
+              f"{np.percentile(last, 50):>12.0f}ms {np.percentile(done, 50):>6.0f}ms {np.percentile(serial, 50):>12.0f}ms")
+
+    client.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Adaptive jitter buffer vs starting playback at the first chunk, under several mock pacing profiles.
+
+Every profile streams the same clips from the mock API through
+ElevenLabsClient.play_stream into the fake output device, once with
+JITTER_BUFFER=0 (write each chunk as it arrives) and once with the adaptive
+jitter buffer. Reports underruns, silence inserted mid-utterance and how
+long playback start was held after the first byte. Runs in real time, since
+the buffer reasons about real-time playback.
+
+Fails if, on a profile where starting at once never underruns, the adaptive
+buffer's median start hold is longer than starting at once (plus HOLD_SLACK_MS).
+The median, because the first clip has no arrival history to project from.
+
+Usage: python benchmarks/bench_jitter.py [--limit 4] [--profiles slow jittery]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+API_RATE = 22050
+HOLD_SLACK_MS = 50.0  # About one minimum cushion, plus timer scheduling
+
+# name -> mock server pacing: audio seconds per wall second, chunk size, random delay per chunk
+PROFILES = {
+    "fast": dict(pace=4.0),
+    "realtime": dict(pace=1.0),
+    "slow": dict(pace=0.85),
+    "very-slow": dict(pace=0.6),
+    "jittery": dict(pace=1.1, jitter_ms=250.0),
+    "coarse": dict(pace=1.05, chunk_bytes=32768),
+}
+
+
+def run(profile: dict, files, adaptive: bool, seed: int):
+    from src.audio_processor import wav_header
+    from src.el_client import ElevenLabsClient
+    from src.jitter_buffer import JitterBuffer
+    from src.metrics import Timeline
+    from src.settings.network import NetworkSettings
+
+    server = MockServer(MockConfig(ttfb_ms=100.0, seed=seed, **profile)).start()
+    network = NetworkSettings(preconnect=0, keepalive_interval=0, hedge=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = ElevenLabsClient("mock", "mock", base_url=server.url, network=network,
+                                  jitter_buffer=JitterBuffer() if adaptive else None)
+    player = client.player
+    underruns, frames = player.underruns, player.underrun_frames
+    holds = []
+    for path in files:
+        pcm = open(path, "rb").read()
+        audio = io.BytesIO(wav_header(API_RATE, 1, len(pcm)) + pcm)
+        audio.name = "audio.wav"
+        timeline = Timeline()
+        timeline.set("audio_seconds", len(pcm) / 2 / API_RATE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.play_stream(client.stream_convert(audio, timeline), time.time(), timeline)
+        holds.append(timeline.durations().get("first_audible", 0.0))
+    client.close()
+    server.stop()
+    return player.underruns - underruns, (player.underrun_frames - frames) / player.samplerate * 1000, holds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=4, help="Clips per profile")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fake_devices.install()
+    files = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))[:args.limit]
+    if not files:
+        print("No clips found")
+        return 1
+    seconds = sum(os.path.getsize(f) for f in files) / 2 / API_RATE
+    print(f"{len(files)} clips ({seconds:.1f}s of audio) per profile and mode\n")
+    print(f"{'profile':<10} {'mode':<10} {'underruns':>9} {'silence ms':>11} {'start hold p50':>15} {'max':>7}")
+    failed = []
+    for name in args.profiles:
+        results = {}
+        for adaptive in (False, True):
+            count, silence, holds = run(PROFILES[name], files, adaptive, args.seed)
+            results[adaptive] = count, np.percentile(holds, 50)
+            print(f"{name:<10} {'adaptive' if adaptive else 'immediate':<10} {count:>9} {silence:>11.0f} "
+                  f"{np.percentile(holds, 50):>13.0f}ms {max(holds):>5.0f}ms")
+        # Holding back a stream that plays cleanly from the first chunk only adds latency
+        if results[False][0] == 0 and results[True][1] > results[False][1] + HOLD_SLACK_MS:
+            failed.append(name)
+    if failed:
+        print(f"\nFAILED: adaptive holds longer than an immediate start that never underruns ({', '.join(failed)})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
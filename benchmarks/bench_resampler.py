@@ -0,0 +1,116 @@
+"""Micro-benchmark: StreamingResampler vs the old per-chunk np.interp method.
+
+Runs every PCM file in recordings/ (raw 22050 Hz int16 mono, as returned by
+the API) through both resamplers in API-sized chunks and compares speed,
+output length and accuracy against scipy.signal.resample_poly on the whole
+file.
+
+Usage: python benchmarks/bench_resampler.py [--chunk 2048] [--rate 48000]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.signal import resample_poly
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.resampler import StreamingResampler  # noqa: E402
+
+API_RATE = 22050
+
+
+def linear_resample(samples, orig_rate, target_rate):
+    """The per-chunk method ElevenLabsClient used before StreamingResampler."""
+    if orig_rate == target_rate:
+        return samples
+    ratio = target_rate / orig_rate
+    new_length = int(len(samples) * ratio)
+    indices = np.linspace(0, len(samples) - 1, new_length)
+    return np.interp(indices, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def run_linear(chunks, target_rate):
+    # The old path could not handle odd-sized chunks, so drop the stray byte here
+    return [linear_resample(np.frombuffer(c[:len(c) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0,
+                            API_RATE, target_rate) for c in chunks]
+
+
+def run_streaming(resampler, chunks):
+    out = [resampler.process_pcm16(c).copy() for c in chunks]
+    out.append(resampler.flush())
+    return out
+
+
+def snr_db(reference, signal):
+    n = min(len(reference), len(signal))
+    err = reference[:n] - signal[:n]
+    return 10 * np.log10(np.sum(reference[:n] ** 2) / max(np.sum(err ** 2), 1e-20))
+
+
+def boundary_error(reference, signal, joins):
+    """Largest deviation from the reference within two samples of a chunk join."""
+    n = min(len(reference), len(signal))
+    worst = 0.0
+    for j in joins:
+        lo, hi = max(0, j - 2), min(n, j + 2)
+        if lo < hi:
+            worst = max(worst, float(np.max(np.abs(reference[lo:hi] - signal[lo:hi]))))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=2048, help="Chunk size in bytes")
+    parser.add_argument("--rate", type=int, default=48000, help="Target sample rate")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))
+    if not files:
+        print("No PCM files found in recordings/")
+        return
+
+    resampler = StreamingResampler(API_RATE, args.rate)
+    totals = {"linear": 0.0, "streaming": 0.0}
+    audio_seconds = 0.0
+    rows = []
+
+    for path in files:
+        data = open(path, "rb").read()
+        chunks = [data[i:i + args.chunk] for i in range(0, len(data), args.chunk)]
+        x = np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float64) / 32768.0
+        audio_seconds += len(x) / API_RATE
+        reference = resample_poly(x, resampler.up, resampler.down)
+        expected = int(np.ceil(len(x) * resampler.up / resampler.down))
+
+        results = {}
+        for name, fn in (("linear", lambda: run_linear(chunks, args.rate)),
+                         ("streaming", lambda: run_streaming(resampler, chunks))):
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                parts = fn()
+                best = min(best, time.perf_counter() - t0)
+            totals[name] += best
+            y = np.concatenate(parts)
+            joins = np.cumsum([len(p) for p in parts[:-1]])
+            results[name] = (len(y) - expected, snr_db(reference, y), boundary_error(reference, y, joins))
+        rows.append((os.path.basename(path), results))
+
+    print(f"{'file':<36} {'method':<10} {'len err':>8} {'SNR dB':>8} {'join err':>9}")
+    for name, results in rows:
+        for method, (len_err, snr, join_err) in results.items():
+            print(f"{name:<36} {method:<10} {len_err:>8d} {snr:>8.1f} {join_err:>9.4f}")
+
+    print()
+    for method, seconds in totals.items():
+        print(f"{method:<10} {seconds * 1000:8.1f} ms total, {audio_seconds / seconds:8.0f}x real time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Load test for the headless server: latency versus number of concurrent sessions.
+
+Starts mock_server.py and a ConversionServer (live-vc-server.py) in this
+process, then for each session count connects that many clients at once.
+Every client streams recordings/*.pcm clips in real time, with silence
+between them, as mono int16 PCM. The server's VAD cuts the utterances,
+and the client times each one until its converted audio comes back. The
+server runs at most --max-conversions API requests at a time, so once
+there are more sessions than slots, utterances queue on the server.
+
+Reports per session count:
+    first audio   end of speech (last voiced sample sent) -> first converted
+                  byte back, including the VAD's silence hangover
+    queue         server-side wait for a conversion slot
+    ttfb          API time to first byte (mock)
+
+Usage: python benchmarks/bench_server.py [--sessions 1 2 4 8 16] [--max-conversions 4] [--protocol ws]
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+RATE = 22050  # The clips' rate, sent as is
+BLOCK = RATE // 50  # 20 ms per message
+
+
+def build_signal(clips, gap: float, lead: float) -> bytes:
+    """lead seconds of silence (the VAD calibrates on it), then the clips with gap seconds of silence after each."""
+    parts = [np.zeros(int(lead * RATE), dtype="<i2").tobytes()]
+    for clip in clips:
+        parts += [clip, np.zeros(int(gap * RATE), dtype="<i2").tobytes()]
+    return b"".join(parts)
+
+
+async def client(number: int, port: int, signal: bytes, args):
+    """One session: stream the signal in real time and time every utterance that comes back."""
+    from src.server import TCPTransport, WebSocketTransport
+
+    await asyncio.sleep(random.uniform(0, args.stagger))  # Clients don't all speak in lockstep
+    if args.protocol == "ws":
+        conn = await WebSocketTransport.connect("127.0.0.1", port)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        conn = TCPTransport(reader, writer, 1 << 20)
+    await conn.send_event({"type": "hello", "voice_id": f"voice-{number}", "sample_rate": RATE})
+    ready = await conn.receive()
+    if ready is None or ready[1].get("type") != "ready":
+        conn.close()
+        return [], [f"refused: {ready}"]
+
+    started = time.perf_counter()
+    ends, first, reports, errors = {}, {}, {}, []
+
+    async def receive():
+        current = None
+        while True:
+            message = await conn.receive()
+            if message is None:
+                return
+            kind, payload = message
+            if kind == "audio":
+                if current is not None and current not in first:
+                    first[current] = time.perf_counter()
+                continue
+            event = payload.get("type")
+            if event == "queued":
+                ends[payload["seq"]] = payload["end_sample"]
+            elif event == "audio_start":
+                current = payload["seq"]
+            elif event == "audio_end":
+                reports[payload["seq"]] = payload
+                current = None
+            elif event == "error":
+                errors.append(payload["message"])
+            elif event == "bye":
+                return
+
+    receiver = asyncio.create_task(receive())
+    step = BLOCK * 2
+    for i in range(0, len(signal), step):
+        delay = started + i / 2 / RATE / args.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await conn.send_audio(signal[i:i + step])
+    await conn.send_event({"type": "finish"})
+    await receiver
+    conn.close()
+
+    results = []
+    for seq, end_sample in ends.items():
+        if seq not in first or seq not in reports:
+            continue
+        spoken = started + end_sample / RATE / args.speed
+        report = reports[seq]
+        results.append(((first[seq] - spoken) * 1000, report["queue_ms"], report["time_to_first_byte_ms"],
+                        report["passthrough"]))
+    return results, errors
+
+
+async def run_level(count: int, port: int, signals, args):
+    outcomes = await asyncio.gather(*(client(i, port, signals[i % len(signals)], args) for i in range(count)))
+    results = [r for rs, _ in outcomes for r in rs]
+    errors = [e for _, es in outcomes for e in es]
+    return results, errors
+
+
+async def start_server(port: int):
+    from src.server import ConversionServer
+    server = ConversionServer.from_env(host="127.0.0.1", port=port)
+    await server.start()
+    return server
+
+
+def pct(values, q):
+    values = [v for v in values if v is not None]
+    return f"{np.percentile(values, q):.0f}" if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max-conversions", type=int, default=4, help="SERVER_MAX_CONVERSIONS")
+    parser.add_argument("--protocol", choices=["tcp", "ws"], default="tcp")
+    parser.add_argument("--clips", type=int, default=3, help="Clips each session speaks")
+    parser.add_argument("--gap", type=float, default=1.5, help="Silence after each clip")
+    parser.add_argument("--stagger", type=float, default=1.0, help="Clients connect within this many seconds")
+    parser.add_argument("--speed", type=float, default=1.0, help="Send audio this many times faster than real time")
+    parser.add_argument("--ttfb-ms", type=float, default=300.0, help="Mock server processing time")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's own output")
+    args = parser.parse_args()
+
+    fake_devices.install()
+    files = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))
+    if not files:
+        print("No clips found")
+        return 1
+    clips = [open(f, "rb").read() for f in files]
+    # Each session speaks its own run of clips
+    signals = [build_signal([clips[(i * args.clips + k) % len(clips)] for k in range(args.clips)], args.gap, 1.0)
+               for i in range(len(clips))]
+
+    mock = MockServer(MockConfig(ttfb_ms=args.ttfb_ms)).start()
+    os.environ.update({
+        "API_KEY": "mock", "VOICE_ID": "mock", "ELEVENLABS_BASE_URL": mock.url,
+        "SERVER_MAX_CONVERSIONS": str(args.max_conversions),
+        "SERVER_MAX_SESSIONS": str(max(args.sessions)),
+        "CACHE_MAX_MB": "0", "DEBUG_RECORDINGS": "0", "HTTP_PRECONNECT": "0",
+    })
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="server", daemon=True).start()
+    with quiet:
+        server = asyncio.run_coroutine_threadsafe(start_server(0), loop).result()
+
+    print(f"{args.protocol.upper()} sessions, {args.clips} clips each, mock TTFB {args.ttfb_ms:.0f}ms, "
+          f"{args.max_conversions} conversions at once\n")
+    print(f"{'sessions':>8} {'utterances':>10} {'first audio p50':>15} {'p95':>6} {'max':>6} "
+          f"{'queue p50':>9} {'p95':>6} {'ttfb p50':>8} {'errors':>6}")
+    for count in args.sessions:
+        with quiet:
+            results, errors = asyncio.run(run_level(count, server.port, signals, args))
+            while server.sessions:  # The server is still closing them
+                time.sleep(0.05)
+        lags = [r[0] for r in results]
+        failed = len(errors) + sum(1 for r in results if r[3])
+        print(f"{count:>8} {len(results):>10} {pct(lags, 50):>13}ms {pct(lags, 95):>4}ms "
+              f"{(f'{max(lags):.0f}' if lags else '-'):>4}ms {pct([r[1] for r in results], 50):>7}ms "
+              f"{pct([r[1] for r in results], 95):>4}ms {pct([r[2] for r in results], 50):>6}ms {failed:>6}")
+
+    with quiet:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    mock.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
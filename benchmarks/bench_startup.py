@@ -0,0 +1,147 @@
+"""Cold start: time from launching live-vc.py (or live-vc-server.py) until it is ready, and what the imports cost.
+
+Each run starts a fresh interpreter with fake audio devices and a dummy
+API key, and times until the banner and then the prompt ("(live-vc)") or
+the server's "Listening on" line show up on stdout; then it sends quit /
+stops the process. Connection pre-warming, the cache and debug
+recordings are off, so nothing touches the network or the disk.
+
+One more run under python -X importtime lists the modules with the
+largest cumulative import time. It stays up for --linger seconds after
+it is ready, so imports finishing on background threads (the SDK) are
+listed too, although they do not delay the prompt.
+
+It exits non-zero when the median time to ready is over --budget-ms
+(750 by default, 0 turns the check off), so it gates changes to the
+startup path.
+
+Usage: python benchmarks/bench_startup.py [--target cli|server] [--runs 5] [--top 12] [--budget-ms 750]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+# Child bootstrap: the fake devices must be in sys.modules before the entry point imports anything
+BOOTSTRAP = (
+    "import runpy, sys; sys.path[:0] = [{root!r}, {bench!r}]; "
+    "import fake_devices; fake_devices.install(); "
+    "sys.argv = [{script!r}] + {argv!r}; runpy.run_path({script!r}, run_name='__main__')"
+)
+
+# script, arguments, first output (the banner), ready
+TARGETS = {
+    "cli": ("live-vc.py", [], b"Description:", b"(live-vc)"),
+    "server": ("live-vc-server.py", ["--port", "0"], None, b"Listening on"),
+}
+
+
+def child_env():
+    env = dict(os.environ)
+    env.update({
+        "API_KEY": "mock", "VOICE_ID": "mock", "ELEVENLABS_BASE_URL": "http://127.0.0.1:9",
+        "HTTP_PRECONNECT": "0", "CACHE_MAX_MB": "0", "DEBUG_RECORDINGS": "0", "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def launch(target: str, importtime=False, linger=0.0) -> tuple:
+    """Start the entry point, wait until it is ready and stop it. Returns (ms to banner, ms to ready, stderr)."""
+    script, argv, banner_marker, marker = TARGETS[target]
+    code = BOOTSTRAP.format(root=ROOT, bench=BENCH, script=os.path.join(ROOT, script), argv=argv)
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=ROOT, env=child_env(), stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = []
+    drain = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    drain.start()
+
+    seen, banner, ready = b"", None, None
+    while ready is None:
+        data = os.read(proc.stdout.fileno(), 65536)
+        if not data:
+            break
+        seen += data
+        now = (time.perf_counter() - started) * 1000
+        if banner is None and banner_marker is not None and banner_marker in seen:
+            banner = now
+        if marker in seen:
+            ready = now
+    time.sleep(linger)
+
+    if target == "cli":
+        try:
+            proc.stdin.write(b"quit\n")
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+    else:
+        proc.terminate()
+    threading.Thread(target=proc.stdout.read, daemon=True).start()  # Keep the pipe from filling while it exits
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    drain.join(timeout=5)
+    err = stderr[0].decode(errors="replace") if stderr else ""
+    if ready is None:
+        raise RuntimeError(f"{script} exited before it was ready:\n{err[-2000:]}")
+    return banner, ready, err
+
+
+def parse_importtime(text: str):
+    """(cumulative ms, self ms, module, top level?) for every import in -X importtime output."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        # Modules imported by other modules are indented under them
+        rows.append((int(cumulative) / 1000, int(own) / 1000, name.strip(), not name.startswith("  ")))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="cli")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="Slowest imports to list")
+    parser.add_argument("--linger", type=float, default=2.0, help="Seconds the -X importtime run stays up after ready")
+    parser.add_argument("--budget-ms", type=float, default=750.0, help="Fail when the median time to ready is above this (0 = no check)")
+    args = parser.parse_args()
+
+    launch(args.target)  # Compile .pyc files and warm the OS file cache, as any second launch would be
+    runs = [launch(args.target) for _ in range(args.runs)]
+    times = [r[1] for r in runs]
+    print(f"{TARGETS[args.target][0]}: over {args.runs} runs")
+    if runs[0][0] is not None:
+        banners = [r[0] for r in runs]
+        print(f"  banner  median {np.median(banners):.0f}ms  min {min(banners):.0f}ms  max {max(banners):.0f}ms")
+    print(f"  ready   median {np.median(times):.0f}ms  min {min(times):.0f}ms  max {max(times):.0f}ms\n")
+
+    _, ready, err = launch(args.target, importtime=True, linger=args.linger)
+    rows = sorted(parse_importtime(err), reverse=True)
+    total = sum(r[0] for r in rows if r[3])
+    print(f"Imports under -X importtime (ready after {ready:.0f}ms with tracing; "
+          f"{total:.0f}ms of imports on all threads)")
+    print(f"{'cumulative':>10} {'self':>7}  module")
+    for cumulative, own, name, _ in rows[:args.top]:
+        print(f"{cumulative:>8.1f}ms {own:>5.1f}ms  {name}")
+
+    if args.budget_ms and np.median(times) > args.budget_ms:
+        print(f"\nFAIL: median time to ready {np.median(times):.0f}ms is over the {args.budget_ms:.0f}ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
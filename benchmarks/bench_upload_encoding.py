@@ -0,0 +1,112 @@
+"""Encode time vs payload size for each upload encoding on the bundled recordings.
+
+The recordings/*.pcm corpus is 22050 Hz int16 speech. Each file is upsampled
+to the capture rate and written into a CaptureRing, then encoded exactly as
+AudioProcessor would before upload. The estimated upload time assumes the
+given uplink bandwidth and ignores request overhead. Fails if an unknown
+UPLOAD_FORMAT is not replaced by WAV.
+
+Usage: python benchmarks/bench_upload_encoding.py [--uplink-mbps 5] [--repeat 3]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.audio_processor import AudioProcessor, sf  # noqa: E402
+from src.capture_buffer import CaptureRing  # noqa: E402
+from src.resampler import StreamingResampler  # noqa: E402
+from src.settings.audio import AudioSettings  # noqa: E402
+
+API_RATE = 22050
+CAPTURE_RATE = 48000
+
+CANDIDATES = [
+    ("wav", None),
+    ("wav", 22050),
+    ("wav", 16000),
+    ("flac", None),
+    ("flac", 16000),
+    ("opus", None),
+    ("opus", 16000),
+]
+
+
+def load_corpus():
+    """Upsample every recording to the capture rate and lay them out in one ring."""
+    resampler = StreamingResampler(API_RATE, CAPTURE_RATE)
+    clips = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm"))):
+        data = open(path, "rb").read()
+        clip = np.concatenate([resampler.process_pcm16(data).copy(), resampler.flush()])
+        clips.append(clip)
+    ring = CaptureRing(sum(len(c) for c in clips), 1)
+    slices = []
+    for clip in clips:
+        start = ring.write(clip[:, None])
+        slices.append(ring.slice(start, start + len(clip)))
+    return slices
+
+
+def check_unknown_format():
+    """An unknown UPLOAD_FORMAT must warn and upload WAV instead of failing at the first utterance."""
+    settings = AudioSettings(sample_rate=CAPTURE_RATE, trim_silence=False, upload_format="flac16")
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        processor = AudioProcessor(settings)
+    ok = processor.upload_format == "wav" and "Unknown UPLOAD_FORMAT" in out.getvalue()
+    print(f"unknown UPLOAD_FORMAT 'flac16': uploads {processor.upload_format} ({'ok' if ok else 'FAILED'})\n")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uplink-mbps", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ok = check_unknown_format()
+    slices = load_corpus()
+    if not slices:
+        print("No PCM files found in recordings/")
+        return 0 if ok else 1
+    audio_seconds = sum(len(s) for s in slices) / CAPTURE_RATE
+    print(f"{len(slices)} clips, {audio_seconds:.1f}s of speech at {CAPTURE_RATE} Hz")
+    print(f"uplink {args.uplink_mbps} Mbit/s\n")
+
+    print(f"{'format':<8} {'rate':>6} {'encode ms/s':>12} {'KB total':>9} {'KB/s':>7} {'ratio':>6} {'upload ms/s':>12}")
+    baseline = None
+    for fmt, rate in CANDIDATES:
+        if fmt != "wav" and sf is None:
+            print(f"{fmt:<8} {'-':>6} soundfile not installed")
+            continue
+        settings = AudioSettings(sample_rate=CAPTURE_RATE, trim_silence=False,
+                                 upload_format=fmt, upload_sample_rate=rate)
+        processor = AudioProcessor(settings)
+        best = float("inf")
+        size = 0
+        for _ in range(args.repeat):
+            size = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                for s in slices:
+                    # Read the body the way the HTTP client would, so lazy WAV streams are costed too
+                    size += len(processor.encode(s).read())
+                best = min(best, time.perf_counter() - t0)
+        baseline = baseline or size
+        kb_per_s = size / 1024 / audio_seconds
+        upload_ms = size * 8 / (args.uplink_mbps * 1e6) * 1000 / audio_seconds
+        print(f"{fmt:<8} {settings.upload_sample_rate:>6} {best * 1000 / audio_seconds:>12.2f} "
+              f"{size / 1024:>9.0f} {kb_per_s:>7.1f} {baseline / size:>6.1f} {upload_ms:>12.1f}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
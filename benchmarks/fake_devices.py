@@ -0,0 +1,140 @@
+"""Hardware-free stand-ins for sounddevice (and keyboard) used by the offline harness.
+
+install() puts fake modules into sys.modules before any src module is
+imported. The fake InputStream replays a float32 signal through the
+recorder's callback in real-time sized blocks; the fake OutputStream pulls
+from the player's callback at the device rate and counts what it receives.
+A speed factor runs both clocks faster than real time.
+"""
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+BLOCKSIZE = 480  # 10 ms at 48 kHz
+
+
+class FakeDevices:
+    """Shared state between the harness and the fake streams."""
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+        self.input_signal = np.zeros((0, 1), dtype=np.float32)
+        self.input_done = threading.Event()
+        self.input_started = None  # perf_counter() when the first input block was delivered
+        self.output_frames = 0
+        self.output_nonzero_frames = 0
+        self.first_output_time = None
+        self.output_streams = []
+        self.input_streams = []
+
+
+devices = FakeDevices()
+
+
+class _Flags:
+    """Mimics sounddevice.CallbackFlags: falsy, all flags clear."""
+
+    input_overflow = input_underflow = output_overflow = output_underflow = priming_output = False
+
+    def __bool__(self):
+        return False
+
+
+class _FakeStream:
+    def __init__(self, callback=None, channels=1, samplerate=48000, dtype='float32', device=None,
+                 blocksize=0, latency=None, **kwargs):
+        self.callback = callback
+        self.channels = channels
+        self.samplerate = samplerate
+        self.blocksize = blocksize or BLOCKSIZE
+        self.device = device
+        self.latency = self.blocksize / samplerate
+        self.active = False
+        self._thread = None
+
+    def start(self):
+        self.active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.active = False
+
+    def _run(self):
+        period = self.blocksize / self.samplerate / devices.speed
+        next_due = time.perf_counter()
+        while self.active:
+            self._tick()
+            next_due += period
+            time.sleep(max(0.0, next_due - time.perf_counter()))
+
+
+class InputStream(_FakeStream):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pos = 0
+        self._block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        devices.input_streams.append(self)
+
+    def _tick(self):
+        if devices.input_started is None:
+            devices.input_started = time.perf_counter()
+        signal = devices.input_signal
+        n = self.blocksize
+        chunk = signal[self._pos:self._pos + n]
+        self._block[:len(chunk)] = chunk
+        self._block[len(chunk):] = 0
+        self._pos += n
+        if self._pos >= len(signal):
+            devices.input_done.set()
+        self.callback(self._block, n, None, _Flags())
+
+
+class OutputStream(_FakeStream):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        devices.output_streams.append(self)
+
+    def _tick(self):
+        self.callback(self._block, self.blocksize, None, _Flags())
+        devices.output_frames += self.blocksize
+        nonzero = int(np.count_nonzero(np.any(self._block != 0, axis=1)))
+        if nonzero:
+            devices.output_nonzero_frames += nonzero
+            if devices.first_output_time is None:
+                devices.first_output_time = time.perf_counter()
+
+
+def query_devices(device=None, kind=None):
+    table = [
+        {"name": "Fake Microphone", "max_input_channels": 1, "max_output_channels": 0, "default_samplerate": 48000.0},
+        {"name": "CABLE Input (Fake)", "max_input_channels": 0, "max_output_channels": 2, "default_samplerate": 48000.0},
+    ]
+    if device is not None:
+        return table[device]
+    return table
+
+
+def install(speed: float = 1.0) -> FakeDevices:
+    """Register the fake sounddevice and keyboard modules. Call before importing src."""
+    devices.speed = speed
+    sd = types.ModuleType("sounddevice")
+    sd.InputStream = InputStream
+    sd.OutputStream = OutputStream
+    sd.query_devices = query_devices
+    sd.CallbackFlags = _Flags
+    sys.modules["sounddevice"] = sd
+
+    kb = types.ModuleType("keyboard")
+    kb.on_press_key = lambda *args, **kwargs: None
+    sys.modules["keyboard"] = kb
+    return devices
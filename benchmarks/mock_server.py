@@ -0,0 +1,301 @@
+"""Local stand-in for the ElevenLabs speech-to-speech streaming endpoint.
+
+Accepts the same multipart POST as /v1/speech-to-speech/{voice_id}[/stream]
+(Content-Length or chunked request bodies) and streams back pcm_22050 audio
+as long as the uploaded clip. The response audio is cut from the
+recordings/*.pcm corpus so it sounds like speech. Time to first byte, chunk
+size, chunk pacing and error injection are configurable.
+
+Run standalone:
+    python benchmarks/mock_server.py --port 8765 --ttfb-ms 300 --pace 1.5
+then point the app at it with ELEVENLABS_BASE_URL=http://127.0.0.1:8765
+"""
+import argparse
+import glob
+import io
+import os
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_RATE = 22050
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):
+    sf = None
+
+
+class MockConfig:
+    """Server behaviour. Fields can be changed while the server is running."""
+
+    def __init__(self, ttfb_ms=300.0, chunk_bytes=4096, pace=1.0, jitter_ms=0.0,
+                 error_rate=0.0, disconnect_rate=0.0, stall_rate=0.0, stall_ms=5000.0, seed=None,
+                 upload_kbps=0.0, connect_ms=0.0, idle_timeout=None):
+        self.ttfb_ms = ttfb_ms  # Delay between the last request byte and the first response byte
+        self.chunk_bytes = chunk_bytes  # Size of each streamed chunk
+        self.pace = pace  # Audio seconds produced per wall second (0 = as fast as possible)
+        self.jitter_ms = jitter_ms  # Random extra delay per chunk
+        self.error_rate = error_rate  # Fraction of requests answered with HTTP 500
+        self.disconnect_rate = disconnect_rate  # Fraction of responses cut off halfway
+        self.stall_rate = stall_rate  # Fraction of requests that wait stall_ms before the first byte
+        self.stall_ms = stall_ms
+        self.upload_kbps = upload_kbps  # Simulated uplink bandwidth for request bodies (0 = unlimited)
+        self.connect_ms = connect_ms  # Extra setup delay per new connection (DNS + TCP + TLS round trips)
+        self.idle_timeout = idle_timeout  # Close keep-alive connections idle this long (None = never)
+        self.random = random.Random(seed)
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument("--ttfb-ms", type=float, default=300.0)
+        parser.add_argument("--chunk-bytes", type=int, default=4096)
+        parser.add_argument("--pace", type=float, default=1.0, help="Audio seconds per wall second, 0 = unpaced")
+        parser.add_argument("--jitter-ms", type=float, default=0.0)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--disconnect-rate", type=float, default=0.0)
+        parser.add_argument("--stall-rate", type=float, default=0.0)
+        parser.add_argument("--stall-ms", type=float, default=5000.0)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--upload-kbps", type=float, default=0.0, help="Simulated uplink, 0 = unlimited")
+        parser.add_argument("--connect-ms", type=float, default=0.0, help="Extra setup time per new connection")
+        parser.add_argument("--idle-timeout", type=float, default=None, help="Close idle keep-alive connections")
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.ttfb_ms, args.chunk_bytes, args.pace, args.jitter_ms, args.error_rate,
+                   args.disconnect_rate, args.stall_rate, args.stall_ms, args.seed, args.upload_kbps,
+                   args.connect_ms, args.idle_timeout)
+
+
+def load_corpus() -> bytes:
+    files = sorted(glob.glob(os.path.join(ROOT, "recordings", "*.pcm")))
+    data = b"".join(open(p, "rb").read() for p in files)
+    if not data:
+        # No corpus: a quiet tone still exercises the playback path
+        t = np.arange(OUTPUT_RATE * 5) / OUTPUT_RATE
+        data = (3000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+    return data[:len(data) // 2 * 2]
+
+
+def audio_duration(data: bytes) -> float:
+    """Duration of an uploaded clip: WAV header, then soundfile, then a 16 kHz raw PCM guess."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        channels, rate = struct.unpack_from("<HI", data, 22)
+        bits = struct.unpack_from("<H", data, 34)[0]
+        idx = data.find(b"data", 12)
+        size = struct.unpack_from("<I", data, idx + 4)[0] if idx >= 0 else len(data) - 44
+        if size in (0, 0xFFFFFFFF):
+            # Streaming WAV with unknown length: use what was actually sent
+            size = len(data) - (idx + 8)
+        return min(size, len(data)) / (rate * channels * bits // 8)
+    if sf is not None:
+        try:
+            info = sf.info(io.BytesIO(data))
+            return info.frames / info.samplerate
+        except Exception:
+            pass
+    return len(data) / 32000
+
+
+def extract_audio(body: bytes, content_type: str) -> bytes:
+    """Pull the 'audio' part out of a multipart/form-data body."""
+    match = re.search(r'boundary="?([^";]+)"?', content_type or "")
+    if not match:
+        return body
+    boundary = b"--" + match.group(1).encode()
+    for part in body.split(boundary):
+        head, _, payload = part.partition(b"\r\n\r\n")
+        if b'name="audio"' in head:
+            return payload[:-2] if payload.endswith(b"\r\n") else payload
+    return b""
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Small chunks must not wait for the client's delayed ACK
+    server_version = "MockElevenLabs/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        config = self.server.config
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+        # Stand-in for the round trips a real client pays before its first request
+        if config.connect_ms:
+            time.sleep(config.connect_ms / 1000)
+        self.timeout = config.idle_timeout
+        super().setup()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            pass  # The client gave up on the connection (cancelled hedge, closed pool)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(parts)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        # Cheap endpoint for connection warm-up probes
+        body = b'{"status":"ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        config = self.server.config
+        stats = self.server.stats
+        opened = time.perf_counter()
+        body = self._read_body()
+        # The body cannot arrive faster than the simulated uplink; a streamed body has been
+        # trickling in since the request opened
+        received = time.perf_counter()
+        if config.upload_kbps:
+            received = max(received, opened + len(body) * 8 / (config.upload_kbps * 1000))
+        if not re.match(r"^/v1/speech-to-speech/[^/?]+(/stream)?(\?|$)", self.path):
+            self.send_error(404)
+            return
+
+        with self.server.lock:
+            stats["requests"] += 1
+            roll = config.random.random()
+            disconnect = config.random.random() < config.disconnect_rate
+            stall = config.random.random() < config.stall_rate
+        if roll < config.error_rate:
+            with self.server.lock:
+                stats["errors"] += 1
+            payload = b'{"detail":"injected error"}'
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        seconds = audio_duration(extract_audio(body, self.headers.get("Content-Type")))
+        total = int(seconds * OUTPUT_RATE) * 2
+        corpus = self.server.corpus
+        offset = self.server.next_offset(total)
+        audio = (corpus * (total // len(corpus) + 2))[offset:offset + total]
+
+        delay = config.ttfb_ms / 1000 + (config.stall_ms / 1000 if stall else 0.0)
+        time.sleep(max(0.0, received + delay - time.perf_counter()))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/pcm")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        start = time.perf_counter()
+        sent = 0
+        limit = len(audio) // 2 if disconnect else len(audio)
+        try:
+            while sent < limit:
+                chunk = audio[sent:sent + config.chunk_bytes]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+                sent += len(chunk)
+                if config.pace > 0:
+                    due = start + sent / 2 / OUTPUT_RATE / config.pace
+                    due += config.random.random() * config.jitter_ms / 1000
+                    time.sleep(max(0.0, due - time.perf_counter()))
+            if disconnect:
+                with self.server.lock:
+                    stats["disconnects"] += 1
+                self.close_connection = True
+                return
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                stats["cancelled"] += 1
+
+
+class MockServer(ThreadingHTTPServer):
+    """In-process mock API. Use as a context manager or call start()/stop()."""
+
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig = None, host="127.0.0.1", port=0, ssl_context=None):
+        super().__init__((host, port), MockHandler)
+        if ssl_context is not None:
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True)
+        self.config = config or MockConfig()
+        self.corpus = load_corpus()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "disconnects": 0, "cancelled": 0, "connections": 0}
+        self._offset = 0
+        self._thread = None
+        self.scheme = "https" if ssl_context is not None else "http"
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def next_offset(self, size: int) -> int:
+        with self.lock:
+            offset = self._offset
+            self._offset = (self._offset + size) % len(self.corpus) // 2 * 2
+        return offset
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    MockConfig.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(MockConfig.from_args(args), args.host, args.port)
+    print(f"Mock speech-to-speech API on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
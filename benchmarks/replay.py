@@ -0,0 +1,242 @@
+"""Offline end-to-end benchmark: replay recordings/*.pcm through AudioHandler.
+
+No microphone, VB-Cable or ElevenLabs account is needed. Fake sounddevice
+streams feed the corpus (separated by silence) into the VAD recorder, and the
+mock speech-to-speech server stands in for the API. The handler runs exactly
+as it does live: VAD, trimming, encoding, the conversion pipeline, the
+resampler and the playback ring.
+
+Reports per-stage latency distributions, playback underruns, device xruns,
+and CPU time and peak RSS per utterance. With --max-p95 / --max-underruns it
+exits non-zero on regressions, so it can gate changes to the audio path:
+
+    python benchmarks/replay.py --limit 8 --max-p95 end_to_end=1500 --max-underruns 0
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_devices  # noqa: E402
+from mock_server import MockConfig, MockServer  # noqa: E402
+
+API_RATE = 22050
+CAPTURE_RATE = 48000
+
+
+def build_signal(files, gap: float, resampler_cls, noise_db=None, seed=0):
+    """Concatenate the clips at the capture rate with gap seconds of silence around each.
+
+    Returns the signal and the ground-truth [start, end) sample span of the
+    audible part of every clip. noise_db adds white noise at that dBFS level.
+    """
+    silence = np.zeros(int(gap * CAPTURE_RATE), dtype=np.float32)
+    # Leave enough trailing silence for the VAD to end the last utterance
+    tail = np.zeros(int(max(gap, 2.0) * CAPTURE_RATE), dtype=np.float32)
+    parts = [silence]
+    spans = []
+    position = len(silence)
+    for path in files:
+        resampler = resampler_cls(API_RATE, CAPTURE_RATE)
+        data = open(path, "rb").read()
+        clip = np.concatenate([resampler.process_pcm16(data), resampler.flush()])
+        audible = np.flatnonzero(np.abs(clip) > 10 ** (-50 / 20))
+        if len(audible):
+            spans.append((position + audible[0], position + audible[-1] + 1))
+        parts += [clip, silence]
+        position += len(clip) + len(silence)
+    parts[-1] = tail
+    signal = np.concatenate(parts)
+    if noise_db is not None:
+        rng = np.random.default_rng(seed)
+        signal += rng.standard_normal(len(signal)).astype(np.float32) * np.float32(10 ** (noise_db / 20))
+    return signal[:, None], spans
+
+
+def first_audio_lag(timelines, input_started, speed):
+    """Speech onset to first audible output (ms), for the first part of each utterance."""
+    lags = []
+    starts_utterance = True
+    for timeline in timelines:
+        onset = timeline.values.get("vad_onset_sample")
+        if starts_utterance and onset is not None and "first_audio" in timeline.marks:
+            spoken = input_started + onset / CAPTURE_RATE / speed
+            lags.append((timeline.marks["first_audio"] - spoken) * 1000)
+        starts_utterance = timeline.values.get("final", True)
+    return lags
+
+
+def vad_accuracy(timelines, spans):
+    """Onset/offset error (ms) of each VAD cut against the clip it falls in."""
+    onset_err, offset_err, cut_lag = [], [], []
+    for timeline in timelines:
+        onset = timeline.values.get("vad_onset_sample")
+        if onset is None:
+            continue
+        for start, end in spans:
+            if start - CAPTURE_RATE // 2 <= onset < end:
+                onset_err.append((onset - start) / CAPTURE_RATE * 1000)
+                offset_err.append((timeline.values["vad_offset_sample"] - end) / CAPTURE_RATE * 1000)
+                cut_lag.append((timeline.values["vad_cut_sample"] - end) / CAPTURE_RATE * 1000)
+                break
+    return onset_err, offset_err, cut_lag
+
+
+def parse_limits(items):
+    limits = {}
+    for item in items or []:
+        stage, _, value = item.partition("=")
+        limits[stage] = float(value)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default=os.path.join(ROOT, "recordings", "*.pcm"), help="Glob of pcm_22050 clips")
+    parser.add_argument("--limit", type=int, default=0, help="Only replay the first N clips")
+    parser.add_argument("--gap", type=float, default=1.5, help="Seconds of silence between clips")
+    parser.add_argument("--speed", type=float, default=1.0, help="Device clock speed-up factor")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the tail to drain")
+    parser.add_argument("--max-p95", nargs="*", metavar="STAGE=MS", help="Fail if a stage's p95 exceeds MS")
+    parser.add_argument("--max-underruns", type=int, default=None)
+    parser.add_argument("--split-pause", type=float, default=0.0, help="Split speech at pauses this long (SPLIT_PAUSE)")
+    parser.add_argument("--stream-upload", action="store_true", help="Upload while speaking (STREAM_UPLOAD=1)")
+    parser.add_argument("--noise-db", type=float, default=None, help="Add white noise at this dBFS level")
+    parser.add_argument("--barge-in", choices=["queue", "replace", "ignore"], default="queue",
+                        help="BARGE_IN policy; use a short --gap so speech overlaps playback")
+    parser.add_argument("--verbose", action="store_true", help="Show the application's own output")
+    MockConfig.add_arguments(parser)
+    args = parser.parse_args()
+
+    devices = fake_devices.install(speed=args.speed)
+    from src.audio_handler import AudioHandler  # noqa: E402
+    from src.metrics import metrics  # noqa: E402
+    from src.resampler import StreamingResampler  # noqa: E402
+
+    files = sorted(glob.glob(args.files))
+    if args.limit:
+        files = files[:args.limit]
+    if not files:
+        print("No clips found")
+        return 1
+    devices.input_signal, spans = build_signal(files, args.gap, StreamingResampler, args.noise_db, args.seed)
+    speech_seconds = len(devices.input_signal) / CAPTURE_RATE
+
+    completed = []
+    cpu_marks = []
+    done = threading.Condition()
+
+    def on_utterance(timeline):
+        with done:
+            completed.append(timeline)
+            cpu_marks.append(time.process_time())
+            done.notify_all()
+
+    metrics.subscribe(on_utterance)
+
+    server = MockServer(MockConfig.from_args(args)).start()
+    # Debug recordings go to a throwaway archive instead of next to the corpus
+    archive_dir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DEBUG_DIR": archive_dir.name,
+        "API_KEY": "mock", "VOICE_ID": "mock", "MODE": "1",
+        "ELEVENLABS_BASE_URL": server.url, "CONVERT_WORKERS": str(args.workers),
+        "STREAM_UPLOAD": "1" if args.stream_upload else "0",
+        "SPLIT_PAUSE": str(args.split_pause), "BARGE_IN": args.barge_in,
+    })
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    print(f"Replaying {len(files)} clips ({speech_seconds:.1f}s incl. gaps) at {args.speed}x against {server.url}")
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with output:
+        handler = AudioHandler.from_env()
+        handler.start_vad_mode()
+        devices.input_done.wait()
+        # Let the last utterance finish converting and playing
+        deadline = time.perf_counter() + args.timeout
+        with done:
+            while time.perf_counter() < deadline:
+                if handler.pipeline.pending == 0 and not handler.recorder.is_recording:
+                    break
+                done.wait(0.25)
+        handler.recorder.close()
+        handler.el_client.close()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    server.stop()
+
+    player = handler.el_client.player
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    n = len(completed)
+
+    print(f"\n{n} utterances converted ({len(files)} clips, {server.stats['errors']} injected errors, "
+          f"{server.stats['disconnects']} disconnects) in {wall:.1f}s\n")
+    print(metrics.format())
+    print()
+    print(f"playback underruns: {player.underruns} ({player.underrun_frames / player.samplerate * 1000:.0f}ms of silence)")
+    print(handler.recorder.stats.format(CAPTURE_RATE))
+    print(player.stats.format(player.samplerate))
+    per_utt = cpu / n * 1000 if n else float("nan")
+    print(f"CPU: {cpu:.2f}s total, {per_utt:.0f}ms per utterance, {cpu / wall * 100:.0f}% of one core")
+    print(f"peak RSS: {peak_rss_mb:.0f} MB")
+    archive = handler.el_client.debug_archive
+    if archive is not None:
+        print(f"debug archive: {archive.written} utterances written, {archive.dropped} dropped")
+    archive_dir.cleanup()
+
+    # VAD accuracy against the clip boundaries; cut lag includes the silence hangover
+    onset_err, offset_err, cut_lag = vad_accuracy(completed, spans)
+    if onset_err:
+        print(f"VAD: {len(onset_err)} of {n} cuts matched to {len(spans)} clips")
+        for name, values in (("onset error", onset_err), ("offset error", offset_err), ("cut lag", cut_lag)):
+            p50, p95 = np.percentile(values, [50, 95])
+            print(f"  {name:<13} p50 {p50:>7.1f}ms  p95 {p95:>7.1f}ms")
+    hedged = sum(1 for t in completed if t.values.get("hedged"))
+    if hedged or server.stats["errors"]:
+        won = sum(1 for t in completed if t.values.get("hedge_won"))
+        passthrough = sum(1 for t in completed if t.values.get("passthrough"))
+        print(f"resilience: {hedged} hedged ({won} won by the hedge), {passthrough} played as passthrough")
+    if handler.barge_ins:
+        # Detection (onset run + VAD block) plus the flush itself
+        flush_lags = [(flushed - devices.input_started - onset / CAPTURE_RATE / args.speed) * 1000
+                      for onset, flushed, _ in handler.barge_ins]
+        cancelled = sum(count for _, _, count in handler.barge_ins)
+        print(f"barge-in: {len(flush_lags)} interruptions cancelled {cancelled} utterances, speech onset -> output "
+              f"flushed p50 {np.percentile(flush_lags, 50):.0f}ms  max {max(flush_lags):.0f}ms")
+    lags = first_audio_lag(completed, devices.input_started, args.speed)
+    if lags:
+        # Bounded by the first part's length when long speech is split at pauses
+        print(f"speech start -> first audio: p50 {np.percentile(lags, 50):.0f}ms  max {max(lags):.0f}ms "
+              f"over {len(lags)} utterances")
+
+    failures = []
+    summary = metrics.summary()
+    for stage, limit in parse_limits(args.max_p95).items():
+        p95 = summary.get(stage, {}).get("p95")
+        if p95 is None or p95 > limit:
+            failures.append(f"{stage} p95 {p95 if p95 is None else round(p95)}ms > {limit:.0f}ms")
+    if args.max_underruns is not None and player.underruns > args.max_underruns:
+        failures.append(f"{player.underruns} underruns > {args.max_underruns}")
+    if n == 0:
+        failures.append("no utterance completed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
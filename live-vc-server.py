@@ -0,0 +1,20 @@
+import argparse
+import asyncio
+import colorama
+from dotenv import load_dotenv
+from src.server import ConversionServer
+
+load_dotenv()
+colorama.init()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ElevenLabs Live Voice Changer - headless multi-session server")
+    parser.add_argument("--host", default=None, help="Interface to listen on (default SERVER_HOST)")
+    parser.add_argument("--port", type=int, default=None, help="Port for TCP and WebSocket clients (default SERVER_PORT)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(ConversionServer.from_env(host=args.host, port=args.port).run())
+    except KeyboardInterrupt:
+        print("\nExiting gracefully...")
@@ -1,10 +1,13 @@
 import cmd
+import importlib
 import os
 import argparse
-import sounddevice as sd
-from src.audio_handler import AudioHandler
+import threading
+import time
 import colorama
 from dotenv import load_dotenv
+from src import devices
+from src.settings.audio import AudioSettings
 
 load_dotenv()
 colorama.init()
@@ -26,11 +29,7 @@ Version: 1.0.0
 
 def find_input_device(name_contains: str):
     """Find input device index by partial name match."""
-    devices = sd.query_devices()
-    for i, dev in enumerate(devices):
-        if dev['max_input_channels'] > 0 and name_contains.lower() in dev['name'].lower():
-            return i, dev['name']
-    return None, None
+    return devices.find_device(name_contains, kind="input")
 
 
 def select_input_device(args):
@@ -71,13 +70,45 @@ def select_input_device(args):
 def list_input_devices():
     """List all available input devices."""
     print(f"\n{colorama.Fore.CYAN}Available Input Devices:{colorama.Style.RESET_ALL}")
-    devices = sd.query_devices()
-    for i, dev in enumerate(devices):
+    for i, dev in enumerate(devices.query_devices()):
         if dev['max_input_channels'] > 0:
             print(f"  [{i}] {dev['name']}")
     print()
 
 
+def preload():
+    """Import the audio pipeline on a background thread while the banner shows and devices are enumerated."""
+    thread = threading.Thread(target=importlib.import_module, args=("src.audio_handler",), name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_headless(input_device=None):
+    """Convert whatever the audio input delivers, without prompt or keyboard, until it ends or Ctrl+C."""
+    from src.audio_handler import AudioHandler
+    handler = AudioHandler.from_env(input_device=input_device)
+    recorder = handler.recorder
+    if not recorder.vad_enabled:
+        # Nobody to press space: the VAD cuts the utterances
+        recorder.settings.mode = 1
+        recorder.vad_enabled = True
+        recorder.set_vad_callback(handler.process_vad_recording)
+    handler.start_vad_mode()
+    ended = getattr(recorder.stream, "ended", None)  # A microphone never ends
+    try:
+        while ended is None or not ended.is_set():
+            time.sleep(0.2)
+        # The last utterance: the VAD still has to hear silence after it, then it converts and plays
+        idle = 0
+        while idle < 2:
+            time.sleep(0.2)
+            idle = idle + 1 if not recorder.is_recording and not handler.pipeline.pending else 0
+    finally:
+        recorder.close()
+        handler.el_client.player.close()
+        handler.el_client.close()
+
+
 class ElevenlabsLiveVCCmd(cmd.Cmd):
     intro = f"""{colorama.Fore.GREEN}{banner}\n{
         description}{colorama.Style.RESET_ALL}\n"""
@@ -85,6 +116,7 @@ class ElevenlabsLiveVCCmd(cmd.Cmd):
 
     def __init__(self, input_device=None):
         super().__init__()
+        from src.audio_handler import AudioHandler  # Already loading in the background (preload)
         self.audio_handler = AudioHandler.from_env(input_device=input_device)
         
         # Start VAD mode if enabled
@@ -97,11 +129,13 @@ class ElevenlabsLiveVCCmd(cmd.Cmd):
             os.system('cls')
         else:
             os.system('clear')
-        print(self.intro)
+        print(type(self).intro)
 
     def do_quit(self, arg=None):
         """Quit the program."""
         print(f"Exiting...")
+        self.audio_handler.recorder.close()
+        self.audio_handler.el_client.close()
         return True
 
     def do_set_mode(self, arg):
@@ -137,6 +171,91 @@ class ElevenlabsLiveVCCmd(cmd.Cmd):
                     colorama.Style.RESET_ALL}"
             )
 
+    def do_set_barge_in(self, arg):
+        """What new speech does while earlier speech still plays: queue, replace or ignore."""
+        settings = self.audio_handler.recorder.settings
+        policy = arg.strip().lower()
+        if policy not in settings.valid_barge_in():
+            print(f"{colorama.Fore.YELLOW}Invalid policy. Please enter queue, replace or ignore.{colorama.Style.RESET_ALL}")
+            return
+        settings.barge_in = policy
+        print(f"{colorama.Fore.GREEN}Barge-in set to {policy}.{colorama.Style.RESET_ALL}")
+
+    def do_get_barge_in(self, arg):
+        """Get the current barge-in policy."""
+        print(f"Current barge-in policy is {self.audio_handler.recorder.settings.barge_in}.")
+
+    def do_play(self, arg):
+        """Play an audio file through the voice changer, e.g. a soundboard clip (cached after the first time)."""
+        path = arg.strip()
+        if not os.path.isfile(path):
+            print(f"{colorama.Fore.YELLOW}File not found: {path}{colorama.Style.RESET_ALL}")
+            return
+        self.audio_handler.play_clip(path)
+
+    def do_prerender(self, arg):
+        """Convert a phrase list (.txt of paths), a folder or a file into the cache without playing it."""
+        path = arg.strip()
+        if not os.path.exists(path):
+            print(f"{colorama.Fore.YELLOW}Not found: {path}{colorama.Style.RESET_ALL}")
+            return
+        self.audio_handler.prerender(path)
+        cache = self.audio_handler.el_client.cache
+        if cache is not None:
+            print(f"cache: {len(cache)} clips, {cache.size / 1024 / 1024:.1f} of {cache.max_bytes / 1024 / 1024:.0f} MB")
+
+    def do_stats(self, arg):
+        """Show per-stage latency percentiles. 'stats prom' prints Prometheus text format."""
+        from src.metrics import metrics
+        if arg.strip() == "prom":
+            print(metrics.prometheus_text(), end="")
+            return
+        print(metrics.format())
+        processor = self.audio_handler.processor
+        print(
+            f"trimmed {processor.trimmed_seconds:.1f}s / {processor.trimmed_bytes / 1024:.0f} KB, "
+            f"uploaded {processor.encoded_bytes / 1024:.0f} KB, encoding took {processor.encode_seconds * 1000:.0f}ms"
+        )
+        if processor.denoised_audio_seconds:
+            per_second = processor.denoise_seconds / processor.denoised_audio_seconds * 1000
+            print(f"denoised {processor.denoised_audio_seconds:.1f}s of audio, {per_second:.1f}ms per second")
+
+    def do_xruns(self, arg):
+        """Show input overflows, output underflows and audio callback timings."""
+        recorder = self.audio_handler.recorder
+        player = self.audio_handler.el_client.player
+        print(recorder.stats.format(recorder.settings.sample_rate))
+        print(player.stats.format(player.samplerate))
+        print(f"playback buffer underruns: {player.underruns} ({player.underrun_frames} frames of silence inserted)")
+
+    def do_devices(self, arg):
+        """List input and output devices. 'devices refresh' re-scans after plugging a device in or out."""
+        recorder = self.audio_handler.recorder
+        player = self.audio_handler.el_client.player
+        if arg.strip() == "refresh":
+            # Indices can shift, so the devices in use are found again by name
+            input_name = devices.device_name(recorder.settings.input_device) if recorder.settings.input_device is not None else None
+            output_name = devices.device_name(player.device) if player.device is not None else None
+            recorder.close()
+            player.close()
+            devices.refresh()
+            if input_name is not None:
+                recorder.settings.input_device = devices.find_device(input_name, kind="input")[0]
+                if recorder.settings.input_device is None:
+                    print(f"{colorama.Fore.YELLOW}{input_name} is gone, using the default input{colorama.Style.RESET_ALL}")
+            if output_name is not None:
+                player.device = devices.find_device(output_name, kind="output")[0]
+                if player.device is None:
+                    print(f"{colorama.Fore.YELLOW}{output_name} is gone, using the default output{colorama.Style.RESET_ALL}")
+            # The output stream reopens with the next playback
+            recorder.open()
+            if recorder.vad_enabled:
+                recorder.start_continuous()
+        for i, dev in enumerate(devices.query_devices()):
+            kinds = "/".join(kind for kind, key in (("in", "max_input_channels"), ("out", "max_output_channels")) if dev[key] > 0)
+            used = " *" if i in (recorder.settings.input_device, player.device) else ""
+            print(f"  [{i}] {dev['name']} ({kinds}){used}")
+
     def do_get_mode(self, arg):
         """Get the current mode (1 = automatic, 0 = manual)."""
         mode_str = "automatic (VAD)" if self.audio_handler.recorder.settings.mode == 1 else "manual (press space)"
@@ -148,15 +267,47 @@ if __name__ == "__main__":
     parser.add_argument("--microphone", action="store_true", help="Use Microphone Array as input")
     parser.add_argument("--wo-mic", action="store_true", help="Use WO Mic as input")
     parser.add_argument("--list-devices", action="store_true", help="List available input devices and exit")
+    parser.add_argument("--headless", action="store_true",
+                        help="No prompt or keyboard: convert AUDIO_INPUT with the VAD until it ends (implied by AUDIO_INPUT=pipe:-)")
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser("batch", help="Convert folders of recordings instead of the microphone")
+    batch.add_argument("inputs", nargs="+", help="Directories, globs (e.g. 'recordings/*.pcm') or files")
+    batch.add_argument("--out", default=None, help="Output directory (default BATCH_OUTPUT_DIR)")
+    batch.add_argument("--workers", type=int, default=None, help="Files converted at once (default BATCH_WORKERS)")
+    batch.add_argument("--manifest", default=None, help="Resume manifest (default <out>/manifest.jsonl)")
+    batch.add_argument("--voice-id", default=None, help="Voice to convert into (default VOICE_ID)")
     args = parser.parse_args()
     
     if args.list_devices:
         list_input_devices()
         exit(0)
+
+    if args.command == "batch":
+        from src.batch import BatchConverter
+        converter = BatchConverter.from_env(workers=args.workers, output_dir=args.out, manifest=args.manifest,
+                                            voice_id=args.voice_id)
+        try:
+            totals = converter.run(args.inputs)
+        finally:
+            converter.close()
+        exit(130 if totals["interrupted"] else 1 if totals["failed"] else 0)
     
+    settings = AudioSettings.from_env()
+    if settings.audio_output in ("pipe", "pipe:-"):
+        from src.audio_io import reserve_stdout
+        reserve_stdout()  # Converted audio goes to stdout, everything printed to stderr
+    # stdin carrying the audio leaves no prompt to type into
+    headless = args.headless or settings.audio_input in ("pipe", "pipe:-")
+
     try:
-        input_device = select_input_device(args)
-        ElevenlabsLiveVCCmd(input_device=input_device).cmdloop()
+        # Banner first; the pipeline imports meanwhile and device discovery overlaps them
+        print(ElevenlabsLiveVCCmd.intro)
+        preload()
+        input_device = select_input_device(args) if settings.audio_input == "sounddevice" else None
+        if headless:
+            run_headless(input_device)
+            exit(0)
+        ElevenlabsLiveVCCmd(input_device=input_device).cmdloop(intro="")
     except KeyboardInterrupt:
         print("\nExiting gracefully...")
         exit(0)
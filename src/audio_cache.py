@@ -0,0 +1,129 @@
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from src.audio_processor import decode_upload
+from src.settings.cache import CacheSettings
+
+SILENCE = 64  # int16 level (about -54 dBFS) below which leading and trailing samples are padding
+
+
+def fingerprint(upload: bytes) -> bytes:
+    """Normalized input PCM: sample rate plus mono int16 samples with the silent padding stripped.
+
+    The same clip in another lossless container (WAV or FLAC), as stereo with
+    identical channels, or with different silence around it gives the same
+    bytes. Anything that changes the samples themselves (resampling, gain,
+    lossy coding) is a different clip.
+    """
+    samples, rate = decode_upload(upload)
+    mono = samples[:, 0] if samples.shape[1] == 1 else np.round(samples.mean(axis=1)).astype(np.int16)
+    audible = np.flatnonzero(np.abs(mono.astype(np.int32)) > SILENCE)
+    if len(audible) == 0:
+        return b""
+    return rate.to_bytes(4, "little") + mono[audible[0]:audible[-1] + 1].astype("<i2").tobytes()
+
+
+class AudioCache:
+    """Converted audio on disk, keyed by what was said and how it was converted.
+
+    Each entry is one raw response file named after its key, so a hit can be
+    memory-mapped and streamed straight to playback. The index (key -> bytes,
+    least recently used first) is kept in memory and rebuilt from the
+    directory at startup using file modification times, which get() refreshes.
+    put() evicts the oldest entries beyond max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".pcm"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+    @classmethod
+    def from_env(cls):
+        """The configured cache, or None when CACHE_MAX_MB is 0."""
+        settings = CacheSettings.from_env()
+        if settings.max_mb <= 0:
+            return None
+        return cls(settings.directory, int(settings.max_mb * 1024 * 1024))
+
+    @staticmethod
+    def key(upload: bytes, voice_id, model_id, output_format) -> str:
+        digest = hashlib.sha256(fingerprint(upload))
+        digest.update(f"|{voice_id}|{model_id}|{output_format}".encode())
+        return digest.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def get(self, key: str):
+        """Memory-map a cached response (read-only), or None on a miss. The caller closes it."""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (OSError, ValueError):
+            # Deleted behind our back
+            with self._lock:
+                self._size -= self._index.pop(key, 0)
+            return None
+        return mapped
+
+    def put(self, key: str, data: bytes):
+        """Store a response and evict least recently used entries beyond max_bytes."""
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            victims = []
+            while self._size > self.max_bytes and len(self._index) > 1:
+                victim, size = self._index.popitem(last=False)
+                self._size -= size
+                victims.append(victim)
+        for victim in victims:
+            try:
+                os.remove(self._path(victim))
+            except OSError:
+                pass  # Still mapped by a playback (Windows); its bytes are no longer counted
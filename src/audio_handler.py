@@ -4,83 +4,177 @@ import threading
 import time
 import os
 import glob
+from io import BytesIO
 from src.audio_processor import AudioProcessor
 from src.audio_recorder import AudioRecorder
 from src.el_client import ElevenLabsClient
+from src.fanout import VoiceFanout
+from src.metrics import Timeline, metrics
+from src.pipeline import ConversionPipeline
 
 
 class AudioHandler:
-    def __init__(self, recorder: AudioRecorder, processor: AudioProcessor, el_client: ElevenLabsClient):
+    def __init__(self, recorder: AudioRecorder, processor: AudioProcessor, el_client: ElevenLabsClient,
+                 fanout: VoiceFanout = None):
         self.recorder = recorder
         self.processor = processor
         self.el_client = el_client
-        self.is_processing = False  # Prevent overlapping processing
+        metrics.configure(
+            jsonl_path=recorder.settings.metrics_jsonl,
+            prometheus_path=recorder.settings.metrics_prometheus,
+            window=recorder.settings.metrics_window
+        )
+        # Capture keeps going while earlier utterances convert and play
+        self.pipeline = ConversionPipeline(processor, el_client, recorder.settings, fanout)
         
+        # Open the input now in both modes; opened on the first SPACE press, PortAudio's
+        # start-up delay would clip the beginning of the first push-to-talk utterance
+        self.recorder.open()
+
         # Set up keyboard handler for manual mode
         keyboard.on_press_key("space", self.handle_recording)
         
         # Set up VAD callback for automatic mode
         if self.recorder.vad_enabled:
             self.recorder.set_vad_callback(self.process_vad_recording)
-        
-        # Start cleanup thread
-        self._start_cleanup_thread()
+
+        # Speech start: barge-in policy, then the streaming upload if enabled
+        self.recorder.start_callback = self._on_speech_start
+        if recorder.settings.barge_in not in recorder.settings.valid_barge_in():
+            print(f"{colorama.Fore.YELLOW}Unknown BARGE_IN '{recorder.settings.barge_in}', using queue{colorama.Style.RESET_ALL}")
+            recorder.settings.barge_in = "queue"
+        self._ignoring = False  # The current speech started over playback and is dropped (BARGE_IN=ignore)
+        self.barge_ins = []  # (onset sample, perf_counter() when the output was flushed, utterances cancelled)
+
+        # Streaming upload: the request opens when speech starts and the body follows the capture
+        self._live = None  # (Utterance, LiveWavStream) currently being uploaded
+        self._live_lock = threading.Lock()
+        if processor.denoiser is not None:
+            # The denoiser subtracts the noise heard between utterances
+            self.recorder.noise_profile = processor.denoiser.profile
+        if recorder.settings.stream_upload:
+            if processor.denoiser is not None:
+                print(f"{colorama.Fore.YELLOW}STREAM_UPLOAD sends the capture as it is recorded; DENOISE only applies to buffered uploads{colorama.Style.RESET_ALL}")
+            if processor.upload_format != "wav" or processor.upload_rate != recorder.settings.sample_rate:
+                print(f"{colorama.Fore.YELLOW}STREAM_UPLOAD sends WAV at the capture rate; UPLOAD_FORMAT/UPLOAD_SAMPLE_RATE are ignored{colorama.Style.RESET_ALL}")
 
     @classmethod
     def from_env(cls, input_device=None):
-        return cls(
-            AudioRecorder.from_env(input_device=input_device),
-            AudioProcessor.from_env(),
-            ElevenLabsClient.from_env()
-        )
-
-    def _start_cleanup_thread(self):
-        """Start background thread to clean up old recordings."""
-        def cleanup_loop():
-            recordings_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "recordings")
-            while True:
-                time.sleep(60)  # Check every minute
-                try:
-                    if os.path.exists(recordings_dir):
-                        now = time.time()
-                        for filepath in glob.glob(os.path.join(recordings_dir, "transformed_*.mp3")):
-                            file_age = now - os.path.getmtime(filepath)
-                            if file_age > 600:  # 10 minutes = 600 seconds
-                                os.remove(filepath)
-                                print(f"{colorama.Fore.YELLOW}[Cleanup] Deleted old recording: {os.path.basename(filepath)}{colorama.Style.RESET_ALL}")
-                except Exception as e:
-                    pass  # Silently ignore cleanup errors
-        
-        cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
-        cleanup_thread.start()
+        recorder = AudioRecorder.from_env(input_device=input_device)
+        processor = AudioProcessor.from_env()
+        el_client = ElevenLabsClient.from_env()
+        return cls(recorder, processor, el_client, VoiceFanout.from_env(el_client))
 
     def process_vad_recording(self):
-        """Process recording after VAD detects silence."""
-        if self.is_processing:
-            return
+        """Queue recording after VAD detects silence and keep listening."""
         self._process_audio()
-        # Restart listening after processing
-        if self.recorder.vad_enabled:
-            time.sleep(0.5)  # Brief pause before restarting
+        # After a split at a pause the VAD is still inside the utterance
+        if self.recorder.vad_enabled and not self.recorder.audio_continues:
             self.recorder.start_continuous()
 
-    def _process_audio(self):
-        """Common audio processing logic."""
-        self.is_processing = True
-        try:
-            audio = self.recorder.get_audio_data()
-            audio_stream = self.processor.get_audio_stream(audio)
-            if audio_stream is None:
-                print(f"{colorama.Fore.YELLOW}No audio recorded. Try speaking longer.{colorama.Style.RESET_ALL}")
+    def _on_speech_start(self, start, onset):
+        """New speech while earlier utterances are still converting or playing: apply BARGE_IN."""
+        settings = self.recorder.settings
+        self._ignoring = False
+        if self.pipeline.pending:
+            if settings.barge_in == "replace":
+                cancelled = self.pipeline.cancel_all()
+                if cancelled:
+                    self.barge_ins.append((onset, time.perf_counter(), cancelled))
+                    print(f"{colorama.Fore.YELLOW}[Barge-in] Cancelled {cancelled} pending utterance(s){colorama.Style.RESET_ALL}")
+            elif settings.barge_in == "ignore":
+                self._ignoring = True
+                print(f"{colorama.Fore.YELLOW}[Barge-in] Still playing, ignoring this speech{colorama.Style.RESET_ALL}")
                 return
-            self.el_client.convert_audio(audio_stream)
-        finally:
-            self.is_processing = False
+        if settings.stream_upload:
+            self._open_live_upload(start, onset)
+
+    def _open_live_upload(self, start, onset):
+        """Submit the utterance as soon as speech starts and upload it while it is recorded."""
+        settings = self.recorder.settings
+        if settings.trim_silence:
+            # Skip the pre-buffer lead-in up front; the tail is trimmed once the end is known
+            start = max(start, onset - int(settings.trim_margin * settings.sample_rate))
+        with self._live_lock:
+            if self._live is not None:
+                return
+            timeline = Timeline()
+            stream = self.processor.open_live(self.recorder.ring, start, timeline)
+            utterance = self.pipeline.submit(stream, timeline)
+            if utterance is not None:
+                self._live = (utterance, stream)
+
+    def _finish_live_upload(self, utterance, stream, audio, continues):
+        """Close the live request body at the end of the utterance (or of one part of it)."""
+        settings = self.recorder.settings
+        timeline = self.recorder.timeline
+        end = audio.end if audio is not None else self.recorder.ring.position
+        offset = timeline.values.get("vad_offset_sample")
+        if settings.trim_silence and offset is not None:
+            end = min(end, offset + int(settings.trim_margin * settings.sample_rate))
+        # Marks from the cut (speech_end, vad_decision) join the ones made when the request opened
+        utterance.timeline.marks.update(timeline.marks)
+        utterance.timeline.values.update(timeline.values)
+        utterance.timeline.set("audio_seconds", (end - stream.start) / settings.sample_rate)
+        utterance.captured_at = time.time()
+        utterance.continues = continues
+        stream.finish(end)
+        if continues and audio is not None:
+            # The next part streams from the split point
+            self._open_live_upload(audio.end, audio.end)
+
+    def _process_audio(self):
+        """Hand the captured utterance to the conversion pipeline."""
+        audio = self.recorder.get_audio_data()
+        continues = self.recorder.audio_continues
+        if self._ignoring:
+            # Dropped under BARGE_IN=ignore, including the remaining parts of a split utterance
+            self._ignoring = continues
+            return
+        with self._live_lock:
+            live, self._live = self._live, None
+        if live is not None:
+            self._finish_live_upload(*live, audio, continues)
+            return
+        if audio is None or len(audio) == 0:
+            print(f"{colorama.Fore.YELLOW}No audio recorded. Try speaking longer.{colorama.Style.RESET_ALL}")
+            return
+        self.pipeline.submit(audio, self.recorder.timeline, continues)
+
+    @staticmethod
+    def phrase_files(path):
+        """Clips named by path: a directory of audio files, a .txt list (one path per line) or one file."""
+        if os.path.isdir(path):
+            return sorted(p for p in glob.glob(os.path.join(path, "*"))
+                          if os.path.splitext(p)[1].lower() in (".wav", ".flac", ".ogg", ".mp3"))
+        if path.lower().endswith(".txt"):
+            base = os.path.dirname(path)
+            with open(path) as f:
+                lines = [line.strip() for line in f]
+            return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+        return [path]
+
+    def play_clip(self, path):
+        """Convert and play an audio file in turn with live speech; repeats come from the cache."""
+        with open(path, "rb") as f:
+            audio = BytesIO(f.read())
+        audio.name = os.path.basename(path)  # Extension tells the API the format
+        self.pipeline.submit(audio, cache=True)
+
+    def prerender(self, path):
+        """Fill the cache with the converted clips named by path, without playing them."""
+        files = self.phrase_files(path)
+        # Every voice of a fan-out has its own cache entries
+        voice_ids = [v.voice_id for v in self.pipeline.fanout.voices] if self.pipeline.fanout else [None]
+        cached = converted = failed = 0
+        for voice_id in voice_ids:
+            counts = self.el_client.prerender(files, workers=self.recorder.settings.convert_workers, voice_id=voice_id)
+            cached, converted, failed = cached + counts[0], converted + counts[1], failed + counts[2]
+        voices = f" x {len(voice_ids)} voices" if len(voice_ids) > 1 else ""
+        print(f"{colorama.Fore.GREEN}Pre-rendered {len(files)} clips{voices}: {converted} converted, {cached} already cached, "
+              f"{failed} failed{colorama.Style.RESET_ALL}")
 
     def handle_recording(self, event):
-        if self.is_processing:
-            return  # Ignore if already processing
-            
         if self.recorder.is_recording:
             print(
                 f"\n{colorama.Fore.GREEN}Recording stopped, processing audio...{
@@ -106,3 +200,5 @@ class AudioHandler:
             print(f"{colorama.Fore.CYAN}Speak naturally - recording starts/stops automatically{colorama.Style.RESET_ALL}")
             print(f"{colorama.Fore.CYAN}Press SPACE to manually trigger, Ctrl+C to exit{colorama.Style.RESET_ALL}")
             self.recorder.start_continuous()
+            # Keep a warm connection ready for the next utterance while listening
+            self.el_client.start_keepalive(lambda: self.recorder.listening)
@@ -0,0 +1,251 @@
+import abc
+import os
+import sys
+import threading
+import time
+import colorama
+import numpy as np
+
+BLOCK_SECONDS = 0.01  # Callback block of the non-sounddevice backends
+_stdout = None  # Duplicate of fd 1 kept for audio once pipe:- output is used
+
+
+def reserve_stdout():
+    """Keep stdout for audio: from now on fd 1 (and so every print) goes to stderr. Returns the audio file."""
+    global _stdout
+    if _stdout is None:
+        sys.stdout.flush()
+        _stdout = os.fdopen(os.dup(1), "wb", buffering=0)
+        os.dup2(2, 1)
+    return _stdout
+
+
+def parse_spec(spec: str):
+    """'file:take.pcm' -> ('file', 'take.pcm'); 'null' -> ('null', None)."""
+    kind, _, target = (spec or "sounddevice").partition(":")
+    return kind.strip().lower(), target or None
+
+
+def valid_inputs():
+    return ["sounddevice", "file", "pipe"]
+
+
+def valid_outputs():
+    return ["sounddevice", "pipe", "null"]
+
+
+def open_input(spec, callback, channels, samplerate, device=None, pace=1.0):
+    """An input stream for AUDIO_INPUT calling callback(indata, frames, time, status) like sd.InputStream."""
+    kind, target = parse_spec(spec)
+    if kind == "file":
+        return FileSource(target, callback, channels, samplerate, pace)
+    if kind == "pipe":
+        return PipeSource(target or "-", callback, channels, samplerate, pace)
+    if kind != "sounddevice":
+        raise ValueError(f"Unknown AUDIO_INPUT '{spec}' (use {', '.join(valid_inputs())})")
+    import sounddevice as sd  # Loaded with the first stream, off the import path
+    return sd.InputStream(callback=callback, channels=channels, samplerate=samplerate, dtype='float32', device=device)
+
+
+def open_output(spec, callback, channels, samplerate, device=None, pace=1.0):
+    """An output stream for AUDIO_OUTPUT pulling callback(outdata, frames, time, status) like sd.OutputStream."""
+    kind, target = parse_spec(spec)
+    if kind == "pipe":
+        return PipeSink(target or "-", callback, channels, samplerate, pace)
+    if kind == "null":
+        return NullSink(callback, channels, samplerate, pace)
+    if kind != "sounddevice":
+        raise ValueError(f"Unknown AUDIO_OUTPUT '{spec}' (use {', '.join(valid_outputs())})")
+    import sounddevice as sd  # Not needed (or loaded) until there is something to play
+    return sd.OutputStream(callback=callback, channels=channels, samplerate=samplerate, dtype='float32',
+                           device=device, latency='low')
+
+
+class ClockedStream(abc.ABC):
+    """A stream whose callback runs on its own thread, every block, at pace times real time.
+
+    Has the parts of a sounddevice stream the recorder and player use:
+    start(), stop(), close() and latency. ended is set once a source has
+    delivered all of its input, or a sink can no longer write.
+    """
+
+    def __init__(self, callback, channels, samplerate, pace=1.0):
+        self.callback = callback
+        self.channels = channels
+        self.samplerate = samplerate
+        self.blocksize = int(samplerate * BLOCK_SECONDS)
+        self.pace = pace if pace > 0 else 1.0
+        self.latency = self.blocksize / samplerate
+        self.ended = threading.Event()
+        self.active = False
+        self._thread = None
+
+    def start(self):
+        self.active = True
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.stop()
+
+    def _run(self):
+        try:
+            self._open()
+            self._feed()
+            period = self.blocksize / self.samplerate / self.pace
+            next_due = time.perf_counter()
+            while self.active:
+                self._tick()
+                next_due += period
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -period:
+                    next_due = time.perf_counter()  # Fell behind (e.g. a full pipe): don't catch up in a burst
+        except OSError as e:
+            print(f"{colorama.Fore.RED}[Audio I/O] {type(self).__name__}: {e}{colorama.Style.RESET_ALL}")
+            self.ended.set()
+        finally:
+            self._close()
+
+    def _open(self):
+        pass
+
+    def _feed(self):
+        """Runs before the clock starts: a pipe source reads here while its writer sets the pace."""
+
+    @abc.abstractmethod
+    def _tick(self):
+        """One block: a source hands it to the callback, a sink pulls it from the callback."""
+
+    def _close(self):
+        pass
+
+
+class FileSource(ClockedStream):
+    """Replays a raw int16 PCM file (SAMPLE_RATE, CHANNELS) as the microphone, then silence.
+
+    The file is memory-mapped and each block is a view into the mapping, so
+    the capture ring's copy is the only one.
+    """
+
+    def __init__(self, path, callback, channels, samplerate, pace=1.0):
+        super().__init__(callback, channels, samplerate, pace)
+        self.path = path
+        self.position = 0
+        self._pcm = None
+        self._silence = np.zeros((self.blocksize, channels), dtype=np.int16)
+
+    def _open(self):
+        if self._pcm is None:
+            frames = os.path.getsize(self.path) // (2 * self.channels)
+            self._pcm = np.memmap(self.path, dtype="<i2", mode="r", shape=(frames, self.channels)) if frames else self._silence[:0]
+
+    def _tick(self):
+        block = self._pcm[self.position:self.position + self.blocksize]
+        self.position += len(block)
+        if len(block) == 0:
+            self.ended.set()
+            block = self._silence  # Like a quiet room, so the VAD can close the last utterance
+        self.callback(block, len(block), None, None)
+
+
+class PipeSource(ClockedStream):
+    """Raw int16 PCM (SAMPLE_RATE, CHANNELS) read from stdin ('-') or a named pipe, then silence.
+
+    The writer sets the pace until the pipe closes. Blocks are read straight
+    into one preallocated buffer.
+    """
+
+    def __init__(self, path, callback, channels, samplerate, pace=1.0):
+        super().__init__(callback, channels, samplerate, pace)
+        self.path = path
+        self._file = None
+        self._block = np.zeros((self.blocksize, channels), dtype=np.int16)
+
+    def _open(self):
+        # Opening a named pipe waits for its writer, so it happens here rather than in start()
+        self._file = sys.stdin.buffer if self.path == "-" else open(self.path, "rb")
+
+    def _feed(self):
+        frame = 2 * self.channels
+        view = memoryview(self._block.view(np.uint8).reshape(-1))
+        carry = 0  # Bytes of a frame cut off by the previous read
+        while self.active:
+            n = self._file.readinto1(view[carry:])  # Whatever has arrived, up to a block
+            if not n:
+                break
+            whole = (carry + n) // frame * frame
+            if whole:
+                self.callback(self._block[:whole // frame], whole // frame, None, None)
+            carry = carry + n - whole
+            view[:carry] = view[whole:whole + carry]
+        self.ended.set()
+        self._block[:] = 0
+
+    def _tick(self):
+        # The pipe has closed
+        self.callback(self._block, self.blocksize, None, None)
+
+    def _close(self):
+        if self._file is not None and self.path != "-":
+            self._file.close()
+
+
+class PipeSink(ClockedStream):
+    """Writes the output as raw int16 PCM to stdout ('-') or a named pipe, silence included.
+
+    A reader that cannot keep up slows the clock down instead of losing audio.
+    """
+
+    def __init__(self, path, callback, channels, samplerate, pace=1.0):
+        super().__init__(callback, channels, samplerate, pace)
+        self.path = path
+        self._file = None
+        self._block = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self._pcm = np.zeros((self.blocksize, channels), dtype="<i2")
+        self._bytes = memoryview(self._pcm.view(np.uint8).reshape(-1))
+
+    def _open(self):
+        # Opening a named pipe waits for its reader, so it happens here rather than in start()
+        self._file = reserve_stdout() if self.path == "-" else open(self.path, "wb", buffering=0)
+
+    def _tick(self):
+        self.callback(self._block, self.blocksize, None, None)
+        np.clip(self._block, -1.0, 1.0, out=self._block)
+        np.multiply(self._block, 32767, out=self._pcm, casting="unsafe")
+        self._file.write(self._bytes)
+
+    def _close(self):
+        if self._file is not None and self.path != "-":
+            self._file.close()
+
+
+class NullSink(ClockedStream):
+    """Pulls the output at pace and only counts it: for hardware-free runs and benchmarks."""
+
+    def __init__(self, callback, channels, samplerate, pace=1.0):
+        super().__init__(callback, channels, samplerate, pace)
+        self.frames = 0
+        self.audio_frames = 0  # Frames that were not silence
+        self.first_audio = None  # perf_counter() of the first block with audio
+        self._block = np.zeros((self.blocksize, channels), dtype=np.float32)
+
+    def _tick(self):
+        self.callback(self._block, self.blocksize, None, None)
+        self.frames += self.blocksize
+        audio = int(np.count_nonzero(self._block.any(axis=1)))
+        if audio:
+            self.audio_frames += audio
+            if self.first_audio is None:
+                self.first_audio = time.perf_counter()
+
+    def close(self):
+        super().close()
+        print(f"{colorama.Fore.CYAN}[Null output] {self.frames / self.samplerate:.1f}s pulled, "
+              f"{self.audio_frames / self.samplerate:.1f}s of it audio{colorama.Style.RESET_ALL}")
@@ -0,0 +1,177 @@
+import threading
+import time
+import numpy as np
+
+from src.audio_io import open_output
+from src.audio_stats import CallbackStats
+
+
+class RingBuffer:
+    """Thread-safe float32 ring buffer shared between a writer thread and the audio callback."""
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = capacity
+        self.channels = channels
+        self._buf = np.zeros((capacity, channels), dtype=np.float32)
+        self._read = 0
+        self._write = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+    @property
+    def available(self) -> int:
+        """Number of frames waiting to be read."""
+        return self._count
+
+    def write(self, samples: np.ndarray, timeout=None) -> int:
+        """Append samples, blocking while the buffer is full. Returns frames written."""
+        samples = samples.reshape(len(samples), -1)
+        written = 0
+        total = len(samples)
+        while written < total:
+            with self._not_full:
+                while self._count == self.capacity:
+                    if not self._not_full.wait(timeout):
+                        return written
+                n = min(total - written, self.capacity - self._count)
+                first = min(n, self.capacity - self._write)
+                self._buf[self._write:self._write + first] = samples[written:written + first]
+                if n > first:
+                    self._buf[:n - first] = samples[written + first:written + n]
+                self._write = (self._write + n) % self.capacity
+                self._count += n
+                written += n
+        return written
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Copy up to len(out) frames into out without blocking. Returns frames copied."""
+        with self._lock:
+            n = min(len(out), self._count)
+            if n == 0:
+                return 0
+            first = min(n, self.capacity - self._read)
+            out[:first] = self._buf[self._read:self._read + first]
+            if n > first:
+                out[first:n] = self._buf[:n - first]
+            self._read = (self._read + n) % self.capacity
+            self._count -= n
+            self._not_full.notify_all()
+        return n
+
+    def clear(self):
+        """Drop everything that has not been played yet."""
+        with self._lock:
+            self._read = self._write = self._count = 0
+            self._not_full.notify_all()
+
+
+class AudioPlayer:
+    """Gapless playback through one long-lived output stream (see audio_io) fed by a ring buffer."""
+
+    _players = {}
+    _players_lock = threading.Lock()
+
+    def __init__(self, device=None, samplerate=48000, channels=1, buffer_seconds=30.0, backend="sounddevice", pace=1.0):
+        self.device = device
+        self.backend = backend  # AUDIO_OUTPUT
+        self.pace = pace
+        self.samplerate = samplerate
+        self.channels = channels
+        self.buffer = RingBuffer(int(buffer_seconds * samplerate), channels)
+        self.stream = None
+
+        # Underrun accounting: the buffer ran dry while an utterance was still streaming
+        self.underruns = 0
+        self.underrun_frames = 0
+        # Device-level xruns reported by PortAudio plus callback timing
+        self.stats = CallbackStats("playback")
+
+        self._active = False  # Utterance audio has been written and not yet drained
+        self._ending = False  # Writer is done, drain what is left then signal
+        self._drained = threading.Event()
+        self._drained.set()
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def for_device(cls, device=None, samplerate=48000, channels=1, backend="sounddevice", pace=1.0):
+        """Return the shared player for an output device, creating it on first use."""
+        key = (device, samplerate, channels, backend)
+        with cls._players_lock:
+            player = cls._players.get(key)
+            if player is None:
+                player = cls(device=device, samplerate=samplerate, channels=channels, backend=backend, pace=pace)
+                cls._players[key] = player
+            return player
+
+    def start(self):
+        """Open and start the output stream if it is not running yet."""
+        with self._start_lock:
+            if self.stream is not None:
+                return
+            self.stream = open_output(
+                self.backend,
+                self._callback,
+                channels=self.channels,
+                samplerate=self.samplerate,
+                device=self.device,
+                pace=self.pace
+            )
+            self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        t0 = time.perf_counter()
+        n = self.buffer.read_into(outdata)
+        if n < frames:
+            outdata[n:] = 0
+            self._on_short_read(frames - n)
+        self.stats.record(status, frames, time.perf_counter() - t0)
+
+    def _on_short_read(self, missing):
+        if not self._active:
+            return
+        if self._ending:
+            # Writer finished and the tail has now been handed to the device
+            self._active = False
+            self._ending = False
+            self._drained.set()
+        else:
+            # Still streaming but the network fell behind: pad with silence
+            self.underruns += 1
+            self.underrun_frames += missing
+
+    def latency(self) -> float:
+        """Seconds until a sample written now is heard: queued audio plus device output latency."""
+        device = self.stream.latency if self.stream is not None else 0.0
+        return self.buffer.available / self.samplerate + device
+
+    def write(self, samples: np.ndarray):
+        """Queue decoded samples for playback as soon as they arrive."""
+        if len(samples) == 0:
+            return
+        self.start()
+        self._drained.clear()
+        self._active = True
+        self.buffer.write(samples)
+
+    def wait(self, timeout=None) -> bool:
+        """Block until everything written so far has been played."""
+        if not self._active:
+            return True
+        self._ending = True
+        return self._drained.wait(timeout)
+
+    def flush(self):
+        """Discard queued audio immediately."""
+        self.buffer.clear()
+        self._ending = False
+        self._active = False
+        self._drained.set()
+
+    def close(self):
+        with self._start_lock:
+            if self.stream is not None:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+        self.flush()
@@ -1,24 +1,434 @@
+import io
+import struct
+import threading
+import time
 import numpy as np
-from io import BytesIO
-from scipy.io.wavfile import write
+import colorama
 
+from src.capture_buffer import CaptureRing, CaptureSlice, to_int16
+from src.denoise import SpectralDenoiser
+from src.metrics import Timeline
+from src.resampler import StreamingResampler
 from src.settings.audio import AudioSettings
 
+try:
+    import soundfile as sf  # FLAC/Opus upload encodings
+except (ImportError, OSError):
+    sf = None
+
+# soundfile (format, subtype, upload filename) per compressed upload format
+COMPRESSED_FORMATS = {
+    "flac": ("FLAC", "PCM_16", "audio.flac"),
+    "opus": ("OGG", "OPUS", "audio.ogg"),
+}
+
+
+def wav_header(sample_rate: int, channels: int, data_bytes: int, bits: int = 16) -> bytes:
+    """Canonical 44-byte PCM WAV header."""
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", data_bytes
+    )
+
+
+class PCMWavStream(io.RawIOBase):
+    """Read-only WAV file assembled from a header and int16 buffers, without concatenating them.
+
+    The parts are typically views into the capture ring; reads copy straight
+    from them into the caller's buffer. If the source is a CaptureSlice the
+    ring is checked after every read so an overwritten range fails loudly.
+    """
+
+    def __init__(self, header: bytes, parts, source: CaptureSlice = None):
+        self._parts = [memoryview(header)] + [memoryview(np.ascontiguousarray(p)).cast("B") for p in parts]
+        self._size = sum(len(p) for p in self._parts)
+        self._pos = 0
+        self._source = source
+        self.name = "audio.wav"  # Filename for the multipart upload
+
+    def clone(self) -> "PCMWavStream":
+        """Independent reader over the same buffers (for a retried or hedged request)."""
+        clone = PCMWavStream(b"", [], self._source)
+        clone._parts, clone._size = self._parts, self._size
+        return clone
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, min(offset, self._size))
+        return self._pos
+
+    def readinto(self, b):
+        out = memoryview(b).cast("B")
+        written = 0
+        base = 0
+        for part in self._parts:
+            end = base + len(part)
+            if self._pos < end and written < len(out):
+                lo = self._pos - base
+                n = min(len(part) - lo, len(out) - written)
+                out[written:written + n] = part[lo:lo + n]
+                written += n
+                self._pos += n
+            base = end
+        if self._source is not None and written:
+            self._source.ring.check(self._source.start)
+        return written
+
+    def __len__(self):
+        return self._size
+
+
+class LiveWavStream(io.RawIOBase):
+    """WAV upload body read from the capture ring while the utterance is still being recorded.
+
+    The length is unknown when the request opens, so the header carries the
+    streaming sizes (0xFFFFFFFF). read() blocks until new samples have been
+    captured and returns EOF once finish() has set the end index and
+    everything up to it has been sent. Not seekable: the body can be sent once.
+    """
+
+    poll = 0.02  # Seconds between checks of the capture position
+    stall_timeout = 2.0  # No new samples for this long means capture stopped; end the body
+
+    def __init__(self, ring: CaptureRing, start: int, header: bytes, timeline: Timeline = None):
+        self.ring = ring
+        self.start = start
+        self.end = None
+        self.timeline = timeline or Timeline()
+        self.sent_bytes = 0
+        self.name = "audio.wav"  # Filename for the multipart upload
+        self._header = memoryview(header)
+        self._pos = start
+        self._frame_bytes = ring.channels * 2
+        self._finished = threading.Event()
+        self._done = False
+        self._clones = []
+        self.closed_at = None  # time.monotonic() when the body ended
+
+    def readable(self):
+        return True
+
+    def clone(self) -> "LiveWavStream":
+        """Fresh reader from the start of the same capture range (for a retried request)."""
+        clone = LiveWavStream(self.ring, self.start, self._header.tobytes(), Timeline())
+        self._clones.append(clone)
+        if self.end is not None:
+            clone.end = self.end
+            clone._finished.set()
+        return clone
+
+    def finish(self, end: int):
+        """The utterance ends at sample end; send up to there and close the body."""
+        self.end = max(self.start, end)
+        # The body is already encoded and mostly uploaded by now
+        self.timeline.mark("encode_start")
+        self.timeline.mark("encode_end")
+        self._finished.set()
+        for clone in self._clones:
+            clone.end = self.end
+            clone._finished.set()
+
+    def __len__(self):
+        return (self.end if self.end is not None else self._pos) - self.start
+
+    def readinto(self, b):
+        out = memoryview(b).cast("B")
+        if self.sent_bytes < len(self._header):
+            n = min(len(out), len(self._header) - self.sent_bytes)
+            out[:n] = self._header[self.sent_bytes:self.sent_bytes + n]
+            self.sent_bytes += n
+            return n
+
+        waited = 0.0
+        while True:
+            end = self.end
+            limit = self.ring.position if end is None else min(end, self.ring.position)
+            if limit > self._pos:
+                break
+            if end is not None or waited >= self.stall_timeout:
+                self._close_body()
+                return 0
+            self._finished.wait(self.poll)
+            waited += self.poll
+
+        n = min(limit - self._pos, len(out) // self._frame_bytes)
+        self.ring.check(self._pos)
+        written = 0
+        for view in self.ring.views(self._pos, self._pos + n):
+            out[written:written + view.nbytes] = memoryview(view).cast("B")
+            written += view.nbytes
+        self.ring.check(self._pos)
+        self._pos += n
+        self.sent_bytes += written
+        return written
+
+    def _close_body(self):
+        if self._done:
+            return
+        self._done = True
+        if self.end is None:
+            self.end = self._pos
+        self.closed_at = time.monotonic()
+        self.timeline.mark("upload_end")
+        self.timeline.set("upload_bytes", self.sent_bytes)
+
+
+def _wav_pcm16(data: bytes):
+    """(channels, rate, pcm bytes) of a 16-bit PCM WAV, or None for any other WAV."""
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        if chunk == b"fmt " and pos + 24 <= len(data):
+            fmt = struct.unpack_from("<HHIIHH", data, pos + 8)  # tag, channels, rate, byte rate, align, bits
+        elif chunk == b"data":
+            if fmt is None or fmt[0] != 1 or fmt[5] != 16 or fmt[1] == 0:
+                return None
+            end = pos + 8 + size
+            # Streamed uploads leave the size at 0 or 0xFFFFFFFF: then the data runs to the end
+            pcm = data[pos + 8:end if size and end <= len(data) else len(data)]
+            return fmt[1], fmt[2], pcm
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def decode_upload(data: bytes):
+    """Decode an upload body back to (int16 samples of shape (frames, channels), sample rate).
+
+    16-bit PCM WAV is read directly; every other format, WAV included, goes
+    through soundfile. Raises ValueError for audio that cannot be decoded.
+    """
+    wav = _wav_pcm16(data) if data[:4] == b"RIFF" and data[8:12] == b"WAVE" else None
+    if wav is not None:
+        channels, rate, pcm = wav
+        pcm = pcm[:len(pcm) // (2 * channels) * 2 * channels]
+        return np.frombuffer(pcm, dtype="<i2").reshape(-1, channels), rate
+    if sf is None:
+        raise ValueError("decoding anything but 16-bit PCM WAV needs soundfile")
+    try:
+        # As float: libsndfile does not scale float files when asked for int16
+        samples, rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except (RuntimeError, TypeError, ValueError) as e:  # soundfile.LibsndfileError is a RuntimeError
+        raise ValueError(f"unsupported audio format: {e}") from e
+    return to_int16(samples), rate
+
 
 class AudioProcessor:
     def __init__(self, settings: AudioSettings):
         self.settings = settings
+        # Only the size fields change between utterances
+        self._header = bytearray(wav_header(settings.sample_rate, settings.channels, 0))
+
+        # Trimming
+        self.trim_frame = int(settings.sample_rate * 0.01)  # 10 ms energy frames
+        self.trim_floor_db = -60.0  # Never treat anything quieter than this as speech
+        self.trim_headroom_db = 25.0  # Frames this close to the peak always count as speech
+        self.trimmed_seconds = 0.0  # Totals over the session
+        self.trimmed_bytes = 0
+        self._trim_lock = threading.Lock()
+
+        # Upload encoding
+        self.upload_format = settings.upload_format
+        if self.upload_format not in settings.valid_upload_formats():
+            print(f"{colorama.Fore.YELLOW}Unknown UPLOAD_FORMAT '{self.upload_format}', uploading WAV{colorama.Style.RESET_ALL}")
+            self.upload_format = "wav"
+        if self.upload_format in COMPRESSED_FORMATS and sf is None:
+            print(f"{colorama.Fore.YELLOW}soundfile is not available, uploading WAV instead of {self.upload_format}{colorama.Style.RESET_ALL}")
+            self.upload_format = "wav"
+        self.upload_rate = settings.upload_sample_rate
+        if self.upload_rate != settings.sample_rate:
+            self._header = bytearray(wav_header(self.upload_rate, settings.channels, 0))
+        self.encode_seconds = 0.0  # Totals over the session
+        self.encoded_bytes = 0
+
+        # Local noise suppression instead of the API's slow remove_background_noise
+        self.denoiser = None
+        if settings.denoise:
+            self.denoiser = SpectralDenoiser(settings.sample_rate, strength=settings.denoise_strength,
+                                             floor_db=settings.denoise_floor_db)
+        self.denoise_seconds = 0.0  # Processing time and audio processed, over the session
+        self.denoised_audio_seconds = 0.0
 
     @classmethod
     def from_env(cls):
         return cls(AudioSettings.from_env())
 
-    def get_audio_stream(self, audio_data: np.ndarray) -> BytesIO:
-        if not audio_data or len(audio_data) == 0:
+    def open_live(self, ring: CaptureRing, start: int, timeline: Timeline = None) -> LiveWavStream:
+        """Upload body that streams capture from sample start until finish() is called.
+
+        Always WAV at the capture rate: each block goes out as soon as it is recorded.
+        """
+        header = bytearray(wav_header(self.settings.sample_rate, self.settings.channels, 0))
+        struct.pack_into("<I", header, 4, 0xFFFFFFFF)
+        struct.pack_into("<I", header, 40, 0xFFFFFFFF)
+        return LiveWavStream(ring, start, bytes(header), timeline)
+
+    def _header_for(self, data_bytes: int) -> bytes:
+        header = bytearray(self._header)
+        struct.pack_into("<I", header, 4, 36 + data_bytes)
+        struct.pack_into("<I", header, 40, data_bytes)
+        return bytes(header)
+
+    def _frame_energies(self, parts):
+        """Per-frame mean square level in dBFS for int16 buffers. Returns (frame offsets, dB)."""
+        frame = self.trim_frame
+        offsets, levels = [], []
+        base = 0
+        for part in parts:
+            n = len(part) // frame
+            if n:
+                frames = part[:n * frame].reshape(n, -1)
+                power = np.einsum('ij,ij->i', frames, frames, dtype=np.int64) / frames.shape[1]
+                offsets.append(base + np.arange(n) * frame)
+                levels.append(10 * np.log10(power / 32767.0 ** 2 + 1e-12))
+            base += len(part)
+        if not levels:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(offsets), np.concatenate(levels)
+
+    def trim(self, audio_data):
+        """Drop the pre-buffer lead-in and silence tail, keeping trim_margin around speech.
+
+        Speech is any frame more than trim_threshold_db above the utterance's
+        own noise floor (its 10th percentile frame level), capped at
+        trim_headroom_db below the loudest frame. CaptureSlices are
+        narrowed in place of copying; arrays are sliced.
+        """
+        if isinstance(audio_data, CaptureSlice):
+            parts = audio_data.views()
+        else:
+            parts = [to_int16(audio_data)]
+        offsets, levels = self._frame_energies(parts)
+        if len(levels) == 0:
+            return audio_data
+
+        floor = np.percentile(levels, 10)
+        # If there is hardly any silence the floor is speech itself, so never set the bar
+        # more than trim_headroom_db below the loudest frame
+        threshold = min(floor + self.settings.trim_threshold_db, levels.max() - self.trim_headroom_db)
+        voiced = np.flatnonzero(levels > max(threshold, self.trim_floor_db))
+        if len(voiced) == 0:
+            return audio_data
+
+        margin = int(self.settings.trim_margin * self.settings.sample_rate)
+        start = max(0, int(offsets[voiced[0]]) - margin)
+        end = min(len(audio_data), int(offsets[voiced[-1]]) + self.trim_frame + margin)
+        removed = len(audio_data) - (end - start)
+        if removed <= 0:
+            return audio_data
+
+        seconds = removed / self.settings.sample_rate
+        saved = removed * self.settings.channels * 2
+        with self._trim_lock:
+            self.trimmed_seconds += seconds
+            self.trimmed_bytes += saved
+        print(f"{colorama.Fore.CYAN}[Trim] -{seconds:.2f}s of silence, {saved / 1024:.0f} KB not uploaded{colorama.Style.RESET_ALL}")
+
+        if isinstance(audio_data, CaptureSlice):
+            return CaptureSlice(audio_data.ring, audio_data.start + start, audio_data.start + end)
+        return audio_data[start:end]
+
+    def denoise(self, audio_data, timeline: Timeline = None):
+        """Run the denoiser over a trimmed utterance. Returns float32 audio of the same length."""
+        timeline = timeline or Timeline()
+        timeline.mark("denoise_start")
+        samples = audio_data.to_array() if isinstance(audio_data, CaptureSlice) else np.asarray(audio_data, dtype=np.float32)
+        out = self.denoiser.process(samples.reshape(len(samples), -1))
+        timeline.mark("denoise_end")
+        elapsed = timeline.marks["denoise_end"] - timeline.marks["denoise_start"]
+        with self._trim_lock:
+            self.denoise_seconds += elapsed
+            self.denoised_audio_seconds += len(out) / self.settings.sample_rate
+        return out
+
+    def _pcm_parts(self, audio_data):
+        """int16 buffers at the upload rate. Capture views pass through untouched at the native rate."""
+        if isinstance(audio_data, CaptureSlice):
+            parts = audio_data.views()
+        else:
+            parts = [to_int16(audio_data)]  # Denoised audio can go past full scale
+        if self.upload_rate == self.settings.sample_rate:
+            return parts
+
+        # Downsample channel by channel through a fresh stateful resampler (workers run concurrently),
+        # in blocks so its work buffers stay small
+        block = 8192
+        channels = []
+        for ch in range(self.settings.channels):
+            resampler = StreamingResampler(self.settings.sample_rate, self.upload_rate, max_chunk=block)
+            pieces = []
+            for part in parts:
+                mono = part[:, ch] if part.ndim > 1 else part
+                for i in range(0, len(mono), block):
+                    pieces.append(resampler.process(mono[i:i + block]).copy())
+            pieces.append(resampler.flush())
+            channels.append(np.concatenate(pieces))
+        resampled = np.stack(channels, axis=1)
+        np.clip(resampled, -32768, 32767, out=resampled)
+        return [resampled.astype(np.int16)]
+
+    def encode(self, audio_data, upload_format=None):
+        """Encode int16 audio for upload as WAV (zero-copy at the native rate), FLAC or Opus."""
+        upload_format = upload_format or self.upload_format
+        start = time.perf_counter()
+        parts = self._pcm_parts(audio_data)
+
+        if upload_format in COMPRESSED_FORMATS:
+            container, subtype, name = COMPRESSED_FORMATS[upload_format]
+            stream = io.BytesIO()
+            with sf.SoundFile(stream, mode="w", samplerate=self.upload_rate, channels=self.settings.channels,
+                              format=container, subtype=subtype) as f:
+                for part in parts:
+                    f.write(part)
+            stream.seek(0)
+            stream.name = name
+            size = stream.getbuffer().nbytes
+        else:
+            data_bytes = sum(p.nbytes for p in parts)
+            source = audio_data if isinstance(audio_data, CaptureSlice) and self.upload_rate == self.settings.sample_rate else None
+            stream = PCMWavStream(self._header_for(data_bytes), parts, source)
+            size = len(stream)
+
+        elapsed = time.perf_counter() - start
+        with self._trim_lock:
+            self.encode_seconds += elapsed
+            self.encoded_bytes += size
+        print(f"{colorama.Fore.CYAN}[Upload] {upload_format} {self.upload_rate}Hz: {size / 1024:.0f} KB, encoded in {elapsed * 1000:.1f}ms{colorama.Style.RESET_ALL}")
+        return stream
+
+    def get_audio_stream(self, audio_data, timeline: Timeline = None) -> io.IOBase:
+        if isinstance(audio_data, io.IOBase):
+            # A LiveWavStream is already streaming from the capture ring (trimming was applied to its
+            # start and end); any other file is a clip that is uploaded as it is
+            return audio_data
+        if audio_data is None or len(audio_data) == 0:
             return None
-        audio_data = np.concatenate(audio_data, axis=0)
-        audio_data_pcm = (audio_data * 32767).astype(np.int16)
-        wav_memory = BytesIO()
-        write(wav_memory, self.settings.sample_rate, audio_data_pcm)
-        wav_memory.seek(0)
-        return wav_memory
+        timeline = timeline or Timeline()
+        timeline.mark("encode_start")
+        captured = len(audio_data)
+        if self.settings.trim_silence:
+            audio_data = self.trim(audio_data)
+        if self.denoiser is not None:
+            audio_data = self.denoise(audio_data, timeline)
+        stream = self.encode(audio_data)
+        timeline.mark("encode_end")
+        timeline.set("audio_seconds", len(audio_data) / self.settings.sample_rate)
+        timeline.set("trimmed_seconds", (captured - len(audio_data)) / self.settings.sample_rate)
+        timeline.set("upload_bytes", stream.seek(0, io.SEEK_END))
+        stream.seek(0)
+        return stream
@@ -1,167 +1,189 @@
 import numpy as np
-import sounddevice as sd
 import threading
 import time
 import colorama
-from collections import deque
 
+from src.audio_io import open_input
+from src.audio_stats import CallbackStats
+from src.capture_buffer import CaptureRing, CaptureSlice
+from src.metrics import Timeline
+from src.segmenters import ManualSegmenter, VADSegmenter
 from src.settings.audio import AudioSettings
 
 
 class AudioRecorder:
+    """Owns one input stream for the life of the process and cuts utterances out of it."""
+
     def __init__(self, settings: AudioSettings):
         self.settings = settings
-        self.is_recording = False
-        self.audio_data = []
+        self.audio_data = None
+        self.timeline = None  # Stage timestamps for the utterance in audio_data
+        self.audio_continues = False  # audio_data is one part of a split utterance with more to come
         self.stream = None
-        
-        # VAD settings
+        self.ring = CaptureRing(settings.capture_frames(), settings.channels)
+
         self.vad_enabled = settings.mode == 1  # mode 1 = automatic
-        self.silence_threshold = 0.015  # RMS threshold for voice detection (lowered for sensitivity)
-        self.silence_duration = 0.8  # Seconds of silence before stopping (reduced from 1.2)
-        self.min_recording_duration = 0.3  # Minimum recording length in seconds
-        self.pre_buffer_duration = 0.5  # Seconds of audio to keep before voice detected
-        
-        # VAD state
-        self.last_voice_time = 0
-        self.recording_start_time = 0
-        self.vad_callback = None  # Callback when VAD stops recording
+
+        # Segmenters over the continuous stream
+        self.manual = ManualSegmenter()
+        self.vad = VADSegmenter.from_settings(settings)
+        self.listening = False  # VAD segmenter is armed
+        self.vad_callback = None  # Callback when VAD ends an utterance
+        self.start_callback = None  # Called with (segment start, speech onset) when an utterance starts
+        self.vad_block = self.vad.frame * 2  # Samples handed to the VAD per wake-up (decisions are per frame)
+        self.noise_profile = None  # Learns the noise spectrum from blocks the VAD calls silence (DENOISE)
+        self._vad_position = 0  # Next ring index the VAD worker will look at
         self._vad_thread = None
-        self._stop_vad = False
-        self.voice_detected = False  # Track if we've detected voice in this session
-        
-        # Pre-buffer for capturing audio before voice is detected
-        # Calculate buffer size: pre_buffer_duration * sample_rate / chunk_size
-        # Default chunk size is about 1024 samples at 48kHz
-        self.pre_buffer_chunks = int(self.pre_buffer_duration * settings.sample_rate / 1024) + 5
-        self.pre_buffer = deque(maxlen=self.pre_buffer_chunks)
+        self._data_ready = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # Overflow and callback timing accounting for the input stream
+        self.stats = CallbackStats("capture")
 
     @classmethod
     def from_env(cls, input_device=None):
         return cls(AudioSettings.from_env(input_device=input_device))
 
+    @property
+    def is_recording(self) -> bool:
+        return self.vad.in_speech if self.vad_enabled else self.manual.active
+
     def set_vad_callback(self, callback):
         """Set callback function to be called when VAD detects end of speech."""
         self.vad_callback = callback
 
-    def get_audio_data(self) -> np.ndarray:
+    def get_audio_data(self) -> CaptureSlice:
         return self.audio_data
 
-    def _calculate_rms(self, audio_chunk):
-        """Calculate RMS (volume level) of audio chunk."""
-        return np.sqrt(np.mean(audio_chunk ** 2))
+    def open(self):
+        """Open the input stream once; it keeps running until close()."""
+        if self.stream is not None:
+            return
+        self._closed = False
+        self._vad_position = self.ring.position
+        self.stream = open_input(
+            self.settings.audio_input,
+            self.callback,
+            channels=self.settings.channels,
+            samplerate=self.settings.sample_rate,
+            device=self.settings.input_device,
+            pace=self.settings.audio_pace
+        )
+        self.stream.start()
+        self._vad_thread = threading.Thread(target=self._vad_loop, daemon=True)
+        self._vad_thread.start()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            self._closed = True
+            self._data_ready.set()
 
     def callback(self, indata, frames, time_info, status):
-        audio_copy = indata.copy()
-        
-        if self.vad_enabled:
-            rms = self._calculate_rms(audio_copy)
-            
-            if not self.voice_detected:
-                # Keep filling pre-buffer until voice is detected
-                self.pre_buffer.append(audio_copy)
-                
-                if rms > self.silence_threshold:
-                    # Voice detected! Start actual recording with pre-buffer
-                    self.voice_detected = True
-                    self.is_recording = True
-                    self.recording_start_time = time.time()
-                    self.last_voice_time = time.time()
-                    
-                    # Add pre-buffer to audio data
-                    self.audio_data = list(self.pre_buffer)
+        # Real-time thread: copy into the ring, count xruns, wake the VAD worker. Nothing else.
+        # indata is float32 from sounddevice, or int16 straight from a file/pipe backend
+        t0 = time.perf_counter()
+        self.ring.write(indata)
+        self._data_ready.set()
+        self.stats.record(status, frames, time.perf_counter() - t0)
+
+    def _vad_loop(self):
+        """Run VAD over the ring in fixed blocks and deliver finished utterances, off the audio thread."""
+        block = self.vad_block
+        scratch = np.empty((block, self.settings.channels), dtype=np.float32)
+        scale = np.float32(1.0 / 32767)
+        while not self._closed:
+            self._data_ready.wait(0.5)
+            self._data_ready.clear()
+            while self.ring.position - self._vad_position >= block:
+                # If this thread was starved for longer than the ring holds, skip ahead
+                start = max(self._vad_position, self.ring.oldest())
+                self._vad_position = start + block
+                if not (self.vad_enabled and self.listening):
+                    continue
+
+                offset = 0
+                for view in self.ring.views(start, start + block):
+                    np.multiply(view, scale, out=scratch[offset:offset + len(view)])
+                    offset += len(view)
+
+                with self._lock:
+                    was_speaking = self.vad.in_speech
+                    was_calibrated = self.vad.engine.calibrated
+                    segment = self.vad.feed(scratch, start)
+                    started = not was_speaking and self.vad.in_speech
+                if self.noise_profile is not None and not was_speaking and not self.vad.in_speech:
+                    self.noise_profile.update(scratch.mean(axis=1))
+                if not was_calibrated and self.vad.engine.calibrated:
+                    print(f"{colorama.Fore.CYAN}[VAD] Noise floor: {self.vad.engine.noise_floor_db:.1f} dBFS{colorama.Style.RESET_ALL}")
+                if started:
                     print(f"\n{colorama.Fore.GREEN}[VAD] Voice detected, recording...{colorama.Style.RESET_ALL}")
-            else:
-                # We're actively recording
-                if self.is_recording:
-                    self.audio_data.append(audio_copy)
-                    
-                    if rms > self.silence_threshold:
-                        self.last_voice_time = time.time()
-        else:
-            # Manual mode - just record if is_recording is True
-            if self.is_recording:
-                self.audio_data.append(audio_copy)
-
-    def _vad_monitor(self):
-        """Background thread to monitor for silence and stop recording."""
-        while not self._stop_vad:
-            time.sleep(0.1)
-            
-            if self._stop_vad:
-                break
-            
-            if not self.voice_detected:
-                continue
-                
-            if not self.is_recording:
-                continue
-                
-            current_time = time.time()
-            recording_duration = current_time - self.recording_start_time
-            silence_time = current_time - self.last_voice_time
-            
-            # Stop if we've had enough silence after minimum recording duration
-            if recording_duration > self.min_recording_duration and silence_time > self.silence_duration:
-                print(f"\n{colorama.Fore.YELLOW}[VAD] Silence detected, processing...{colorama.Style.RESET_ALL}")
-                self.stop()
-                if self.vad_callback:
-                    self.vad_callback()
-                break
+                    if self.start_callback:
+                        self.start_callback(self.vad.start_index, self.vad.onset_index)
+                if segment is not None:
+                    self.timeline = self._vad_timeline(segment)
+                    self.audio_data = self.ring.slice(segment.start, segment.end)
+                    self.audio_continues = not segment.final
+                    if segment.final:
+                        print(f"\n{colorama.Fore.YELLOW}[VAD] Silence detected, processing...{colorama.Style.RESET_ALL}")
+                    else:
+                        print(f"\n{colorama.Fore.YELLOW}[VAD] Pause, sending {len(segment) / self.settings.sample_rate:.1f}s part...{colorama.Style.RESET_ALL}")
+                    if self.vad_callback:
+                        self.vad_callback()
+
+    def _vad_timeline(self, segment) -> Timeline:
+        """Timeline for a VAD cut: speech ended when the last voiced sample was captured."""
+        timeline = Timeline()
+        timeline.mark("vad_decision")
+        behind = (self.ring.position - segment.voice_end) / self.settings.sample_rate
+        timeline.mark("speech_end", timeline.marks["vad_decision"] - behind)
+        # Sample positions in the capture stream, for checking cut accuracy offline
+        timeline.set("vad_onset_sample", segment.onset)
+        timeline.set("vad_offset_sample", segment.voice_end)
+        timeline.set("vad_cut_sample", segment.end)
+        timeline.set("final", segment.final)
+        return timeline
 
     def start(self):
-        """Start recording (manual mode)."""
-        if not self.is_recording:
-            self.is_recording = True
-            self.audio_data = []
-            self.recording_start_time = time.time()
-            self.last_voice_time = time.time()
-            self._stop_vad = False
-            self.voice_detected = True  # In manual mode, we're always "voice detected"
-
-            self.stream = sd.InputStream(
-                callback=self.callback,
-                channels=self.settings.channels,
-                samplerate=self.settings.sample_rate,
-                dtype='float32',
-                device=self.settings.input_device
-            )
-            self.stream.start()
-            
-            # Start VAD monitoring thread if in automatic mode
+        """Start a segment now (SPACE pressed)."""
+        self.open()
+        with self._lock:
+            position = self.ring.position
             if self.vad_enabled:
-                self._vad_thread = threading.Thread(target=self._vad_monitor, daemon=True)
-                self._vad_thread.start()
+                # VAD will end it when silence follows
+                self.listening = True
+                self.vad.force_start(position)
+            else:
+                self.manual.begin(position)
+        if self.start_callback:
+            self.start_callback(position, position)
 
     def stop(self):
-        if self.stream is not None:
-            self._stop_vad = True
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
-            self.is_recording = False
-            self.voice_detected = False
+        """End the current segment now and keep the stream running."""
+        with self._lock:
+            position = self.ring.position
+            if self.vad_enabled:
+                segment = self.vad.force_end(position)
+                self.listening = False
+            else:
+                segment = self.manual.end(position)
+        self.audio_data = self.ring.slice(segment.start, segment.end) if segment else None
+        self.audio_continues = False
+        # Manual stop: the key press is both the end of speech and the decision
+        self.timeline = Timeline()
+        self.timeline.mark("speech_end")
+        self.timeline.mark("vad_decision", self.timeline.marks["speech_end"])
 
     def start_continuous(self):
         """Start continuous listening for VAD mode."""
         if self.vad_enabled:
-            self.audio_data = []
-            self.pre_buffer.clear()
-            self.voice_detected = False
-            self.is_recording = False
-            self._stop_vad = False
-            
+            self.open()
             print(f"{colorama.Fore.GREEN}[VAD] Listening for voice...{colorama.Style.RESET_ALL}")
-            
-            self.stream = sd.InputStream(
-                callback=self.callback,
-                channels=self.settings.channels,
-                samplerate=self.settings.sample_rate,
-                dtype='float32',
-                device=self.settings.input_device
-            )
-            self.stream.start()
-            
-            # Start VAD monitoring thread
-            self._vad_thread = threading.Thread(target=self._vad_monitor, daemon=True)
-            self._vad_thread.start()
+            with self._lock:
+                # Keep an utterance that already started while the previous one was dispatched
+                if not (self.listening and self.vad.in_speech):
+                    self.vad.reset()
+                self.listening = True
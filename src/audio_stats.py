@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class CallbackStats:
+    """Xrun counters and callback timing for one PortAudio stream.
+
+    record() runs inside the audio callback, so it only bumps counters and
+    stores the duration into a preallocated array. Percentiles are computed
+    by summary() on whichever thread asks.
+    """
+
+    def __init__(self, name: str, history: int = 4096):
+        self.name = name
+        self.callbacks = 0
+        self.frames = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self.output_underflows = 0
+        self.output_overflows = 0
+        self.max_duration = 0.0
+        self._durations = np.zeros(history, dtype=np.float64)
+
+    def record(self, status, frames: int, duration: float):
+        if status:
+            if status.input_overflow:
+                self.input_overflows += 1
+            if status.input_underflow:
+                self.input_underflows += 1
+            if status.output_underflow:
+                self.output_underflows += 1
+            if status.output_overflow:
+                self.output_overflows += 1
+        self._durations[self.callbacks % len(self._durations)] = duration
+        self.callbacks += 1
+        self.frames += frames
+        if duration > self.max_duration:
+            self.max_duration = duration
+
+    @property
+    def xruns(self) -> int:
+        return self.input_overflows + self.input_underflows + self.output_underflows + self.output_overflows
+
+    def summary(self, samplerate: int) -> dict:
+        n = min(self.callbacks, len(self._durations))
+        durations = self._durations[:n] * 1000
+        block_ms = self.frames / self.callbacks / samplerate * 1000 if self.callbacks else 0.0
+        return {
+            "callbacks": self.callbacks,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "output_underflows": self.output_underflows,
+            "output_overflows": self.output_overflows,
+            "block_ms": block_ms,
+            "p50_ms": float(np.percentile(durations, 50)) if n else 0.0,
+            "p99_ms": float(np.percentile(durations, 99)) if n else 0.0,
+            "max_ms": self.max_duration * 1000,
+        }
+
+    def format(self, samplerate: int) -> str:
+        s = self.summary(samplerate)
+        return (
+            f"{self.name}: {s['callbacks']} callbacks ({s['block_ms']:.1f}ms blocks), "
+            f"overflows in/out {s['input_overflows']}/{s['output_overflows']}, "
+            f"underflows in/out {s['input_underflows']}/{s['output_underflows']}, "
+            f"callback p50 {s['p50_ms']:.3f}ms p99 {s['p99_ms']:.3f}ms max {s['max_ms']:.3f}ms"
+        )
@@ -0,0 +1,212 @@
+import glob
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import colorama
+import numpy as np
+
+from src.audio_processor import AudioProcessor, decode_upload, wav_header
+from src.el_client import ElevenLabsClient
+from src.metrics import Timeline
+from src.settings.audio import AudioSettings
+from src.settings.batch import BatchSettings
+from src.settings.network import NetworkSettings
+
+AUDIO_EXTENSIONS = (".wav", ".pcm", ".flac", ".ogg", ".mp3")
+
+
+def find_inputs(patterns):
+    """Audio files named by directories (searched recursively), globs such as recordings/*.pcm, or paths."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True) or [pattern]
+        files += [m for m in matches if os.path.splitext(m)[1].lower() in AUDIO_EXTENSIONS]
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def read_input(path: str, pcm_rate: int):
+    """A file as mono float32 of shape (frames, 1) in [-1, 1], and its sample rate."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.lower().endswith(".pcm"):
+        samples, rate = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").reshape(-1, 1), pcm_rate
+    else:
+        samples, rate = decode_upload(data)
+    mono = samples.mean(axis=1, dtype=np.float32) / 32767
+    return mono.reshape(-1, 1), rate
+
+
+class Manifest:
+    """Append-only JSONL record of finished files, so an interrupted batch resumes where it stopped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}  # Input path -> its latest entry
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short when the last run was killed
+                    self.entries[entry["input"]] = entry
+        self._lock = threading.Lock()
+
+    def done(self, path: str) -> bool:
+        """Converted before, from this same input, and the output is still there."""
+        entry = self.entries.get(path)
+        if entry is None or entry["status"] != "done" or not os.path.exists(entry["output"]):
+            return False
+        stat = os.stat(path)
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def add(self, entry: dict):
+        with self._lock:
+            self.entries[entry["input"]] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+class BatchConverter:
+    """Converts a set of recorded files through AudioProcessor and the API, several at a time.
+
+    Each file is trimmed and encoded like a live utterance, then converted
+    with the client's retries and hedging; passthrough is off, so a file
+    that cannot be converted is reported as failed instead of being copied.
+    The response streams straight into a .part file that is renamed once
+    complete, so every output in the folder is whole.
+    """
+
+    def __init__(self, el_client: ElevenLabsClient, settings: BatchSettings, voice_id=None):
+        self.el_client = el_client
+        self.settings = settings
+        self.voice_id = voice_id  # Overrides VOICE_ID
+        self.cancelled = threading.Event()
+        self._processors = {}  # Input sample rate -> AudioProcessor
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, workers=None, output_dir=None, manifest=None, voice_id=None):
+        settings = BatchSettings.from_env(output_dir, manifest)
+        settings.workers = workers or settings.workers
+        network = NetworkSettings.from_env(convert_workers=settings.workers)
+        network.pool_size = max(network.pool_size, 2 * settings.workers)  # Room for a hedge next to every request
+        network.passthrough = False
+        return cls(ElevenLabsClient.from_env(playback=False, network=network), settings, voice_id)
+
+    def _processor(self, rate: int) -> AudioProcessor:
+        with self._lock:
+            if rate not in self._processors:
+                settings = AudioSettings.from_env(sample_rate=rate)
+                settings.channels = 1
+                self._processors[rate] = AudioProcessor(settings)
+            return self._processors[rate]
+
+    def output_path(self, path: str, root: str) -> str:
+        """take.pcm -> <output_dir>/take.pcm.wav: the source extension stays, so take.wav and take.pcm don't collide."""
+        return os.path.join(self.settings.output_dir, os.path.relpath(path, root) + ".wav")
+
+    def convert_file(self, path: str, output: str) -> dict:
+        """Convert one file into output. Returns its manifest entry."""
+        stat = os.stat(path)
+        entry = {"input": path, "output": output, "size": stat.st_size, "mtime": stat.st_mtime}
+        started = time.perf_counter()
+        timeline = Timeline()
+        part = output + ".part"
+        try:
+            samples, rate = read_input(path, self.settings.pcm_rate)
+            entry["audio_seconds"] = round(len(samples) / rate, 3)
+            stream = self._processor(rate).get_audio_stream(samples, timeline)
+            if stream is None:
+                raise ValueError("no audio")
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            size = 0
+            with open(part, "wb") as f:
+                f.write(wav_header(self.el_client.api_sample_rate, 1, 0))
+                for chunk in self.el_client.stream_convert(stream, timeline, self.cancelled, cache=False,
+                                                           voice_id=self.voice_id):
+                    f.write(chunk)
+                    size += len(chunk)
+                if self.cancelled.is_set():
+                    raise InterruptedError("cancelled")
+                if not size:
+                    raise ValueError("empty response")
+                # Sizes are only known at the end
+                f.seek(4)
+                f.write(struct.pack("<I", 36 + size))
+                f.seek(40)
+                f.write(struct.pack("<I", size))
+            os.replace(part, output)
+            entry.update(status="done", converted_seconds=round(size / 2 / self.el_client.api_sample_rate, 3))
+        except Exception as e:
+            if os.path.exists(part):
+                os.remove(part)
+            entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+        entry["seconds"] = round(time.perf_counter() - started, 3)
+        if "first_byte" in timeline.marks and "request_sent" in timeline.marks:
+            entry["ttfb_ms"] = round((timeline.marks["first_byte"] - timeline.marks["request_sent"]) * 1000, 1)
+        return entry
+
+    def run(self, patterns) -> dict:
+        """Convert every input not already done according to the manifest. Returns the totals."""
+        output_dir = os.path.abspath(self.settings.output_dir) + os.sep
+        files = [f for f in find_inputs(patterns) if not f.startswith(output_dir)]  # Not our own results
+        if not files:
+            print(f"{colorama.Fore.YELLOW}[Batch] No audio files match {' '.join(patterns)}{colorama.Style.RESET_ALL}")
+            return {"done": 0, "failed": 0, "skipped": 0, "audio_seconds": 0.0, "seconds": 0.0, "throughput": 0.0,
+                    "interrupted": False}
+        os.makedirs(self.settings.output_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.settings.manifest)), exist_ok=True)
+        manifest = Manifest(self.settings.manifest)
+        root = os.path.commonpath([os.path.dirname(f) for f in files])
+        todo = [f for f in files if not manifest.done(f)]
+        skipped = len(files) - len(todo)
+        print(f"{colorama.Fore.CYAN}[Batch] {len(files)} files, {skipped} already converted, "
+              f"{len(todo)} to go with {self.settings.workers} workers -> {self.settings.output_dir}{colorama.Style.RESET_ALL}")
+
+        totals = {"done": 0, "failed": 0, "skipped": skipped, "audio_seconds": 0.0}
+        ttfbs = []
+        started = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=self.settings.workers, thread_name_prefix="batch")
+        try:
+            futures = [pool.submit(self.convert_file, f, self.output_path(f, root)) for f in todo]
+            for number, future in enumerate(as_completed(futures), 1):
+                entry = future.result()
+                if self.cancelled.is_set() and entry["status"] == "failed":
+                    continue  # Interrupted, not failed: the next run picks it up again
+                manifest.add(entry)
+                name = os.path.relpath(entry["input"], root)
+                if entry["status"] == "done":
+                    totals["done"] += 1
+                    totals["audio_seconds"] += entry["audio_seconds"]
+                    if "ttfb_ms" in entry:
+                        ttfbs.append(entry["ttfb_ms"])
+                    print(f"{colorama.Fore.GREEN}[Batch] {number}/{len(todo)} {name}: {entry['audio_seconds']:.1f}s "
+                          f"in {entry['seconds']:.1f}s{colorama.Style.RESET_ALL}")
+                else:
+                    totals["failed"] += 1
+                    print(f"{colorama.Fore.RED}[Batch] {number}/{len(todo)} {name}: {entry['error']}{colorama.Style.RESET_ALL}")
+        except KeyboardInterrupt:
+            self.cancelled.set()
+            print(f"\n{colorama.Fore.YELLOW}[Batch] Interrupted; run the same command again to resume{colorama.Style.RESET_ALL}")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        totals["seconds"] = time.perf_counter() - started
+        rate = totals["audio_seconds"] / totals["seconds"] if totals["seconds"] else 0.0
+        ttfb = f", TTFB p50 {np.percentile(ttfbs, 50):.0f}ms" if ttfbs else ""
+        print(f"{colorama.Fore.CYAN}[Batch] {totals['done']} converted, {totals['failed']} failed, {skipped} skipped: "
+              f"{totals['audio_seconds']:.1f}s of audio in {totals['seconds']:.1f}s = {rate:.2f} audio s per wall s"
+              f"{ttfb}{colorama.Style.RESET_ALL}")
+        totals["throughput"] = rate
+        totals["interrupted"] = self.cancelled.is_set()
+        return totals
+
+    def close(self):
+        self.el_client.close()
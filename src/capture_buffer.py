@@ -0,0 +1,114 @@
+import threading
+import numpy as np
+
+
+def to_int16(samples) -> np.ndarray:
+    """float audio in [-1, 1] to int16, saturating at full scale and rounded."""
+    scaled = np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767
+    return np.rint(scaled, out=scaled).astype(np.int16)
+
+
+class CaptureOverrun(Exception):
+    """Samples were overwritten by newer capture before they were consumed."""
+
+
+class CaptureRing:
+    """Preallocated int16 ring holding the most recent input, addressed by absolute sample index.
+
+    The audio callback converts each float32 block straight into the ring, so
+    capture does no per-block allocation. Readers get views into the ring
+    instead of copies; a view stays valid until capture wraps past it.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self.capacity = capacity
+        self.channels = channels
+        self._buf = np.zeros((capacity, channels), dtype=np.int16)
+        self.position = 0  # Samples written since the stream was opened
+        self._scratch = np.zeros((4096, channels), dtype=np.float32)  # Conversion space, grown for larger blocks
+        self._lock = threading.Lock()
+
+    def write(self, block: np.ndarray) -> int:
+        """Convert a float32 block into the ring and return its starting index. int16 blocks are copied as is."""
+        n = len(block)
+        if n > self.capacity:
+            block = block[-self.capacity:]
+            self.position += n - self.capacity
+            n = self.capacity
+        start = self.position
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        if block.dtype == np.int16:
+            # PCM from a network client (the headless server)
+            self._buf[offset:offset + first] = block[:first]
+            if n > first:
+                self._buf[:n - first] = block[first:]
+        else:
+            # Saturate and round: a clipped input must not wrap around to the opposite sign
+            if n > len(self._scratch):
+                self._scratch = np.zeros((n, self.channels), dtype=np.float32)
+            scratch = self._scratch[:n]
+            np.clip(block.reshape(n, -1), -1.0, 1.0, out=scratch)
+            np.multiply(scratch, 32767, out=scratch)
+            np.rint(scratch, out=scratch)
+            np.copyto(self._buf[offset:offset + first], scratch[:first], casting='unsafe')
+            if n > first:
+                np.copyto(self._buf[:n - first], scratch[first:], casting='unsafe')
+        with self._lock:
+            self.position = start + n
+        return start
+
+    def oldest(self) -> int:
+        """Absolute index of the oldest sample still held."""
+        return max(0, self.position - self.capacity)
+
+    def views(self, start: int, end: int):
+        """Return one or two int16 views covering [start, end) without copying."""
+        start = max(start, self.oldest())
+        end = min(end, self.position)
+        if end <= start:
+            return []
+        a = start % self.capacity
+        b = a + (end - start)
+        if b <= self.capacity:
+            return [self._buf[a:b]]
+        return [self._buf[a:], self._buf[:b - self.capacity]]
+
+    def check(self, start: int):
+        """Raise CaptureOverrun if sample start has already been overwritten."""
+        if start < self.oldest():
+            raise CaptureOverrun(f"capture wrapped past sample {start}")
+
+    def slice(self, start: int, end: int):
+        if end <= start:
+            return None
+        return CaptureSlice(self, max(start, self.oldest()), min(end, self.position))
+
+
+class CaptureSlice:
+    """A [start, end) range of the capture ring, read lazily."""
+
+    def __init__(self, ring: CaptureRing, start: int, end: int):
+        self.ring = ring
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return max(0, self.end - self.start)
+
+    @property
+    def channels(self) -> int:
+        return self.ring.channels
+
+    def views(self):
+        self.ring.check(self.start)
+        return self.ring.views(self.start, self.end)
+
+    def to_array(self) -> np.ndarray:
+        """Copy out as float32 in [-1, 1] for processing that needs a contiguous array."""
+        out = np.empty((len(self), self.channels), dtype=np.float32)
+        offset = 0
+        for view in self.views():
+            np.multiply(view, np.float32(1.0 / 32767), out=out[offset:offset + len(view)])
+            offset += len(view)
+        return out[:offset]
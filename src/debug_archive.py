@@ -0,0 +1,168 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import colorama
+
+from src.metrics import Timeline
+from src.settings.debug import DebugSettings
+
+SEGMENT_GLOB = "segment_*.pcm"
+
+
+class DebugArchive:
+    """Keeps the converted audio of each utterance for debugging, off the audio path.
+
+    One writer thread drains a bounded queue; when it falls behind, new
+    recordings are dropped rather than blocking playback. Audio is appended
+    to segment files (raw pcm_22050, one after another) and each segment has
+    an index next to it, one JSON line per utterance with its byte offset
+    and length, timestamps, voice (a list for a fan-out mix) and latencies. Whole segments are deleted
+    once they are older than the retention time or the archive is over its
+    size budget.
+    """
+
+    def __init__(self, settings: DebugSettings, sample_rate=22050):
+        self.settings = settings
+        self.directory = settings.directory
+        self.sample_rate = sample_rate
+        self.max_bytes = int(settings.max_mb * 1024 * 1024)
+        self.segment_bytes = int(settings.segment_mb * 1024 * 1024)
+        self.retention = settings.retention_minutes * 60
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=settings.queue_size)
+        self._segment = None  # (path, opened at, data file, index file)
+        self._segment_seq = 0
+        self._last_sweep = 0.0
+        self._thread = threading.Thread(target=self._run, name="debug-archive", daemon=True)
+        self._thread.start()
+
+    def submit(self, chunks, timeline: Timeline = None, voice_id=None, model_id=None) -> bool:
+        """Queue an utterance's response chunks and the voice they were converted into.
+
+        Never blocks; returns False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait((chunks, timeline, voice_id, model_id, time.time()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"{colorama.Fore.YELLOW}[Debug] Writer behind, recording dropped ({self.dropped} so far){colorama.Style.RESET_ALL}")
+            return False
+
+    def close(self, timeout=2.0):
+        """Write what is queued, then close the open segment."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=30)
+            except queue.Empty:
+                item = False  # Idle: only enforce retention
+            if item is None:
+                self._close_segment()
+                self._sweep()
+                return
+            try:
+                if item:
+                    self._write(*item)
+                if time.monotonic() - self._last_sweep >= 30:
+                    self._sweep()
+            except OSError as e:
+                print(f"{colorama.Fore.YELLOW}[Debug] {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+
+    def _write(self, chunks, timeline, voice_id, model_id, finished_at):
+        segment = self._current_segment()
+        path, _, data, index = segment
+        offset = data.tell()
+        for chunk in chunks:
+            data.write(chunk)
+        data.flush()
+        size = data.tell() - offset
+        entry = {
+            "utterance": timeline.id if timeline else None,
+            "offset": offset,
+            "bytes": size,
+            "seconds": round(size / 2 / self.sample_rate, 3),
+            "finished_at": round(finished_at, 3),
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "sample_rate": self.sample_rate,
+        }
+        if timeline is not None:
+            entry["stages_ms"] = {k: round(v, 1) for k, v in timeline.durations().items()}
+            for flag in ("cache_hit", "passthrough", "hedged"):
+                if timeline.values.get(flag):
+                    entry[flag] = timeline.values[flag]
+        # The index line follows the data, so it never points past the end of the segment
+        index.write(json.dumps(entry) + "\n")
+        index.flush()
+        self.written += 1
+        if data.tell() >= self.segment_bytes:
+            self._close_segment()
+            self._sweep()
+
+    def _current_segment(self):
+        if self._segment is not None and time.time() - self._segment[1] >= self.retention / 2:
+            # Segments are deleted whole, so none may stay open for most of the retention time
+            self._close_segment()
+        if self._segment is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._segment_seq += 1
+            name = f"segment_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{self._segment_seq:04d}"
+            path = os.path.join(self.directory, f"{name}.pcm")
+            self._segment = (path, time.time(), open(path, "ab"), open(f"{path[:-4]}.jsonl", "a"))
+        return self._segment
+
+    def _close_segment(self):
+        if self._segment is not None:
+            _, _, data, index = self._segment
+            data.close()
+            index.close()
+            self._segment = None
+
+    def _sweep(self):
+        """Delete closed segments (and their index) past the retention time or the size budget, oldest first."""
+        self._last_sweep = time.monotonic()
+        active = self._segment[0] if self._segment else None
+        segments = []
+        total = 0
+        for path in glob.glob(os.path.join(self.directory, SEGMENT_GLOB)):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total += stat.st_size
+            if path != active:
+                segments.append((stat.st_mtime, path, stat.st_size))
+        now = time.time()
+        for mtime, path, size in sorted(segments):
+            if now - mtime < self.retention and total <= self.max_bytes:
+                break
+            for victim in (path, f"{path[:-4]}.jsonl"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+
+
+def read_archive(directory):
+    """Yield (index entry, pcm bytes) for every utterance still in the archive, oldest first."""
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB)), key=os.path.getmtime):
+        try:
+            with open(f"{path[:-4]}.jsonl") as index, open(path, "rb") as data:
+                for line in index:
+                    entry = json.loads(line)
+                    data.seek(entry["offset"])
+                    yield entry, data.read(entry["bytes"])
+        except (OSError, ValueError):
+            continue
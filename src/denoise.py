@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+
+
+class NoiseProfile:
+    """Running noise power spectrum, learned from audio the VAD classified as silence."""
+
+    def __init__(self, window: np.ndarray, smoothing=0.98, min_frames=10):
+        self.window = window
+        self.n_fft = len(window)
+        self.smoothing = smoothing  # Per-frame weight of the old estimate
+        self.min_frames = min_frames  # Frames seen before the profile is used (~0.2 s)
+        self.frames = 0
+        self._psd = None
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.frames >= self.min_frames
+
+    def update(self, samples: np.ndarray):
+        """Fold mono float32 silence into the estimate, one whole frame at a time."""
+        buf = np.concatenate([self._carry, samples])
+        count = len(buf) // self.n_fft
+        self._carry = buf[count * self.n_fft:]
+        if count == 0:
+            return
+        frames = buf[:count * self.n_fft].reshape(count, self.n_fft)
+        power = np.mean(np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2, axis=0)
+        with self._lock:
+            if self._psd is None:
+                self._psd = power
+            else:
+                keep = self.smoothing ** count
+                self._psd = keep * self._psd + (1 - keep) * power
+            self.frames += count
+
+    def snapshot(self):
+        """The current estimate, or None until enough silence has been seen."""
+        with self._lock:
+            return self._psd.copy() if self.ready else None
+
+
+class SpectralDenoiser:
+    """Spectral subtraction with a Wiener-style gain, vectorized over the STFT of a whole utterance.
+
+    Frames of about 20 ms with 50% overlap and a square-root Hann window on
+    both analysis and synthesis, so unity gain reconstructs the input
+    exactly. Each bin keeps sqrt(1 - strength * noise / power) of its
+    amplitude, never less than the floor, and gains are averaged over three
+    frames to keep musical noise down. The noise comes from the VAD's
+    silence (profile) or, before any has been seen, from the quietest 10%
+    of the utterance's own frames.
+    """
+
+    def __init__(self, sample_rate: int, strength=2.0, floor_db=-15.0, frame_ms=20.0):
+        self.sample_rate = sample_rate
+        self.n_fft = 1 << int(np.ceil(np.log2(sample_rate * frame_ms / 1000)))
+        self.hop = self.n_fft // 2
+        self.strength = strength
+        self.floor = np.float32(10 ** (floor_db / 20))
+        self.window = np.sqrt(np.hanning(self.n_fft + 1)[:-1]).astype(np.float32)  # Periodic
+        self.profile = NoiseProfile(self.window)
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        """Denoise float32 audio of shape (frames, channels). Returns the same shape and length."""
+        out = np.empty_like(audio, dtype=np.float32)
+        noise = self.profile.snapshot()
+        for ch in range(audio.shape[1]):
+            out[:, ch] = self._channel(audio[:, ch], noise)
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def _channel(self, x: np.ndarray, noise) -> np.ndarray:
+        n, hop = len(x), self.hop
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        # hop of lead-in so every sample is covered by two frames, then pad to whole frames
+        count = -(-(n + hop) // hop)
+        padded = np.zeros((count + 1) * hop, dtype=np.float32)
+        padded[hop:hop + n] = x
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[::hop]
+        spec = np.fft.rfft(frames * self.window, axis=1)
+        power = spec.real ** 2 + spec.imag ** 2
+
+        if noise is None:
+            noise = np.percentile(power, 10, axis=0)
+        gain = np.sqrt(np.maximum(1.0 - self.strength * noise / (power + 1e-12), 0.0))
+        if len(gain) > 2:
+            gain[1:-1] = (gain[:-2] + gain[1:-1] + gain[2:]) / 3
+        np.maximum(gain, self.floor, out=gain)
+        frames_out = np.fft.irfft(spec * gain, n=self.n_fft, axis=1).astype(np.float32) * self.window
+
+        # Overlap-add: even frames tile the output end to end, odd frames tile it shifted by hop
+        out = np.zeros(len(padded), dtype=np.float32)
+        even, odd = frames_out[0::2], frames_out[1::2]
+        out[:len(even) * self.n_fft] += even.reshape(-1)
+        out[hop:hop + len(odd) * self.n_fft] += odd.reshape(-1)
+        return out[hop:hop + n]
@@ -0,0 +1,45 @@
+import threading
+import colorama
+
+# PortAudio enumerates every host API when it starts and on every query, which
+# can take hundreds of milliseconds on Windows. The list is read once and kept;
+# refresh() re-scans after a device is plugged in or removed.
+_devices = None
+_lock = threading.Lock()
+
+
+def query_devices(refresh=False) -> list:
+    """All audio devices (sounddevice dicts), enumerated on first use and then cached."""
+    global _devices
+    with _lock:
+        if _devices is None or refresh:
+            import sounddevice as sd  # Loads and initializes PortAudio
+            if refresh:
+                # PortAudio only notices hot-plugged devices when it is initialized again. sounddevice has
+                # no public call for that; _terminate/_initialize are private, hence the pin in requirements.txt
+                if hasattr(sd, "_terminate") and hasattr(sd, "_initialize"):
+                    sd._terminate()
+                    sd._initialize()
+                else:
+                    print(f"{colorama.Fore.YELLOW}This sounddevice version cannot re-scan devices; "
+                          f"restart to see new ones{colorama.Style.RESET_ALL}")
+            _devices = list(sd.query_devices())
+        return _devices
+
+
+def refresh() -> list:
+    """Re-scan the devices. Re-initializing PortAudio closes open streams, so close them first."""
+    return query_devices(refresh=True)
+
+
+def find_device(name_contains: str, kind="input"):
+    """First input or output device whose name contains name_contains, as (index, name), or (None, None)."""
+    channels = "max_input_channels" if kind == "input" else "max_output_channels"
+    for i, dev in enumerate(query_devices()):
+        if dev[channels] > 0 and name_contains.lower() in dev['name'].lower():
+            return i, dev['name']
+    return None, None
+
+
+def device_name(index) -> str:
+    return query_devices()[index]['name']
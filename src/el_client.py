@@ -1,151 +1,659 @@
+from collections import deque
 from io import BytesIO
+import copy
 import os
-import numpy as np
-import sounddevice as sd
-from elevenlabs.client import ElevenLabs
+import httpx
 import colorama
-import threading
+import numpy as np
 import queue
+import threading
+import time
+
+from src.audio_cache import AudioCache
+from src.audio_player import AudioPlayer
+from src.debug_archive import DebugArchive
+from src.devices import device_name, find_device
+from src.jitter_buffer import JitterBuffer
+from src.audio_processor import decode_upload
+from src.metrics import Timeline, metrics
+from src.resampler import StreamingResampler
+from src.resilience import Attempt, Cancelled, CircuitBreaker, FirstByteTimeout, backoff
+from src.settings.audio import AudioSettings
+from src.settings.cache import CacheSettings
+from src.settings.debug import DebugSettings
+from src.settings.fanout import FanoutSettings
+from src.settings.network import NetworkSettings
+from src.stitcher import Stitcher
+
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_BASE_URL = "https://api.elevenlabs.io"
+OUTPUT_FORMAT = "pcm_22050"  # Raw PCM - no decode needed
+CANCEL_POLL = 0.02  # Longest a cancelled request keeps its worker waiting
 
 
 def find_vb_cable_device():
     """Find VB-Cable Input device for output routing."""
-    devices = sd.query_devices()
-    for i, device in enumerate(devices):
-        device_name = device['name'].lower()
-        # VB-Cable Input is what we output TO (it appears as an output device)
-        if 'cable input' in device_name and device['max_output_channels'] > 0:
-            return i, device['name']
-    return None, None
+    # VB-Cable Input is what we output TO (it appears as an output device)
+    return find_device("cable input", kind="output")
 
 
 class ElevenLabsClient:
-    def __init__(self, api_key, voice_id, output_device=None, model_id=None):
-        self.client = ElevenLabs(api_key=api_key)
+    def __init__(self, api_key, voice_id, output_device=None, model_id=None, base_url=None, crossfade_ms=0.0,
+                 network: NetworkSettings = None, verify=True, cache: AudioCache = None, cache_live=False,
+                 debug: DebugSettings = None, remove_background_noise=False, jitter_buffer: JitterBuffer = None,
+                 playback=True, output_backend="sounddevice", output_pace=1.0):
+        self.network = network or NetworkSettings()
+        # Our own connection pool, so connections can be pre-opened and kept warm between utterances
+        self.http2 = self.network.http2 and HTTP2_AVAILABLE
+        self.http = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=self.network.pool_size,
+                                max_keepalive_connections=self.network.pool_size,
+                                keepalive_expiry=self.network.keepalive_expiry),
+            timeout=httpx.Timeout(240.0),
+            follow_redirects=True,
+            verify=verify
+        )
+        # base_url points the SDK at another server, e.g. the local mock API in benchmarks/
+        self.base_url = base_url or DEFAULT_BASE_URL
+        # The SDK takes about half a second to import, so it loads in the background (see client)
+        self._sdk_args = dict(api_key=api_key, base_url=base_url, httpx_client=self.http)
+        self._client = None
+        self._client_lock = threading.Lock()
+        threading.Thread(target=lambda: self.client, name="sdk-import", daemon=True).start()
+        self.keepalive_interval = self.network.keepalive_interval
+        self._last_used = time.monotonic()
+        self._keepalive_thread = None
+        self._closed = False
+        # Falls back to passthrough while the API keeps failing
+        self.breaker = CircuitBreaker(self.network.breaker_failures, self.network.breaker_reset_seconds)
+        # First-byte latencies of real API responses only (cache hits and passthrough answer in ~0 ms), for the hedge delay
+        self._first_byte_ms = {"time_to_first_byte": deque(maxlen=1000), "server_wait": deque(maxlen=1000)}
+        # Converted audio of clips heard before (None = off)
+        self.cache = cache
+        self.cache_live = cache_live  # Microphone utterances use the cache too
         self.voice_id = voice_id
         self.output_device = output_device
+        self.output_backend = output_backend  # AUDIO_OUTPUT: sounddevice, pipe:<path> or null
+        self.output_pace = output_pace
         self.model_id = model_id or "eleven_english_sts_v2"
+        # Server-side noise removal; DENOISE=1 does it locally in a few milliseconds instead
+        self.remove_background_noise = remove_background_noise
         self.api_sample_rate = 22050  # API output rate
         self.output_sample_rate = 48000  # VB-Cable requires 48kHz
+        self.resampler = StreamingResampler(self.api_sample_rate, self.output_sample_rate)
+        # No output device when converting for remote clients (the headless server)
+        self.player = AudioPlayer.for_device(output_device, samplerate=self.output_sample_rate, backend=output_backend,
+                                             pace=output_pace) if playback else None
+        # Decides when playback starts (None = as soon as audio arrives)
+        self.jitter_buffer = jitter_buffer
+        # Joins the parts of a split utterance (no-op when crossfade_ms is 0)
+        self.stitcher = Stitcher(int(crossfade_ms / 1000 * self.output_sample_rate))
+        # Converted audio kept for debugging, written off the playback thread
+        self.debug_archive = None
+        if debug is not None and debug.enabled:
+            self.debug_archive = DebugArchive(debug, self.api_sample_rate)
         
-        if output_device is not None:
-            print(f"{colorama.Fore.GREEN}Audio output routed to: {sd.query_devices(output_device)['name']}{colorama.Style.RESET_ALL}")
-        else:
+        if playback and output_backend != "sounddevice":
+            print(f"{colorama.Fore.GREEN}Audio output: {output_backend}{colorama.Style.RESET_ALL}")
+        elif playback and output_device is not None:
+            print(f"{colorama.Fore.GREEN}Audio output routed to: {device_name(output_device)}{colorama.Style.RESET_ALL}")
+        elif playback:
             print(f"{colorama.Fore.YELLOW}Warning: VB-Cable not found, using default output{colorama.Style.RESET_ALL}")
         
         print(f"{colorama.Fore.CYAN}Using model: {self.model_id}{colorama.Style.RESET_ALL}")
+        if self.network.http2 and not HTTP2_AVAILABLE:
+            print(f"{colorama.Fore.YELLOW}HTTP/2 needs the h2 package (pip install httpx[http2]), using HTTP/1.1{colorama.Style.RESET_ALL}")
+
+        # Pay DNS, TCP and TLS setup now instead of on the first utterance
+        if self.network.preconnect:
+            threading.Thread(target=self.warm_up, args=(self.network.preconnect,), daemon=True).start()
 
     @classmethod
-    def from_env(cls):
-        # Auto-detect VB-Cable
-        device_id, device_name = find_vb_cable_device()
-        if device_id is not None:
-            print(f"{colorama.Fore.CYAN}Found VB-Cable: {device_name} (Device ID: {device_id}){colorama.Style.RESET_ALL}")
+    def from_env(cls, playback=True, network: NetworkSettings = None):
+        device_id = None
+        settings = AudioSettings.from_env()
+        if playback and settings.audio_output == "sounddevice":
+            # Auto-detect VB-Cable
+            device_id, device_name = find_vb_cable_device()
+            if device_id is not None:
+                print(f"{colorama.Fore.CYAN}Found VB-Cable: {device_name} (Device ID: {device_id}){colorama.Style.RESET_ALL}")
+        if network is None:
+            fanout = FanoutSettings.from_env()
+            # Every voice of an utterance converts at once: a connection each, plus room for a hedge
+            connections = settings.convert_workers * max(len(fanout.voices), 1)
+            network = NetworkSettings.from_env(convert_workers=connections)
+            if fanout.voices:
+                network.pool_size = max(network.pool_size, 2 * fanout.pool_workers(settings.convert_workers))
         
         return cls(
             os.getenv("API_KEY", None),
             os.getenv("VOICE_ID", None),
             output_device=device_id,
-            model_id=os.getenv("MODEL_ID", "eleven_english_sts_v2")
+            model_id=os.getenv("MODEL_ID", "eleven_english_sts_v2"),
+            base_url=os.getenv("ELEVENLABS_BASE_URL") or None,
+            crossfade_ms=settings.split_crossfade_ms if settings.split_pause else 0.0,
+            network=network,
+            cache=AudioCache.from_env(),
+            cache_live=CacheSettings.from_env().live,
+            debug=DebugSettings.from_env(),
+            remove_background_noise=os.getenv("REMOVE_BACKGROUND_NOISE", "0") == "1",
+            jitter_buffer=JitterBuffer(settings.jitter_min_ms, settings.jitter_max_ms) if settings.jitter_buffer else None,
+            playback=playback,
+            output_backend=settings.audio_output,
+            output_pace=settings.audio_pace
+        )
+
+    @property
+    def client(self):
+        """The SDK client, built on first use. Waits for the background import if it is still running."""
+        with self._client_lock:
+            if self._client is None:
+                from elevenlabs.client import ElevenLabs
+                self._client = ElevenLabs(**self._sdk_args)
+            return self._client
+
+    def for_output(self, output_device):
+        """This client playing to another output device, e.g. one voice of a fan-out.
+
+        Requests, the connection pool, cache and circuit breaker are shared;
+        the player, resampler, crossfade and jitter buffer are its own.
+        """
+        view = copy.copy(self)
+        view.output_device = output_device
+        view.resampler = StreamingResampler(self.api_sample_rate, self.output_sample_rate)
+        view.player = AudioPlayer.for_device(output_device, samplerate=self.output_sample_rate,
+                                             backend=self.output_backend, pace=self.output_pace)
+        view.stitcher = Stitcher(self.stitcher.length)
+        if self.jitter_buffer is not None:
+            view.jitter_buffer = JitterBuffer(self.jitter_buffer.min_target * 1000, self.jitter_buffer.max_target * 1000)
+        return view
+
+    def warm_up(self, connections: int = 1) -> float:
+        """Open (or refresh) pooled connections before they are needed. Returns seconds taken."""
+        def probe():
+            try:
+                self.http.head(self.base_url, timeout=10.0)
+            except (httpx.HTTPError, RuntimeError):  # RuntimeError: client already closed
+                pass
+
+        start = time.perf_counter()
+        # Concurrent probes so HTTP/1.1 opens one connection each
+        threads = [threading.Thread(target=probe, daemon=True) for _ in range(connections - 1)]
+        for thread in threads:
+            thread.start()
+        probe()
+        for thread in threads:
+            thread.join()
+        self._last_used = time.monotonic()
+        return time.perf_counter() - start
+
+    def start_keepalive(self, active=None):
+        """Probe the API whenever the pool has been idle for keepalive_interval seconds.
+
+        active() gates the probes, e.g. only while the VAD is listening.
+        """
+        if self.keepalive_interval <= 0 or self._keepalive_thread is not None:
+            return
+
+        def loop():
+            while not self._closed:
+                idle = time.monotonic() - self._last_used
+                if idle < self.keepalive_interval:
+                    time.sleep(self.keepalive_interval - idle)
+                    continue
+                if active is None or active():
+                    self.warm_up()
+                else:
+                    self._last_used = time.monotonic()
+
+        self._keepalive_thread = threading.Thread(target=loop, name="http-keepalive", daemon=True)
+        self._keepalive_thread.start()
+
+    def close(self):
+        """Stop the keep-alive probes, close pooled connections and finish debug writes."""
+        self._closed = True
+        self.http.close()
+        if self.debug_archive is not None:
+            self.debug_archive.close()
+
+    def stream_convert(self, audio: BytesIO, timeline: Timeline = None, cancelled: threading.Event = None,
+                       cache=None, voice_id=None, model_id=None):
+        """Send audio to ElevenLabs and yield the raw pcm_22050 response chunks as they arrive.
+
+        A request that has not produced its first byte in time is hedged with
+        a duplicate; failures before the first byte are retried with jittered
+        backoff. When the API is unavailable (circuit open, or every attempt
+        failed) the unconverted voice is yielded instead so the turn still plays.
+        Setting cancelled abandons the request within CANCEL_POLL seconds.
+        With cache (default: cache_live) a clip converted before is streamed
+        from disk without a request, and a new conversion is stored.
+        voice_id and model_id override the client's own for this request.
+        """
+        timeline = timeline or Timeline()
+        cancelled = cancelled or threading.Event()
+        voice = (voice_id or self.voice_id, model_id or self.model_id)
+        timeline.set("voice_id", voice[0])
+        timeline.set("model_id", voice[1])
+        timeline.mark("request_sent")
+        key = self._cache_key(audio, voice) if (self.cache_live if cache is None else cache) else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield from self._play_cached(cached, timeline)
+                return
+        received = [] if key is not None else None
+        self._last_used = time.monotonic()
+        try:
+            if not self.breaker.allow():
+                yield from self._passthrough(audio, timeline, "API unavailable (circuit open)")
+                return
+            body = audio
+            for attempt in range(self.network.retries + 1):
+                started = False
+                attempt_sent = time.perf_counter()
+                try:
+                    for chunk in self._race(body, timeline, cancelled, voice):
+                        if not started:
+                            timeline.mark("first_byte")
+                            started = True
+                            self._record_first_byte(body, timeline, attempt_sent)
+                        if received is not None:
+                            received.append(chunk)
+                        yield chunk
+                    self.breaker.record_success()
+                    if received and not cancelled.is_set():
+                        self.cache.put(key, b"".join(received))
+                    return
+                except Cancelled:
+                    return
+                except Exception as e:
+                    self.breaker.record_failure()
+                    if started:
+                        # Audio is already playing; a retry would repeat it
+                        print(f"{colorama.Fore.RED}Stream broke off: {self._describe(e)}{colorama.Style.RESET_ALL}")
+                        return
+                    error = e
+                print(f"{colorama.Fore.YELLOW}[API] {self._describe(error)} "
+                      f"(attempt {attempt + 1}/{self.network.retries + 1}){colorama.Style.RESET_ALL}")
+                body = self._clone(audio)
+                if body is None or not self._retryable(error) or not self.breaker.allow():
+                    break
+                if attempt < self.network.retries and cancelled.wait(backoff(attempt, self.network.retry_backoff_ms / 1000)):
+                    return
+            if not self.network.passthrough:
+                raise error
+            yield from self._passthrough(audio, timeline, f"conversion failed ({type(error).__name__})")
+        finally:
+            self._last_used = time.monotonic()
+
+    def _race(self, body, timeline: Timeline, cancelled: threading.Event, voice=None):
+        """Yield the chunks of whichever request answers first: the original or its hedge."""
+        events = queue.Queue()
+        attempts = [Attempt(events, lambda: self._request(body, voice))]
+        hedge_after = self._hedge_delay(body) if self.network.hedge else None
+        opened = time.monotonic()
+        winner = None
+        try:
+            while True:
+                if cancelled.is_set():
+                    raise Cancelled()
+                timeout = CANCEL_POLL
+                if winner is None:
+                    # Both clocks start once the whole body is on the wire
+                    sent = self._upload_done(body, opened)
+                    deadline = None if sent is None else sent + self.network.first_byte_timeout
+                    hedge_at = None if sent is None or hedge_after is None or len(attempts) > 1 else sent + hedge_after
+                    waits = [t - time.monotonic() for t in (deadline, hedge_at) if t is not None]
+                    timeout = max(0.0, min(waits + [CANCEL_POLL]))
+                try:
+                    attempt, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if winner is not None:
+                        continue  # Only polling for cancellation
+                    now = time.monotonic()
+                    if hedge_at is not None and now >= hedge_at:
+                        hedge = self._clone(body)
+                        if hedge is not None:
+                            print(f"{colorama.Fore.YELLOW}[Hedge] No response after {hedge_after * 1000:.0f}ms, racing a second request{colorama.Style.RESET_ALL}")
+                            timeline.set("hedged", True)
+                            attempts.append(Attempt(events, lambda: self._request(hedge, voice), 1))
+                    if deadline is not None and now >= deadline:
+                        raise FirstByteTimeout(f"no response within {self.network.first_byte_timeout:.1f}s")
+                    continue
+
+                if winner is not None and attempt is not winner:
+                    continue
+                if kind == "chunk":
+                    if winner is None:
+                        winner = attempt
+                        for other in attempts:
+                            if other is not attempt:
+                                other.cancel()
+                        if attempt.number:
+                            timeline.set("hedge_won", True)
+                    yield payload
+                    continue
+                attempt.done = True
+                if kind == "error" and (winner is attempt or all(a.done for a in attempts)):
+                    raise payload
+                if kind == "end" and (winner is attempt or all(a.done for a in attempts)):
+                    return
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def _cache_key(self, audio, voice=None):
+        """Cache key for a buffered upload; None for live uploads, undecodable input or no cache."""
+        if self.cache is None or not audio.seekable():
+            return None
+        voice_id, model_id = voice or (self.voice_id, self.model_id)
+        try:
+            return self.cache.key(self._clone(audio).read(), voice_id, model_id, OUTPUT_FORMAT)
+        except Exception as e:
+            print(f"{colorama.Fore.YELLOW}[Cache] Skipped: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+            return None
+
+    @staticmethod
+    def _play_cached(cached, timeline: Timeline):
+        """Stream a memory-mapped cache entry as response chunks."""
+        print(f"{colorama.Fore.CYAN}[Cache] Hit, no API request{colorama.Style.RESET_ALL}")
+        timeline.set("cache_hit", True)
+        timeline.mark("first_byte")
+        try:
+            for i in range(0, len(cached), 4096):
+                yield cached[i:i + 4096]
+        finally:
+            cached.close()
+
+    def _record_first_byte(self, body, timeline: Timeline, sent: float):
+        """Remember how long the API took to answer, as _hedge_delay measures it."""
+        if body.seekable():
+            self._first_byte_ms["time_to_first_byte"].append((timeline.marks["first_byte"] - sent) * 1000)
+        elif "upload_end" in timeline.marks:
+            self._first_byte_ms["server_wait"].append((timeline.marks["first_byte"] - timeline.marks["upload_end"]) * 1000)
+
+    def _hedge_delay(self, body) -> float:
+        """Seconds to wait for a first byte before hedging: the configured percentile of recent requests."""
+        if not body.seekable() and not hasattr(body, "clone"):
+            return None
+        # A live upload is measured from the end of its body
+        stage = "time_to_first_byte" if body.seekable() else "server_wait"
+        samples = self._first_byte_ms[stage]
+        recent = np.percentile(samples, self.network.hedge_percentile) if len(samples) >= 20 else None
+        if recent is None:
+            return self.network.hedge_initial_ms / 1000
+        return max(recent, self.network.hedge_min_ms) / 1000
+
+    @staticmethod
+    def _upload_done(body, opened: float):
+        """When the body was fully handed over: at once for a buffered upload, None while a live one is still sending."""
+        if body.seekable():
+            return opened
+        return getattr(body, "closed_at", None)
+
+    @staticmethod
+    def _clone(audio):
+        """A fresh reader over the same upload, or None if the body can only be sent once."""
+        if hasattr(audio, "clone"):
+            return audio.clone()
+        if isinstance(audio, BytesIO):
+            clone = BytesIO(audio.getvalue())
+            clone.name = getattr(audio, "name", "audio.wav")
+            return clone
+        return None
+
+    @staticmethod
+    def _describe(error: Exception) -> str:
+        status = getattr(error, "status_code", None)
+        return f"HTTP {status}" if status is not None else f"{type(error).__name__}: {error}"
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        """Timeouts, connection errors, 429 and 5xx are worth another try; other 4xx are not."""
+        status = getattr(error, "status_code", None)
+        return status is None or status == 429 or status >= 500
+
+    def _passthrough(self, audio, timeline: Timeline, reason: str):
+        """The unconverted upload as pcm_22050 chunks, so the turn is not lost."""
+        source = self._clone(audio)
+        if source is None:
+            return
+        print(f"{colorama.Fore.YELLOW}[Passthrough] {reason}: playing your own voice{colorama.Style.RESET_ALL}")
+        timeline.set("passthrough", reason)
+        samples, rate = decode_upload(source.read())
+        mono = samples.mean(axis=1, dtype=np.float32)
+        resampler = StreamingResampler(rate, self.api_sample_rate)
+        out = np.concatenate([resampler.process(mono).copy(), resampler.flush()])
+        pcm = np.clip(out, -32768, 32767).astype("<i2").tobytes()
+        timeline.mark("first_byte")
+        for i in range(0, len(pcm), 4096):
+            yield pcm[i:i + 4096]
+
+    def _request(self, audio, voice=None):
+        # Use PCM format for instant decoding (no MP3 decode overhead)
+        # The convert method already returns a streaming generator
+        voice_id, model_id = voice or (self.voice_id, self.model_id)
+        return self.client.speech_to_speech.convert(
+            voice_id=voice_id,
+            audio=audio,
+            model_id=model_id,
+            output_format=OUTPUT_FORMAT,
+            # NOTE: remove_background_noise=True adds 5+ seconds of latency!
+            remove_background_noise=self.remove_background_noise,
+            optimize_streaming_latency=4,  # Max latency optimization (deprecated but may help)
+            # Retries, hedging and timeouts are handled in stream_convert. The SDK hands the
+            # timeout straight to httpx, so connect and read limits can be set separately.
+            request_options={
+                "max_retries": 0,
+                "timeout_in_seconds": httpx.Timeout(self.network.stream_timeout, connect=self.network.connect_timeout),
+            },
         )
 
-    def _resample(self, samples, orig_rate, target_rate):
-        """Fast linear resampling."""
-        if orig_rate == target_rate:
-            return samples
-        ratio = target_rate / orig_rate
-        new_length = int(len(samples) * ratio)
-        indices = np.linspace(0, len(samples) - 1, new_length)
-        return np.interp(indices, np.arange(len(samples)), samples).astype(np.float32)
+    def stop_playback(self):
+        """Silence the output now: drop queued audio and any crossfade tail."""
+        self.player.flush()
+        self.stitcher.reset()
+
+    def play_stream(self, audio_stream, start_time, timeline: Timeline = None, continues=False,
+                    cancelled: threading.Event = None):
+        """Resample response chunks and hand them to the output stream as they arrive.
+
+        The jitter buffer (if any) holds the start of playback back until the
+        audio buffered and still arriving will cover the rest of the response,
+        and buffers up again after an underrun.
+        continues (a bool, or a callable checked once the stream ends) means the
+        next stream is the following part of the same utterance: the tail is
+        held for the crossfade and playback is not drained in between.
+        Once cancelled is set nothing more is written and playback stops.
+        """
+        timeline = timeline or Timeline()
+        cancelled = cancelled or threading.Event()
+        first_chunk_time = None
+        chunk_count = 0
+        all_audio_bytes = []
+        underruns_before = self.player.underruns
+        self.resampler.reset()
+        playout = self.jitter_buffer.open(timeline.values.get("audio_seconds")) if self.jitter_buffer else None
+        held = []  # Resampled audio waiting for the jitter buffer
+        held_frames = 0
+        seen_underruns = self.player.underruns
+        lock = threading.Lock()  # Between the loop and the timer that starts held playback between arrivals
+        timer, due = None, None
+
+        def write(samples):
+            if len(samples) and "first_audio" not in timeline.marks:
+                # First sample becomes audible once the audio already queued ahead of it has played
+                timeline.mark("first_audio", time.perf_counter() + self.player.latency())
+            self.player.write(samples)
+
+        def release():
+            nonlocal held, held_frames
+            for samples in held:
+                write(samples)
+            held, held_frames = [], 0
+
+        def check():
+            # Called with the lock held: start playback if the audio held is enough by now
+            nonlocal timer, due
+            buffered = (held_frames + self.player.buffer.available) / self.output_sample_rate
+            if playout.ready(buffered):
+                self._log_playout(playout, timeline, buffered)
+                release()
+                if timer is not None:
+                    timer.cancel()
+                due = None
+            elif playout.start_at is not None and (due is None or playout.start_at < due):
+                # The audio held will do once the next delivery is close enough: re-check then
+                if timer is not None:
+                    timer.cancel()
+                due = playout.start_at
+                timer = threading.Timer(max(0.0, due - time.perf_counter()), recheck)
+                timer.daemon = True
+                timer.start()
+
+        def recheck():
+            nonlocal due
+            with lock:
+                due = None
+                if held and not playout.started and not cancelled.is_set():
+                    check()
+
+        for chunk in audio_stream:
+            if cancelled.is_set():
+                break
+            if chunk:
+                samples = self.stitcher.push(self.resampler.process_pcm16(chunk))
+                all_audio_bytes.append(chunk)
+                chunk_count += 1
+                
+                if first_chunk_time is None:
+                    first_chunk_time = time.time()
+                    latency = (first_chunk_time - start_time) * 1000
+                    print(f"{colorama.Fore.GREEN}First chunk in {latency:.0f}ms{colorama.Style.RESET_ALL} (streaming...)", end=" ", flush=True)
+
+                if playout is None:
+                    write(samples)
+                    continue
+                with lock:
+                    playout.arrived(len(chunk) / 2 / self.api_sample_rate)
+                    if playout.started and self.player.underruns > seen_underruns:
+                        playout.underrun()
+                        print(f"{colorama.Fore.YELLOW}[Jitter] Underrun, target depth now {self.jitter_buffer.target * 1000:.0f}ms{colorama.Style.RESET_ALL}", end=" ", flush=True)
+                    if playout.started:
+                        write(samples)
+                    else:
+                        held.append(samples.copy())  # The resampler reuses its output buffer
+                        held_frames += len(samples)
+                        check()
+                    seen_underruns = self.player.underruns
+        
+        if timer is not None:
+            timer.cancel()
+        if callable(continues):
+            continues = continues()
+        if not cancelled.is_set():
+            # The response is complete: nothing left to wait for
+            with lock:
+                release()
+            write(self.stitcher.push(self.resampler.flush()))
+            write(self.stitcher.end_part(continues))
+        if playout is not None:
+            playout.close()
+            timeline.set("jitter_underruns", playout.underruns)
+        
+        # Let the ring buffer drain before returning, unless the next part follows straight on
+        if not continues:
+            self.player.wait()
+        if cancelled.is_set():
+            # Also catches a chunk written after the barge-in had already flushed
+            self.stop_playback()
+            timeline.set("cancelled", True)
+            print(f"{colorama.Fore.YELLOW}Cancelled ({chunk_count} chunks played){colorama.Style.RESET_ALL}")
+            return
+        underruns = self.player.underruns - underruns_before
+        timeline.mark("playback_end")
+        timeline.set("chunks", chunk_count)
+        timeline.set("underruns", underruns)
+        if chunk_count:
+            metrics.record(timeline)
+        
+        total_time = (time.time() - start_time) * 1000
+        print(f"{colorama.Fore.GREEN}Done! ({chunk_count} chunks, {total_time:.0f}ms, {underruns} underruns){colorama.Style.RESET_ALL}")
+        
+        # Save for debugging (dropped rather than delaying playback)
+        if all_audio_bytes and self.debug_archive is not None:
+            # Indexed under the voice this utterance was converted into (for a fan-out, not the client's default)
+            self.debug_archive.submit(all_audio_bytes, timeline, timeline.values.get("voice_id", self.voice_id),
+                                      timeline.values.get("model_id", self.model_id))
+
+    def _log_playout(self, playout, timeline: Timeline, buffered: float):
+        rate = playout.rate()
+        first = "jitter_wait_ms" not in timeline.values
+        if first:
+            timeline.set("jitter_wait_ms", (time.perf_counter() - timeline.marks.get("first_byte", time.perf_counter())) * 1000)
+            timeline.set("jitter_target_ms", playout.need * 1000)
+            timeline.set("arrival_rate", rate)
+        rate_text = f"{rate:.2f}x real time" if rate is not None else "rate unknown"
+        print(f"{colorama.Fore.CYAN}[Jitter] {'Start' if first else 'Resume'} with {buffered * 1000:.0f}ms buffered "
+              f"(arriving at {rate_text}, needed {playout.need * 1000:.0f}ms){colorama.Style.RESET_ALL}", end=" ", flush=True)
 
     def convert_audio(self, audio: BytesIO):
         """Convert audio using ElevenLabs and stream playback immediately."""
         try:
-            import time
             start_time = time.time()
+            timeline = Timeline()
             print(f"{colorama.Fore.CYAN}Sending to API...{colorama.Style.RESET_ALL}", end=" ", flush=True)
-            
-            # Use PCM format for instant decoding (no MP3 decode overhead)
-            # The convert method already returns a streaming generator
-            audio_stream = self.client.speech_to_speech.convert(
-                voice_id=self.voice_id,
-                audio=audio,
-                model_id=self.model_id,
-                output_format="pcm_22050",  # Raw PCM - no decode needed
-                # NOTE: remove_background_noise=True adds 5+ seconds of latency!
-                remove_background_noise=False,
-                optimize_streaming_latency=4,  # Max latency optimization (deprecated but may help)
-            )
-            
-            # Collect and resample chunks, then stream with minimal delay
-            first_chunk_time = None
-            chunk_count = 0
-            all_samples = []
-            all_audio_bytes = []
-            
-            for chunk in audio_stream:
-                if chunk:
-                    if first_chunk_time is None:
-                        first_chunk_time = time.time()
-                        latency = (first_chunk_time - start_time) * 1000
-                        print(f"{colorama.Fore.GREEN}First chunk in {latency:.0f}ms{colorama.Style.RESET_ALL}", end=" ", flush=True)
-                    
-                    # Immediately convert and resample each chunk
-                    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
-                    resampled = self._resample(samples, self.api_sample_rate, self.output_sample_rate)
-                    all_samples.append(resampled)
-                    all_audio_bytes.append(chunk)
-                    chunk_count += 1
-                    
-                    # Start playback after first few chunks to avoid underrun
-                    if chunk_count == 3 and len(all_samples) > 0:
-                        # Combine what we have so far and start playing
-                        initial_audio = np.concatenate(all_samples)
-                        print(f"(streaming...)", end=" ", flush=True)
-                        sd.play(initial_audio, samplerate=self.output_sample_rate, device=self.output_device)
-                        all_samples = []  # Clear, we'll append remaining
-            
-            # If we started early, queue remaining audio
-            if chunk_count > 3 and len(all_samples) > 0:
-                remaining = np.concatenate(all_samples)
-                # Wait for initial playback, then play rest
-                sd.wait()
-                if len(remaining) > 0:
-                    sd.play(remaining, samplerate=self.output_sample_rate, device=self.output_device)
-                    sd.wait()
-            elif len(all_samples) > 0:
-                # Short audio - play all at once
-                all_audio = np.concatenate(all_samples)
-                print(f"(playing...)", end=" ", flush=True)
-                sd.play(all_audio, samplerate=self.output_sample_rate, device=self.output_device)
-                sd.wait()
-            else:
-                sd.wait()  # Wait for any ongoing playback
-            
-            total_time = (time.time() - start_time) * 1000
-            print(f"{colorama.Fore.GREEN}Done! ({chunk_count} chunks, {total_time:.0f}ms){colorama.Style.RESET_ALL}")
-            
-            # Save for debugging (optional, in background)
-            if all_audio_bytes:
-                self._save_debug_audio(b''.join(all_audio_bytes))
-            
+            self.play_stream(self.stream_convert(audio, timeline, cache=True), start_time, timeline)
         except Exception as e:
             print(f"{colorama.Fore.RED}Error: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
             import traceback
             traceback.print_exc()
 
-    def _save_debug_audio(self, audio_bytes):
-        """Save audio to file in background for debugging."""
-        def save():
-            try:
-                import time
-                recordings_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "recordings")
-                os.makedirs(recordings_dir, exist_ok=True)
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                pcm_path = os.path.join(recordings_dir, f"transformed_{timestamp}.pcm")
-                with open(pcm_path, "wb") as f:
-                    f.write(audio_bytes)
-            except:
-                pass
-        
-        threading.Thread(target=save, daemon=True).start()
+    def prerender(self, paths, workers=2, voice_id=None):
+        """Convert a list of clips into the cache without playing them. Returns (cached before, converted, failed)."""
+        if self.cache is None:
+            print(f"{colorama.Fore.YELLOW}The cache is off (CACHE_MAX_MB=0){colorama.Style.RESET_ALL}")
+            return 0, 0, len(paths)
+        counts = {"cached": 0, "converted": 0, "failed": 0}
+        lock = threading.Lock()
+        pending = list(paths)
+
+        def render():
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    path = pending.pop(0)
+                try:
+                    with open(path, "rb") as f:
+                        audio = BytesIO(f.read())
+                    audio.name = os.path.basename(path)
+                    timeline = Timeline()
+                    received = sum(len(chunk) for chunk in self.stream_convert(audio, timeline, cache=True,
+                                                                                    voice_id=voice_id))
+                    if timeline.values.get("cache_hit"):
+                        outcome = "cached"
+                    elif received and not timeline.values.get("passthrough"):
+                        outcome = "converted"
+                    else:
+                        outcome = "failed"
+                except Exception as e:
+                    print(f"{colorama.Fore.RED}[Prerender] {path}: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+                    outcome = "failed"
+                with lock:
+                    counts[outcome] += 1
+                print(f"{colorama.Fore.CYAN}[Prerender] {outcome}: {os.path.basename(path)}{colorama.Style.RESET_ALL}")
+
+        threads = [threading.Thread(target=render, daemon=True) for _ in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts["cached"], counts["converted"], counts["failed"]
+
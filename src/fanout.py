@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import colorama
+import numpy as np
+
+from src.devices import find_device
+from src.el_client import ElevenLabsClient
+from src.metrics import Timeline
+from src.settings.audio import AudioSettings
+from src.settings.fanout import FanoutSettings
+
+
+class Voice:
+    """One target voice of a fan-out."""
+
+    def __init__(self, voice_id: str, gain=1.0, output: ElevenLabsClient = None):
+        self.voice_id = voice_id
+        self.gain = gain  # Level in the mix
+        self.output = output  # Where this voice plays with FANOUT_OUTPUT=devices
+
+
+class VoiceFanout:
+    """Converts every utterance into several voices at once.
+
+    The upload is encoded once and each voice gets its own reader over the
+    same bytes. The voices' requests run on a bounded pool shared by all
+    utterances, and their response chunks are merged as they arrive, tagged
+    with the voice. They are then either mixed into one stream for the
+    client's own output, or played on one output device per voice.
+    """
+
+    def __init__(self, el_client: ElevenLabsClient, voices, output="mix", workers=None):
+        self.el_client = el_client
+        self.voices = voices
+        self.output = output
+        self.pool = ThreadPoolExecutor(max_workers=workers or len(voices), thread_name_prefix="voice")
+
+    @classmethod
+    def from_env(cls, el_client: ElevenLabsClient):
+        """The fan-out configured by FANOUT_VOICES, or None for the single VOICE_ID."""
+        settings = FanoutSettings.from_env()
+        if not settings.voices:
+            return None
+        if settings.output not in settings.valid_outputs():
+            print(f"{colorama.Fore.YELLOW}Unknown FANOUT_OUTPUT '{settings.output}', using mix{colorama.Style.RESET_ALL}")
+            settings.output = "mix"
+        voices = []
+        outputs = {el_client.output_device: el_client}  # Device index -> the client view playing there
+        taken = {}  # Device index -> the voice playing there
+        for voice_id, gain, device in settings.voices:
+            index = el_client.output_device
+            if settings.output == "devices":
+                if device is not None:
+                    found, name = find_device(device, kind="output")
+                    if found is None:
+                        print(f"{colorama.Fore.YELLOW}[Fan-out] No output device matches '{device}', {voice_id} plays on the main output{colorama.Style.RESET_ALL}")
+                    else:
+                        index = found
+                        print(f"{colorama.Fore.CYAN}[Fan-out] {voice_id} plays on {name}{colorama.Style.RESET_ALL}")
+                if index in taken:
+                    # One view's resampler, crossfade and jitter buffer cannot serve two streams at once
+                    raise ValueError(f"FANOUT_OUTPUT=devices: {taken[index]} and {voice_id} would both play on "
+                                     f"{'the main output' if index == el_client.output_device else device}; "
+                                     f"give each voice its own device or use FANOUT_OUTPUT=mix")
+                taken[index] = voice_id
+                if index not in outputs:
+                    outputs[index] = el_client.for_output(index)
+            voices.append(Voice(voice_id, gain, outputs[index]))
+        workers = settings.pool_workers(AudioSettings.from_env().convert_workers)
+        names = ", ".join(f"{v.voice_id} x{v.gain:g}" for v in voices)
+        print(f"{colorama.Fore.CYAN}[Fan-out] {len(voices)} voices ({settings.output}): {names}, "
+              f"{workers} requests at once{colorama.Style.RESET_ALL}")
+        return cls(el_client, voices, settings.output, workers)
+
+    def stream(self, audio, timeline: Timeline, cancelled: threading.Event, cache=None):
+        """Start every voice's conversion and yield (voice index, chunk) as chunks arrive.
+
+        (index, None) marks the end of that voice. The utterance's timeline
+        gets first_byte from the first voice to answer; each voice's own time
+        to first byte, pool wait included, goes into voice_ttfb_ms.
+        """
+        # Every voice reads the same encoded upload; a live upload's readers follow the capture
+        bodies = [audio] + [ElevenLabsClient._clone(audio) for _ in self.voices[1:]]
+        events = queue.Queue()
+        ttfb = [None] * len(self.voices)
+        timeline.set("voices", len(self.voices))
+        timeline.set("voice_id", [v.voice_id for v in self.voices])  # All of them are in the mix
+        timeline.set("model_id", self.el_client.model_id)
+        timeline.set("voice_ttfb_ms", ttfb)
+        timeline.mark("request_sent")
+        sent = timeline.marks["request_sent"]
+        voice_timelines = []
+
+        def convert(index, body, voice_timeline):
+            try:
+                for chunk in self.el_client.stream_convert(body, voice_timeline, cancelled, cache,
+                                                           voice_id=self.voices[index].voice_id):
+                    if cancelled.is_set():
+                        break
+                    if chunk:
+                        events.put((index, chunk))
+            except Exception as e:
+                print(f"{colorama.Fore.RED}[Fan-out] {self.voices[index].voice_id}: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+            finally:
+                events.put((index, None))
+
+        for index, body in enumerate(bodies):
+            voice_timeline = Timeline()
+            voice_timelines.append(voice_timeline)
+            if body is None:
+                events.put((index, None))  # Only one voice can read an upload that cannot be replayed
+                continue
+            self.pool.submit(convert, index, body, voice_timeline)
+
+        remaining = len(bodies)
+        while remaining:
+            index, chunk = events.get()
+            if chunk is None:
+                remaining -= 1
+            elif ttfb[index] is None:
+                now = time.perf_counter()
+                ttfb[index] = (now - sent) * 1000
+                if "first_byte" not in timeline.marks:
+                    timeline.mark("first_byte", now)
+            yield index, chunk
+
+        # A voice that fell back or came from the cache is worth knowing about in the stats
+        for voice, voice_timeline in zip(self.voices, voice_timelines):
+            if "passthrough" in voice_timeline.values:
+                timeline.set("passthrough", f"{voice.voice_id}: {voice_timeline.values['passthrough']}")
+        if all(t.values.get("cache_hit") for t in voice_timelines):
+            timeline.set("cache_hit", True)
+
+    def mix(self, chunks):
+        """Sum the voices' pcm_22050 streams with their gains, yielding mixed chunks as soon as they are final.
+
+        A voice joins the mix at the point the mix has reached when its first
+        chunk arrives, so the first voice to answer plays at once and a later
+        one starts late by the difference. Once joined, a voice holds the mix
+        back only until its own audio for that stretch has arrived.
+        """
+        count = len(self.voices)
+        pending = [np.zeros(0, dtype=np.float32) for _ in range(count)]  # Received, not mixed yet
+        carry = [b""] * count  # Odd trailing byte of the last chunk
+        joined, done = [False] * count, [False] * count
+        for index, chunk in chunks:
+            if chunk is None:
+                done[index] = True
+            else:
+                data = carry[index] + chunk
+                whole = len(data) & ~1
+                carry[index] = data[whole:]
+                samples = np.frombuffer(data[:whole], dtype="<i2").astype(np.float32) * self.voices[index].gain
+                pending[index] = np.concatenate([pending[index], samples])
+                joined[index] = True
+            active = [i for i in range(count) if joined[i] and not done[i]]
+            ready = min(len(pending[i]) for i in active) if active else max(len(p) for p in pending)
+            if ready == 0:
+                continue
+            out = np.zeros(ready, dtype=np.float32)
+            for i in range(count):
+                take = pending[i][:ready]
+                out[:len(take)] += take
+                pending[i] = pending[i][len(take):]
+            yield np.clip(out, -32768, 32767).astype("<i2").tobytes()
+
+    def play(self, chunks, start_time, timeline: Timeline, continues=False, cancelled: threading.Event = None):
+        """Play the merged (voice index, chunk) stream of one utterance: mixed, or each voice on its own output."""
+        if self.output == "mix":
+            self.el_client.play_stream(self.mix(chunks), start_time, timeline, continues, cancelled)
+            return
+        # One play_stream per output, started with that voice's first chunk
+        queues, threads = {}, []
+        try:
+            for index, chunk in chunks:
+                if index not in queues:
+                    if chunk is None:
+                        continue  # Nothing came back for this voice
+                    voice = self.voices[index]
+                    queues[index] = queue.Queue()
+                    voice_timeline = Timeline()
+                    voice_timeline.marks.update(timeline.marks)
+                    voice_timeline.values.update(timeline.values)
+                    voice_timeline.mark("first_byte", timeline.marks["request_sent"] + timeline.values["voice_ttfb_ms"][index] / 1000)
+                    voice_timeline.set("voice_id", voice.voice_id)
+                    thread = threading.Thread(target=voice.output.play_stream, name=f"play-{voice.voice_id}",
+                                              args=(iter(queues[index].get, None), start_time, voice_timeline, continues, cancelled),
+                                              daemon=True)
+                    thread.start()
+                    threads.append(thread)
+                queues[index].put(chunk)
+        finally:
+            for q in queues.values():
+                q.put(None)
+            for thread in threads:
+                thread.join()
+
+    def stop_playback(self):
+        """Silence every voice's output (barge-in)."""
+        for voice in self.voices:
+            voice.output.stop_playback()
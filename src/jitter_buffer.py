@@ -0,0 +1,135 @@
+import time
+
+MIN_WINDOW = 0.15  # Seconds of arrivals before a response's own rate is trusted
+BURST = 0.015  # Reads closer together than this are one network delivery (a few GIL switch intervals)
+
+
+class JitterBuffer:
+    """Decides when each utterance's playback starts, from how fast its audio is arriving.
+
+    Audio arrives at some rate r (audio seconds per wall second). Started
+    with B seconds buffered, playback never runs dry if B covers the gap the
+    remaining audio R opens while it trickles in: B >= R * (1 - r) / r when
+    r < 1. Audio comes in bursts, so the wait until the next delivery (one
+    burst period, burst length / r, after the latest burst began) is added,
+    and a cushion on top of that for arrival jitter. The cushion (target
+    depth) is stretched after every underrun and relaxes again over clean
+    utterances. The arrival rate and jitter carry over between utterances,
+    so the first chunks of a response are judged against recent history.
+    """
+
+    def __init__(self, min_ms=40.0, max_ms=1000.0, stretch=1.5, relax=0.9, jitter_k=2.0):
+        self.min_target = min_ms / 1000
+        self.max_target = max_ms / 1000
+        self.target = self.min_target  # Cushion on top of the projection, in seconds
+        self.stretch = stretch  # Target multiplier after an underrun
+        self.relax = relax  # Target multiplier after an utterance without underruns
+        self.jitter_k = jitter_k  # Cushion per second of measured arrival jitter
+        self.rate = None  # Arrival rate of recent utterances (audio s per wall s)
+        self.jitter = 0.0  # Smoothed deviation of chunk arrivals from the projection, seconds
+        self.granule = 0.0  # Largest burst of audio per delivery in the last response, seconds
+
+    def open(self, expected_seconds=None) -> "Playout":
+        """Start tracking one response; expected_seconds is its likely length (the input's)."""
+        return Playout(self, expected_seconds)
+
+    def cushion(self) -> float:
+        return min(self.target + self.jitter_k * self.jitter, self.max_target)
+
+
+class Playout:
+    """Arrivals and the start decision for one response."""
+
+    def __init__(self, buffer: JitterBuffer, expected_seconds=None):
+        self.buffer = buffer
+        self.expected = expected_seconds
+        self.received = 0.0  # Audio seconds received
+        self.started = False
+        self.first_at = None
+        self.last_at = None  # When the latest burst began
+        self.last_seconds = 0.0  # Audio in the latest burst
+        self.read_at = None  # When the latest chunk was read
+        self.largest = 0.0  # Largest completed burst
+        self.need = 0.0  # Buffered seconds required at the last decision
+        self.start_at = None  # When playback can start if nothing more arrives (None: not before the next arrival)
+        self.underruns = 0
+
+    def arrived(self, seconds: float, now: float = None):
+        """Record a chunk. Chunks arrive in bursts (one network read split up), so rate and jitter go by burst."""
+        now = time.perf_counter() if now is None else now
+        self.received += seconds
+        previous, self.read_at = self.read_at, now
+        if self.first_at is None:
+            self.first_at = self.last_at = now
+            self.last_seconds = seconds
+            return
+        if now - previous < BURST:
+            self.last_seconds += seconds
+            return
+        rate = self.rate(now)
+        if rate:
+            # RFC 3550-style jitter: how far this gap strays from the previous burst's length at rate
+            deviation = abs((now - self.last_at) - self.last_seconds / rate)
+            self.buffer.jitter += (deviation - self.buffer.jitter) / 16
+        self.largest = max(self.largest, self.last_seconds)
+        self.last_at, self.last_seconds = now, seconds
+
+    def rate(self, now: float = None):
+        """Audio seconds arriving per wall second, blending in history over the first half second.
+
+        None while there is neither history nor MIN_WINDOW of arrivals to go on.
+        """
+        now = time.perf_counter() if now is None else now
+        prior = self.buffer.rate
+        elapsed = now - self.first_at if self.first_at is not None else 0.0
+        if elapsed < MIN_WINDOW:
+            return prior
+        if self.last_at > self.first_at:
+            # The deliveries before the latest over the time they took, lower if the next one is overdue
+            measured = min((self.received - self.last_seconds) / (self.last_at - self.first_at), self.received / elapsed)
+        else:
+            measured = 0.0  # Nothing since the first delivery
+        if prior is None:
+            return measured
+        weight = min(1.0, elapsed / 0.5)
+        return weight * measured + (1 - weight) * prior
+
+    def ready(self, buffered: float, now: float = None) -> bool:
+        """Should playback (re)start with buffered seconds waiting?"""
+        if self.started:
+            return True
+        now = time.perf_counter() if now is None else now
+        self.start_at = None
+        rate = self.rate(now)
+        if rate is None:
+            return False  # Nothing to project from yet; the next arrivals will tell
+        granule = self.largest or max(self.buffer.granule, self.last_seconds)
+        need = self.buffer.cushion()
+        if self.expected is not None and rate < 1.0:
+            remaining = max(0.0, self.expected - self.received)
+            need += remaining * (1 - rate) / max(rate, 1e-3)
+        # The burst in hand is already buffered: only the part of the wait for the next one still ahead counts
+        next_at = self.last_at + granule / max(rate, 1e-3)
+        self.need = need + max(0.0, next_at - now)
+        self.started = buffered >= self.need
+        if not self.started and buffered >= need:
+            self.start_at = next_at - (buffered - need)
+        return self.started
+
+    def underrun(self):
+        """Playback ran dry: stretch the target depth and buffer up again before resuming."""
+        self.underruns += 1
+        self.buffer.target = min(self.buffer.target * self.buffer.stretch, self.buffer.max_target)
+        self.started = False
+
+    def close(self, now: float = None):
+        """Fold this response's arrival rate into the history."""
+        now = time.perf_counter() if now is None else now
+        if self.first_at is not None and self.last_at > self.first_at:
+            measured = (self.received - self.last_seconds) / (self.last_at - self.first_at)  # The last burst may be short
+            prior = self.buffer.rate
+            self.buffer.rate = measured if prior is None else 0.7 * prior + 0.3 * measured
+        if self.largest:
+            self.buffer.granule = self.largest
+        if not self.underruns:
+            self.buffer.target = max(self.buffer.target * self.buffer.relax, self.buffer.min_target)
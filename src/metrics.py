@@ -0,0 +1,152 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# (stage, from mark, to mark). Every mark is a time.perf_counter() timestamp.
+STAGES = [
+    ("vad_decision", "speech_end", "vad_decision"),
+    ("queue", "vad_decision", "encode_start"),
+    ("denoise", "denoise_start", "denoise_end"),  # DENOISE=1 only, inside encode
+    ("encode", "encode_start", "encode_end"),
+    ("time_to_first_byte", "request_sent", "first_byte"),
+    ("server_wait", "upload_end", "first_byte"),  # Streaming uploads only
+    ("first_audible", "first_byte", "first_audio"),
+    ("playback", "first_audio", "playback_end"),
+    ("end_to_end", "speech_end", "first_audio"),
+]
+
+PERCENTILES = (50, 95, 99)
+
+_ids = itertools.count(1)
+
+
+class Timeline:
+    """Monotonic timestamps for each stage of one utterance."""
+
+    def __init__(self):
+        self.id = next(_ids)
+        self.marks = {}
+        self.values = {}  # Non-timing facts worth exporting (bytes, seconds, counts)
+
+    def mark(self, name: str, t: float = None):
+        self.marks[name] = time.perf_counter() if t is None else t
+
+    def set(self, name: str, value):
+        self.values[name] = value
+
+    def durations(self) -> dict:
+        """Stage durations in milliseconds for every stage whose marks are present."""
+        out = {}
+        for stage, a, b in STAGES:
+            if a in self.marks and b in self.marks:
+                out[stage] = (self.marks[b] - self.marks[a]) * 1000
+        return out
+
+
+class Metrics:
+    """Rolling per-stage latency windows with optional JSONL and Prometheus text export."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.jsonl_path = None
+        self.prometheus_path = None
+        self.completed = 0
+        self._listeners = []
+        self._samples = {stage: deque(maxlen=window) for stage, _, _ in STAGES}
+        self._lock = threading.Lock()
+
+    def configure(self, jsonl_path=None, prometheus_path=None, window=None):
+        with self._lock:
+            self.jsonl_path = jsonl_path or None
+            self.prometheus_path = prometheus_path or None
+            if window and window != self.window:
+                self.window = window
+                self._samples = {k: deque(v, maxlen=window) for k, v in self._samples.items()}
+
+    def subscribe(self, callback):
+        """Call callback(timeline) for every recorded utterance (used by the offline harness)."""
+        self._listeners.append(callback)
+
+    def record(self, timeline: Timeline):
+        """Fold a finished utterance into the rolling windows and export it."""
+        durations = timeline.durations()
+        with self._lock:
+            self.completed += 1
+            for stage, value in durations.items():
+                self._samples[stage].append(value)
+            jsonl_path, prometheus_path = self.jsonl_path, self.prometheus_path
+        for callback in self._listeners:
+            callback(timeline)
+
+        if jsonl_path:
+            line = {"id": timeline.id, "time": time.time(), "stages_ms": durations, **timeline.values}
+            try:
+                with open(jsonl_path, "a") as f:
+                    f.write(json.dumps(line) + "\n")
+            except OSError:
+                pass
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+
+    def summary(self) -> dict:
+        """{stage: {"count", "p50", "p95", "p99"}} over the rolling window."""
+        with self._lock:
+            snapshot = {stage: np.array(values) for stage, values in self._samples.items()}
+        out = {}
+        for stage, values in snapshot.items():
+            if len(values) == 0:
+                continue
+            quantiles = np.percentile(values, PERCENTILES)
+            out[stage] = {"count": len(values), **{f"p{p}": float(q) for p, q in zip(PERCENTILES, quantiles)}}
+        return out
+
+    def percentile(self, stage: str, q: float, min_count: int = 20):
+        """q-th percentile of one stage over the rolling window, or None with fewer than min_count samples."""
+        with self._lock:
+            values = np.array(self._samples[stage])
+        if len(values) < min_count:
+            return None
+        return float(np.percentile(values, q))
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP live_vc_stage_latency_ms Per-stage utterance latency over the rolling window.",
+            "# TYPE live_vc_stage_latency_ms summary",
+        ]
+        for stage, s in self.summary().items():
+            for p in PERCENTILES:
+                lines.append(f'live_vc_stage_latency_ms{{stage="{stage}",quantile="{p / 100}"}} {s[f"p{p}"]:.3f}')
+            lines.append(f'live_vc_stage_latency_ms_count{{stage="{stage}"}} {s["count"]}')
+        lines.append("# HELP live_vc_utterances_total Utterances that finished playback.")
+        lines.append("# TYPE live_vc_utterances_total counter")
+        lines.append(f"live_vc_utterances_total {self.completed}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write atomically so a textfile collector never reads a partial file."""
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def format(self) -> str:
+        summary = self.summary()
+        if not summary:
+            return "No completed utterances yet."
+        rows = [f"{'stage':<20} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for stage, _, _ in STAGES:
+            if stage in summary:
+                s = summary[stage]
+                rows.append(f"{stage:<20} {s['count']:>6} {s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f}")
+        return "\n".join(rows)
+
+
+# Process-wide registry shared by the recorder, processor, client and handler
+metrics = Metrics()
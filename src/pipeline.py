@@ -0,0 +1,137 @@
+import itertools
+import queue
+import threading
+import time
+import traceback
+import colorama
+
+from src.audio_processor import AudioProcessor
+from src.el_client import ElevenLabsClient
+from src.fanout import VoiceFanout
+from src.metrics import Timeline
+from src.settings.audio import AudioSettings
+
+
+class Utterance:
+    """One captured utterance travelling through the pipeline."""
+
+    def __init__(self, seq: int, audio, timeline: Timeline = None, continues=False, cache=None):
+        self.seq = seq
+        self.audio = audio
+        self.timeline = timeline or Timeline()
+        self.continues = continues  # The next utterance is the following part of this one
+        self.cache = cache  # Use the converted audio cache (None: CACHE_LIVE decides)
+        self.captured_at = time.time()
+        self.chunks = queue.Queue()  # Response chunks, terminated by None
+        self.cancelled = threading.Event()  # Set on barge-in: stop converting and playing
+
+
+class ConversionPipeline:
+    """Capture -> upload/convert -> playback stages connected by bounded queues.
+
+    Utterances are converted concurrently by a pool of worker threads and
+    played back strictly in the order they were captured. Each utterance's
+    response chunks are forwarded to the playback stage as they arrive, so
+    the head of the queue still streams while later utterances convert.
+    With a fan-out, each utterance is converted into all of its voices.
+    """
+
+    def __init__(self, processor: AudioProcessor, el_client: ElevenLabsClient, settings: AudioSettings,
+                 fanout: VoiceFanout = None):
+        self.processor = processor
+        self.el_client = el_client
+        self.settings = settings
+        self.fanout = fanout
+        self._seq = itertools.count(1)
+        self._convert_queue = queue.Queue(maxsize=settings.max_pending)
+        self._playback_queue = queue.Queue(maxsize=settings.max_pending)
+        self._submit_lock = threading.Lock()
+        self._in_flight = []  # Submitted and not yet fully played, in playback order
+
+        self._workers = []
+        for i in range(settings.convert_workers):
+            worker = threading.Thread(target=self._convert_loop, name=f"convert-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self._player_thread = threading.Thread(target=self._playback_loop, name="playback", daemon=True)
+        self._player_thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Utterances captured but not yet fully played."""
+        return len(self._in_flight)
+
+    def cancel_all(self) -> int:
+        """Barge-in: abandon every utterance in flight and silence the output. Returns how many."""
+        with self._submit_lock:
+            cancelled = [u for u in self._in_flight if not u.cancelled.is_set()]
+            for utterance in cancelled:
+                utterance.cancelled.set()
+        # Flags first, so a chunk written after this flush is caught by play_stream
+        self.el_client.stop_playback()
+        if self.fanout is not None:
+            self.fanout.stop_playback()
+        return len(cancelled)
+
+    def submit(self, audio, timeline: Timeline = None, continues=False, cache=None):
+        """Hand a captured utterance to the convert stage. Returns it, or None if the pipeline is full.
+
+        audio may also be a LiveWavStream that is still being recorded; its
+        worker uploads it as it grows. Parts of a split utterance are
+        submitted with continues=True except the last, and are played
+        back to back with a crossfade. An already encoded file (a soundboard
+        clip) is uploaded as is; pass cache=True to serve repeats from the cache.
+        """
+        with self._submit_lock:
+            if self._playback_queue.full():
+                print(f"{colorama.Fore.YELLOW}Pipeline full ({self.settings.max_pending} pending), dropping utterance{colorama.Style.RESET_ALL}")
+                return None
+            utterance = Utterance(next(self._seq), audio, timeline, continues, cache)
+            # Playback order is fixed here, conversion order is up to the workers
+            self._in_flight.append(utterance)
+            self._playback_queue.put(utterance)
+            self._convert_queue.put(utterance)
+        return utterance
+
+    def _convert_loop(self):
+        while True:
+            utterance = self._convert_queue.get()
+            try:
+                if utterance.cancelled.is_set():
+                    continue
+                audio_stream = self.processor.get_audio_stream(utterance.audio, utterance.timeline)
+                utterance.audio = None
+                if audio_stream is None:
+                    continue
+                if self.fanout is not None:
+                    # (voice index, chunk) items, all voices from one encoded upload
+                    stream = self.fanout.stream(audio_stream, utterance.timeline, utterance.cancelled, cache=utterance.cache)
+                else:
+                    stream = self.el_client.stream_convert(audio_stream, utterance.timeline, utterance.cancelled,
+                                                           cache=utterance.cache)
+                for chunk in stream:
+                    if utterance.cancelled.is_set():
+                        break
+                    if chunk:
+                        utterance.chunks.put(chunk)
+            except Exception as e:
+                print(f"{colorama.Fore.RED}Error: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+                traceback.print_exc()
+            finally:
+                utterance.chunks.put(None)
+
+    def _playback_loop(self):
+        while True:
+            utterance = self._playback_queue.get()
+            try:
+                chunks = iter(utterance.chunks.get, None)
+                # A live upload only learns whether it continues when its body closes
+                play = self.fanout.play if self.fanout is not None else self.el_client.play_stream
+                play(chunks, utterance.captured_at, utterance.timeline,
+                     continues=lambda: utterance.continues, cancelled=utterance.cancelled)
+            except Exception as e:
+                print(f"{colorama.Fore.RED}Playback error: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+                traceback.print_exc()
+            finally:
+                with self._submit_lock:
+                    self._in_flight.remove(utterance)
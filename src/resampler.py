@@ -0,0 +1,154 @@
+from math import gcd
+import numpy as np
+
+
+class StreamingResampler:
+    """Stateful polyphase windowed-sinc resampler for chunked float32 audio.
+
+    Filter history and the fractional output position are carried across
+    calls, so feeding a stream chunk by chunk produces the same samples as
+    resampling it in one go. Work buffers are preallocated and only grow
+    when a larger chunk than any seen before arrives.
+    """
+
+    def __init__(self, orig_rate: int, target_rate: int, taps_per_phase: int = 24,
+                 rolloff: float = 0.9, beta: float = 8.0, max_chunk: int = 8192,
+                 compensate_delay: bool = True):
+        g = gcd(orig_rate, target_rate)
+        self.orig_rate = orig_rate
+        self.target_rate = target_rate
+        self.up = target_rate // g  # L
+        self.down = orig_rate // g  # M
+        self.taps = taps_per_phase
+        self.compensate_delay = compensate_delay
+
+        # Prototype low-pass at the upsampled rate, split into L phases
+        L, M, T = self.up, self.down, self.taps
+        length = T * L
+        center = (length - 1) / 2.0
+        cutoff = 0.5 / max(L, M) * rolloff  # cycles per upsampled sample
+        n = np.arange(length, dtype=np.float64) - center
+        proto = 2.0 * cutoff * L * np.sinc(2.0 * cutoff * n) * np.kaiser(length, beta)
+        # bank[p, j] multiplies x[idx - (T - 1 - j)] for output phase p
+        self._bank = np.ascontiguousarray(proto.reshape(T, L).T[:, ::-1], dtype=np.float32)
+
+        # Group delay of the filter, in output samples
+        self.delay = int(round(center / M))
+
+        self._capacity = 0
+        self._in_capacity = 0
+        self._ensure_input(max_chunk)
+        self._ensure_output(self.output_length(max_chunk) + 1)
+        self.reset()
+
+    def output_length(self, n_input: int) -> int:
+        """Upper bound on outputs produced for n_input new samples."""
+        return (n_input * self.up) // self.down + 1
+
+    def reset(self):
+        """Forget history so the next call starts a new stream."""
+        self._buf[:self.taps - 1] = 0.0
+        self._t0 = 0  # Position of the next output, in upsampled units past the history
+        self._skip = self.delay if self.compensate_delay else 0
+        self._carry = b""
+        self._in_total = 0
+        self._out_total = 0
+
+    def _ensure_input(self, n):
+        if n <= self._in_capacity:
+            return
+        self._in_capacity = max(n, self._in_capacity * 2)
+        buf = np.zeros(self.taps - 1 + self._in_capacity, dtype=np.float32)
+        if hasattr(self, "_buf"):
+            buf[:self.taps - 1] = self._buf[:self.taps - 1]
+        self._buf = buf
+        # Strided view: row i is the T-sample window starting at buf[i]
+        self._windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+
+    def _ensure_output(self, n):
+        if n <= self._capacity:
+            return
+        self._capacity = max(n, self._capacity * 2)
+        cap, T = self._capacity, self.taps
+        self._n = np.arange(cap, dtype=np.int64)
+        self._pos = np.empty(cap, dtype=np.int64)
+        self._idx = np.empty(cap, dtype=np.int64)
+        self._ph = np.empty(cap, dtype=np.int64)
+        self._gathered = np.empty((cap, T), dtype=np.float32)
+        self._coefs = np.empty((cap, T), dtype=np.float32)
+        self._out = np.empty(cap, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample one chunk of float32 samples.
+
+        The returned array is a view into an internal buffer and is only
+        valid until the next call.
+        """
+        count = len(samples)
+        self._ensure_input(count)
+        self._buf[self.taps - 1:self.taps - 1 + count] = samples
+        return self._run(count)
+
+    def process_pcm16(self, chunk: bytes) -> np.ndarray:
+        """Resample raw little-endian int16 PCM, carrying odd trailing bytes over."""
+        if self._carry:
+            chunk = self._carry + chunk
+            self._carry = b""
+        if len(chunk) % 2:
+            self._carry = chunk[-1:]
+            chunk = chunk[:-1]
+        ints = np.frombuffer(chunk, dtype=np.int16)
+        count = len(ints)
+        self._ensure_input(count)
+        np.multiply(ints, np.float32(1.0 / 32768.0), out=self._buf[self.taps - 1:self.taps - 1 + count],
+                    dtype=np.float32)
+        return self._run(count)
+
+    def flush(self) -> np.ndarray:
+        """Push the filter tail out at the end of a stream and reset."""
+        tail = -(-(self.taps * self.up) // (2 * self.up)) + 1
+        self._ensure_input(tail)
+        self._buf[self.taps - 1:self.taps - 1 + tail] = 0.0
+        real_in = self._in_total
+        out = self._run(tail)
+        if self.compensate_delay:
+            # Only emit what corresponds to real input, not the zero padding
+            expected = -(-(real_in * self.up) // self.down)
+            out = out[:max(0, expected - (self._out_total - len(out)))]
+        result = out.copy()
+        self.reset()
+        return result
+
+    def _run(self, count: int) -> np.ndarray:
+        L, M, T = self.up, self.down, self.taps
+        limit = count * L - 1 - self._t0
+        n_out = limit // M + 1 if limit >= 0 else 0
+        self._ensure_output(n_out)
+
+        if n_out:
+            pos = self._pos[:n_out]
+            idx = self._idx[:n_out]
+            ph = self._ph[:n_out]
+            np.multiply(self._n[:n_out], M, out=pos)
+            pos += self._t0
+            np.floor_divide(pos, L, out=idx)
+            np.remainder(pos, L, out=ph)
+
+            gathered = self._gathered[:n_out]
+            coefs = self._coefs[:n_out]
+            np.take(self._windows, idx, axis=0, out=gathered, mode='clip')
+            np.take(self._bank, ph, axis=0, out=coefs, mode='clip')
+            np.einsum('ij,ij->i', gathered, coefs, out=self._out[:n_out])
+
+        self._t0 += n_out * M - count * L
+        # Keep the last T - 1 inputs as history for the next chunk
+        self._buf[:T - 1] = self._buf[count:count + T - 1]
+
+        out = self._out[:n_out]
+        if self._skip:
+            drop = min(self._skip, n_out)
+            self._skip -= drop
+            out = out[drop:]
+        self._in_total += count
+        self._out_total += len(out)
+        return out
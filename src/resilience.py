@@ -0,0 +1,91 @@
+import random
+import threading
+import time
+
+
+class FirstByteTimeout(Exception):
+    """No response byte arrived within the first-byte timeout."""
+
+
+class Cancelled(Exception):
+    """The utterance was cancelled (barge-in) while its request was running."""
+
+
+class CircuitBreaker:
+    """Stops sending requests to an API that keeps failing.
+
+    closed: requests flow. After `failures` consecutive failures the circuit
+    opens and allow() refuses for reset_seconds. Then it is half-open: one
+    trial request is let through, and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failures=3, reset_seconds=30.0):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._count = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half-open"
+                return True  # The trial request
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._count = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._count += 1
+            if self.state == "half-open" or self._count >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def backoff(attempt: int, base: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, base * 2^attempt]."""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+class Attempt:
+    """One streaming request consumed on its own thread.
+
+    Every chunk, the end of the stream or the exception is put on the shared
+    events queue as (attempt, kind, payload), so several attempts can race.
+    A cancelled attempt stops at its next chunk and closes its response.
+    """
+
+    def __init__(self, events, request, number: int = 0):
+        self.number = number
+        self.cancelled = False
+        self.done = False
+        self._events = events
+        self._request = request
+        self._thread = threading.Thread(target=self._run, name=f"request-{number}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run(self):
+        stream = None
+        try:
+            stream = self._request()
+            for chunk in stream:
+                if self.cancelled:
+                    break
+                if chunk:
+                    self._events.put((self, "chunk", chunk))
+            self._events.put((self, "end", None))
+        except Exception as e:
+            self._events.put((self, "error", e))
+        finally:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
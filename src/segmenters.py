@@ -0,0 +1,169 @@
+import numpy as np
+
+from src.settings.audio import AudioSettings
+from src.vad import VADEngine
+
+
+class Segment:
+    """Half-open range [start, end) of absolute sample indices in the capture stream.
+
+    VAD segments also carry the first and last voiced sample, and final=False
+    when the utterance carries on after this part (split at a pause).
+    """
+
+    def __init__(self, start: int, end: int, onset: int = None, voice_end: int = None, final: bool = True):
+        self.start = start
+        self.end = end
+        self.onset = start if onset is None else onset
+        self.voice_end = end if voice_end is None else voice_end
+        self.final = final
+
+    def __len__(self):
+        return max(0, self.end - self.start)
+
+    def __repr__(self):
+        return f"Segment({self.start}, {self.end})"
+
+
+class ManualSegmenter:
+    """Push-to-talk: the segment runs from begin() to end()."""
+
+    def __init__(self):
+        self.start_index = None
+
+    @property
+    def active(self) -> bool:
+        return self.start_index is not None
+
+    def begin(self, index: int):
+        self.start_index = index
+
+    def end(self, index: int):
+        if self.start_index is None:
+            return None
+        segment = Segment(self.start_index, index)
+        self.start_index = None
+        return segment
+
+
+class VADSegmenter:
+    """Cuts utterances out of the continuous capture stream using a VADEngine.
+
+    Decisions are made per frame and all timing is counted in samples: speech
+    starts after onset_frames consecutive voiced frames and ends exactly
+    silence_duration worth of samples after the last voiced frame. With
+    split_pause set, speech that resumes after a shorter pause is split in
+    the middle of the pause once the current part is min_split long; those
+    parts come back with final=False.
+    """
+
+    def __init__(self, sample_rate: int, engine: VADEngine = None, silence_duration=0.8,
+                 min_duration=0.3, pre_buffer_duration=0.5, onset_duration=0.03,
+                 split_pause=0.0, min_split=2.0):
+        self.sample_rate = sample_rate
+        self.engine = engine or VADEngine(sample_rate)
+        self.frame = self.engine.frame
+        self.silence_samples = int(silence_duration * sample_rate)
+        self.min_samples = int(min_duration * sample_rate)
+        self.pre_buffer_samples = int(pre_buffer_duration * sample_rate)
+        self.onset_frames = max(1, int(round(onset_duration * sample_rate / self.frame)))
+        self.split_samples = int(split_pause * sample_rate)
+        self.min_split_samples = int(min_split * sample_rate)
+        self._carry = np.zeros((0, 1), dtype=np.float32)
+        self._carry_start = 0
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings: AudioSettings):
+        engine = VADEngine(
+            settings.sample_rate,
+            frame_ms=settings.vad_frame_ms,
+            onset_db=settings.vad_onset_db,
+            offset_db=settings.vad_offset_db,
+            min_level_db=settings.vad_min_level_db,
+            max_flatness=settings.vad_max_flatness,
+            calibration_seconds=settings.vad_calibration_seconds
+        )
+        return cls(
+            settings.sample_rate,
+            engine,
+            silence_duration=settings.vad_silence_duration,
+            min_duration=settings.vad_min_duration,
+            pre_buffer_duration=settings.vad_pre_buffer,
+            onset_duration=settings.vad_onset_ms / 1000,
+            split_pause=settings.split_pause,
+            min_split=settings.split_min_seconds
+        )
+
+    def reset(self):
+        """Forget the current utterance. The engine keeps its noise floor."""
+        self.in_speech = False
+        self.start_index = 0  # Segment start, including the pre-buffer lead-in
+        self.onset_index = 0  # First voiced sample
+        self.last_voice_index = 0  # End of the last voiced frame
+        self._run = 0  # Consecutive voiced frames while waiting for onset
+        self._run_start = 0
+
+    def force_start(self, index: int):
+        """Begin a segment now regardless of level (manual trigger in VAD mode)."""
+        self.in_speech = True
+        self._run = 0
+        self.start_index = self.onset_index = self.last_voice_index = index
+
+    def force_end(self, index: int):
+        """End the current segment now, if any."""
+        if not self.in_speech:
+            return None
+        self.in_speech = False
+        return Segment(self.start_index, index, self.onset_index, self.last_voice_index)
+
+    def feed(self, block: np.ndarray, start: int):
+        """Process samples starting at absolute index start. Returns a Segment when one ends."""
+        block = block.reshape(len(block), -1)
+        if len(self._carry) and self._carry_start + len(self._carry) == start:
+            block = np.concatenate([self._carry, block])
+            start = self._carry_start
+        n = len(block) // self.frame
+        self._carry = block[n * self.frame:].copy()
+        self._carry_start = start + n * self.frame
+        if n == 0:
+            return None
+
+        mono = block[:n * self.frame].mean(axis=1) if block.shape[1] > 1 else block[:n * self.frame, 0]
+        levels, zcrs, flatness = self.engine.features(mono.reshape(n, self.frame))
+
+        ended = None
+        for i in range(n):
+            frame_start = start + i * self.frame
+            frame_end = frame_start + self.frame
+            voiced = self.engine.decide(levels[i], zcrs[i], flatness[i], self.in_speech)
+
+            if not self.in_speech:
+                if not voiced:
+                    self._run = 0
+                    continue
+                if self._run == 0:
+                    self._run_start = frame_start
+                self._run += 1
+                if self._run >= self.onset_frames:
+                    self.in_speech = True
+                    self._run = 0
+                    self.onset_index = self._run_start
+                    self.start_index = max(0, self.onset_index - self.pre_buffer_samples)
+                    self.last_voice_index = frame_end
+                continue
+
+            if voiced:
+                gap = frame_start - self.last_voice_index
+                if (self.split_samples and gap >= self.split_samples
+                        and self.last_voice_index - self.start_index >= self.min_split_samples):
+                    cut = self.last_voice_index + gap // 2
+                    ended = Segment(self.start_index, cut, self.onset_index, self.last_voice_index, final=False)
+                    self.start_index = cut
+                    self.onset_index = frame_start
+                self.last_voice_index = frame_end
+            elif (frame_end - self.last_voice_index >= self.silence_samples
+                  and frame_end - self.onset_index > self.min_samples):
+                self.in_speech = False
+                ended = Segment(self.start_index, frame_end, self.onset_index, self.last_voice_index)
+        return ended
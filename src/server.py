@@ -0,0 +1,547 @@
+import asyncio
+import base64
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import struct
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import colorama
+import numpy as np
+
+from src.audio_processor import AudioProcessor
+from src.capture_buffer import CaptureRing
+from src.el_client import CANCEL_POLL, OUTPUT_FORMAT, ElevenLabsClient
+from src.metrics import Timeline, metrics
+from src.pipeline import Utterance
+from src.segmenters import ManualSegmenter, VADSegmenter
+from src.settings.audio import AudioSettings
+from src.settings.network import NetworkSettings
+from src.settings.server import ServerSettings
+
+# Raw TCP framing: type (b"A" = PCM, b"J" = JSON event) and payload length, then the payload
+FRAME = struct.Struct("<cI")
+AUDIO, EVENT = b"A", b"J"
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_CONTINUATION, WS_TEXT, WS_BINARY, WS_CLOSE, WS_PING, WS_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class ProtocolError(Exception):
+    """The client sent something the server does not understand."""
+
+
+def parse_event(payload) -> dict:
+    """A JSON event from the client; anything but an object is a protocol error."""
+    event = json.loads(payload)
+    if not isinstance(event, dict):
+        raise ProtocolError("events must be JSON objects")
+    return event
+
+
+def ws_accept(key: str) -> str:
+    """Sec-WebSocket-Accept for a client's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    """XOR with the 4-byte masking key (applying it twice unmasks)."""
+    data = np.frombuffer(payload, dtype=np.uint8)
+    return (data ^ np.resize(np.frombuffer(key, dtype=np.uint8), len(data))).tobytes()
+
+
+def ws_frame(opcode: int, payload: bytes, mask=False) -> bytes:
+    """One unfragmented WebSocket frame. Clients must mask what they send, servers must not."""
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head = struct.pack(">BB", 0x80 | opcode, bit | n)
+    elif n < 1 << 16:
+        head = struct.pack(">BBH", 0x80 | opcode, bit | 126, n)
+    else:
+        head = struct.pack(">BBQ", 0x80 | opcode, bit | 127, n)
+    if mask:
+        key = os.urandom(4)
+        return head + key + _mask(payload, key)
+    return head + payload
+
+
+async def read_ws_frame(reader: asyncio.StreamReader, max_bytes: int):
+    """(fin, opcode, unmasked payload) of the next frame."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack(">Q", await reader.readexactly(8))[0]
+    if n > max_bytes:
+        raise ProtocolError(f"message of {n} bytes (limit {max_bytes})")
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    return bool(b0 & 0x80), b0 & 0x0F, _mask(payload, key) if key else payload
+
+
+class TCPTransport:
+    """Raw TCP: each message is a FRAME header and its payload, in both directions."""
+
+    def __init__(self, reader, writer, max_bytes: int, prefix=b""):
+        self.reader = reader
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self._prefix = prefix  # Bytes already read while telling TCP from WebSocket
+
+    async def _read(self, n: int) -> bytes:
+        head, self._prefix = self._prefix[:n], self._prefix[n:]
+        return head + await self.reader.readexactly(n - len(head)) if n > len(head) else head
+
+    async def receive(self):
+        """("audio", bytes) or ("event", dict); None once the client has closed its side."""
+        try:
+            kind, n = FRAME.unpack(await self._read(FRAME.size))
+            if n > self.max_bytes:
+                raise ProtocolError(f"message of {n} bytes (limit {self.max_bytes})")
+            payload = await self._read(n)
+        except asyncio.IncompleteReadError:
+            return None
+        if kind == AUDIO:
+            return "audio", payload
+        if kind == EVENT:
+            return "event", parse_event(payload)
+        raise ProtocolError(f"unknown message type {kind!r}")
+
+    async def send_audio(self, pcm: bytes):
+        await self._send(AUDIO, pcm)
+
+    async def send_event(self, event: dict):
+        await self._send(EVENT, json.dumps(event).encode())
+
+    async def _send(self, kind: bytes, payload: bytes):
+        self.writer.write(FRAME.pack(kind, len(payload)))
+        self.writer.write(payload)
+        # Back-pressure: waits while the client is not reading
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+
+class WebSocketTransport:
+    """RFC 6455 WebSocket without extensions: binary messages carry PCM, text messages JSON events."""
+
+    def __init__(self, reader, writer, max_bytes: int, mask=False):
+        self.reader = reader
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self.mask = mask  # Client side: frames sent are masked
+        self._closed = False
+
+    @classmethod
+    async def accept(cls, reader, writer, max_bytes: int, prefix=b""):
+        """Answer the HTTP upgrade request. Returns None (after a 400) if it is not one."""
+        request = prefix + await reader.readuntil(b"\r\n\r\n")
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return None
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n").encode())
+        await writer.drain()
+        return cls(reader, writer, max_bytes)
+
+    @classmethod
+    async def connect(cls, host: str, port: int, max_bytes=1 << 20, path="/"):
+        """Client side (load tests, Python clients): open a connection and upgrade it."""
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        response = await reader.readuntil(b"\r\n\r\n")
+        if b" 101 " not in response.split(b"\r\n", 1)[0] or ws_accept(key).encode() not in response:
+            writer.close()
+            raise ProtocolError("WebSocket upgrade refused")
+        return cls(reader, writer, max_bytes, mask=True)
+
+    async def receive(self):
+        """("audio", bytes) or ("event", dict); None once the client has closed the connection."""
+        parts, opcode, size = [], None, 0
+        while True:
+            try:
+                fin, op, payload = await read_ws_frame(self.reader, self.max_bytes)
+            except asyncio.IncompleteReadError:
+                return None
+            if op == WS_PING:
+                await self._send(WS_PONG, payload)
+                continue
+            if op == WS_PONG:
+                continue
+            if op == WS_CLOSE:
+                with contextlib.suppress(ConnectionError):
+                    await self._send(WS_CLOSE, payload[:2])
+                self._closed = True
+                return None
+            if op != WS_CONTINUATION:
+                opcode = op
+            size += len(payload)
+            if size > self.max_bytes:
+                raise ProtocolError(f"message over {self.max_bytes} bytes")
+            parts.append(payload)
+            if fin:
+                break
+        data = b"".join(parts)
+        if opcode == WS_TEXT:
+            return "event", parse_event(data)
+        return "audio", data
+
+    async def send_audio(self, pcm: bytes):
+        await self._send(WS_BINARY, pcm)
+
+    async def send_event(self, event: dict):
+        await self._send(WS_TEXT, json.dumps(event).encode())
+
+    async def _send(self, opcode: int, payload: bytes):
+        self.writer.write(ws_frame(opcode, payload, self.mask))
+        await self.writer.drain()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            with contextlib.suppress(Exception):
+                self.writer.write(ws_frame(WS_CLOSE, struct.pack(">H", 1000), self.mask))
+        self.writer.close()
+
+
+class Session:
+    """One connected client: its own voice, capture ring and VAD, and its converted utterances in order.
+
+    Incoming PCM (mono int16 at the hello's sample_rate) is cut into
+    utterances by a VAD exactly like the microphone is in VAD mode, or with
+    "vad": false only by the client's start and end events (push-to-talk). Each
+    utterance is converted on the server's worker threads and its response
+    streamed back between audio_start and audio_end events. At most
+    session_pending utterances wait to be sent; beyond that the client's
+    socket is not read, which pushes back on the client through TCP.
+    """
+
+    def __init__(self, server: "ConversionServer", transport, number: int, hello: dict):
+        self.server = server
+        self.transport = transport
+        self.number = number
+        self.voice_id = hello.get("voice_id") or server.client.voice_id
+        self.model_id = hello.get("model_id") or server.client.model_id
+        rate = int(hello.get("sample_rate") or server.settings.sample_rate)
+        if not 8000 <= rate <= 48000:
+            raise ProtocolError(f"unsupported sample_rate {rate}")
+        self.settings = AudioSettings.from_env(sample_rate=rate)
+        self.settings.channels = 1
+        self.settings.max_utterance_seconds = server.settings.max_utterance_seconds
+        self.processor = AudioProcessor(self.settings)
+        self.ring = CaptureRing(self.settings.capture_frames(), 1)
+        self.vad_enabled = hello.get("vad", True)
+        self.vad = VADSegmenter.from_settings(self.settings)
+        self.manual = ManualSegmenter()
+        self.block = self.vad.frame * 2  # Samples per VAD step, as for the microphone
+        self.max_samples = int(self.settings.max_utterance_seconds * rate)
+        self.limit = asyncio.Semaphore(server.settings.session_conversions)
+        self.pending = asyncio.Queue(maxsize=server.settings.session_pending)  # Waiting to be sent, in order
+        self.utterances = []  # Submitted and not yet sent
+        self.tasks = set()  # Running conversions, referenced so they are not garbage-collected
+        self.completed = 0
+        self._seq = itertools.count(1)
+        self._odd = b""  # Half a sample left over from the last message
+        self._scale = np.float32(1.0 / 32767)
+
+    async def run(self):
+        """Serve the client until it finishes (or goes away)."""
+        await self.transport.send_event({"type": "ready", "session": self.number, "voice_id": self.voice_id,
+                                         "model_id": self.model_id, "output_format": OUTPUT_FORMAT})
+        print(f"{colorama.Fore.CYAN}[Server] Session {self.number} started: voice {self.voice_id}, "
+              f"{self.settings.sample_rate}Hz{colorama.Style.RESET_ALL}")
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            while True:
+                message = await self.transport.receive()
+                if message is None:
+                    break
+                kind, payload = message
+                if kind == "audio":
+                    await self.feed(payload)
+                elif await self.control(payload):
+                    break
+            # Finished: convert what is left, send everything, then say goodbye
+            await self._end_speech()
+            await self.pending.put(None)
+            await sender
+            await self.transport.send_event({"type": "bye", "utterances": self.completed})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except (ProtocolError, ValueError) as e:
+            with contextlib.suppress(ConnectionError):
+                await self.transport.send_event({"type": "error", "message": str(e)})
+        finally:
+            sender.cancel()
+            for utterance in self.utterances:
+                utterance.cancelled.set()
+            for task in self.tasks:
+                task.cancel()
+            print(f"{colorama.Fore.CYAN}[Server] Session {self.number} closed after {self.completed} utterances"
+                  f"{colorama.Style.RESET_ALL}")
+
+    async def control(self, event: dict) -> bool:
+        """Handle a JSON event from the client. Returns True when the client is finished."""
+        kind = event.get("type")
+        if kind == "start":
+            # Speech starts now, whatever its level (with the VAD on, the next silence ends it)
+            if self.vad_enabled:
+                self.vad.force_start(self.ring.position)
+            else:
+                self.manual.begin(self.ring.position)
+        elif kind == "end":
+            await self._end_speech()
+        elif kind == "finish":
+            return True
+        else:
+            await self.transport.send_event({"type": "error", "message": f"unknown event {kind!r}"})
+        return False
+
+    async def _end_speech(self):
+        """End the current utterance now, if there is one, and queue it."""
+        if self.vad_enabled:
+            segment = self.vad.force_end(self.ring.position)
+        else:
+            segment = self.manual.end(self.ring.position)
+        if segment is not None and len(segment):
+            await self.submit(segment)
+
+    async def feed(self, pcm: bytes):
+        """Capture PCM from the client and run the VAD over it, one block at a time."""
+        if self._odd:
+            pcm = self._odd + pcm
+        usable = len(pcm) & ~1
+        self._odd = pcm[usable:]
+        samples = np.frombuffer(pcm, dtype="<i2", count=usable // 2)
+        if not self.vad_enabled:
+            self.ring.write(samples.reshape(-1, 1))
+            if self.manual.active and self.ring.position - self.manual.start_index >= self.max_samples:
+                await self._end_speech()  # Cut overlong speech before the ring wraps past its start
+            return
+        profile = self.processor.denoiser.profile if self.processor.denoiser is not None else None
+        for i in range(0, len(samples), self.block):
+            block = samples[i:i + self.block].reshape(-1, 1)
+            start = self.ring.write(block)
+            was_speaking = self.vad.in_speech
+            segment = self.vad.feed(block * self._scale, start)
+            if profile is not None and not was_speaking and not self.vad.in_speech:
+                profile.update(block[:, 0] * self._scale)
+            if not was_speaking and self.vad.in_speech:
+                await self.transport.send_event({"type": "speech_start", "onset_sample": self.vad.onset_index})
+            elif self.vad.in_speech and self.ring.position - self.vad.start_index >= self.max_samples:
+                # Cut overlong speech before the ring wraps past its start
+                segment = self.vad.force_end(self.ring.position)
+            if segment is not None:
+                await self.submit(segment)
+
+    async def submit(self, segment):
+        """Queue an utterance for conversion; waits (pausing input) while too many are waiting to be sent."""
+        utterance = Utterance(next(self._seq), self.ring.slice(segment.start, segment.end), self._timeline(segment))
+        # Filled from a conversion thread, drained by this session's sender
+        utterance.chunks = asyncio.Queue(maxsize=self.server.settings.send_queue)
+        await self.transport.send_event({"type": "queued", "seq": utterance.seq, "onset_sample": segment.onset,
+                                         "end_sample": segment.voice_end})
+        if self.pending.full():
+            print(f"{colorama.Fore.YELLOW}[Server] Session {self.number}: {self.pending.qsize()} utterances "
+                  f"waiting to be sent, pausing its input{colorama.Style.RESET_ALL}")
+        await self.pending.put(utterance)
+        self.utterances.append(utterance)
+        task = asyncio.create_task(self.server.convert(self, utterance))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _timeline(self, segment) -> Timeline:
+        """Timeline for a VAD cut, as the recorder makes for the microphone."""
+        timeline = Timeline()
+        timeline.mark("vad_decision")
+        behind = (self.ring.position - segment.voice_end) / self.settings.sample_rate
+        timeline.mark("speech_end", timeline.marks["vad_decision"] - behind)
+        timeline.set("session", self.number)
+        timeline.set("vad_onset_sample", segment.onset)
+        timeline.set("vad_offset_sample", segment.voice_end)
+        timeline.set("vad_cut_sample", segment.end)
+        return timeline
+
+    async def _send_loop(self):
+        """Stream converted utterances back in the order they were spoken."""
+        while True:
+            utterance = await self.pending.get()
+            if utterance is None:
+                return
+            timeline = utterance.timeline
+            await self.transport.send_event({"type": "audio_start", "seq": utterance.seq})
+            while True:
+                chunk = await utterance.chunks.get()
+                if chunk is None:
+                    break
+                if "first_audio" not in timeline.marks:
+                    timeline.mark("first_audio")  # Handed to the client rather than heard
+                await self.transport.send_audio(chunk)
+            timeline.mark("playback_end")
+            self.utterances.remove(utterance)
+            self.completed += 1
+            durations = timeline.durations()
+            await self.transport.send_event({
+                "type": "audio_end", "seq": utterance.seq,
+                "queue_ms": durations.get("queue"),
+                "time_to_first_byte_ms": durations.get("time_to_first_byte"),
+                "passthrough": "passthrough" in timeline.values,
+                "error": timeline.values.get("error"),
+            })
+            if "first_audio" in timeline.marks:
+                metrics.record(timeline)
+
+
+class ConversionServer:
+    """Headless conversion for many clients on one asyncio loop.
+
+    Clients connect over raw TCP or WebSocket on the same port (a request
+    starting with "GET " is a WebSocket upgrade). All sessions share one
+    ElevenLabsClient, so its connection pool, hedging, circuit breaker and
+    cache serve everyone. API calls are limited per session and globally;
+    the blocking conversions run on a worker thread per global slot.
+    """
+
+    def __init__(self, client: ElevenLabsClient, settings: ServerSettings):
+        self.client = client
+        self.settings = settings
+        self.sessions = set()
+        self.active = 0  # Conversions running now
+        self.waiting = 0  # Conversions waiting for a free slot
+        self.port = settings.port
+        self.limit = asyncio.Semaphore(settings.max_conversions)
+        self._numbers = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=settings.max_conversions, thread_name_prefix="convert")
+        self._server = None
+        audio = AudioSettings.from_env()
+        metrics.configure(jsonl_path=audio.metrics_jsonl, prometheus_path=audio.metrics_prometheus,
+                          window=audio.metrics_window)
+
+    @classmethod
+    def from_env(cls, host=None, port=None):
+        settings = ServerSettings.from_env()
+        settings.host = host or settings.host
+        settings.port = settings.port if port is None else port
+        network = NetworkSettings.from_env(convert_workers=settings.max_conversions)
+        # Room for a hedge next to every conversion
+        network.pool_size = max(network.pool_size, 2 * settings.max_conversions)
+        return cls(ElevenLabsClient.from_env(playback=False, network=network), settings)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.settings.host, self.settings.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.client.start_keepalive(lambda: bool(self.sessions))
+        print(f"{colorama.Fore.GREEN}[Server] Listening on {self.settings.host}:{self.port} (TCP and WebSocket), "
+              f"up to {self.settings.max_sessions} sessions and {self.settings.max_conversions} conversions at once"
+              f"{colorama.Style.RESET_ALL}")
+
+    async def run(self):
+        """Serve until cancelled (Ctrl+C)."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        for session in list(self.sessions):
+            session.transport.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+    async def _handle(self, reader, writer):
+        transport = None
+        try:
+            prefix = await reader.readexactly(4)
+            if prefix == b"GET ":
+                transport = await WebSocketTransport.accept(reader, writer, self.settings.max_message_bytes, prefix)
+            else:
+                transport = TCPTransport(reader, writer, self.settings.max_message_bytes, prefix)
+            if transport is None:
+                return
+            message = await transport.receive()
+            if message is None or message[0] != "event" or message[1].get("type") != "hello":
+                raise ProtocolError("the first message must be a hello event")
+            if len(self.sessions) >= self.settings.max_sessions:
+                raise ProtocolError(f"server full ({self.settings.max_sessions} sessions)")
+            session = Session(self, transport, next(self._numbers), message[1])
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        except (ProtocolError, ValueError) as e:
+            with contextlib.suppress(ConnectionError):
+                await transport.send_event({"type": "error", "message": str(e)})
+            transport.close()
+            return
+
+        self.sessions.add(session)
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+            transport.close()
+
+    async def convert(self, session: Session, utterance: Utterance):
+        """Convert one utterance once both the session's and the global limit have a free slot."""
+        loop = asyncio.get_running_loop()
+        async with session.limit:
+            self.waiting += 1
+            try:
+                await self.limit.acquire()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            try:
+                await loop.run_in_executor(self._executor, self._convert, session, utterance, loop)
+            finally:
+                self.active -= 1
+                self.limit.release()
+
+    def _convert(self, session: Session, utterance: Utterance, loop):
+        """Worker thread: encode and convert, handing chunks back to the event loop as they arrive."""
+        try:
+            if utterance.cancelled.is_set():
+                return
+            audio_stream = session.processor.get_audio_stream(utterance.audio, utterance.timeline)
+            utterance.audio = None
+            if audio_stream is None:
+                return
+            for chunk in self.client.stream_convert(audio_stream, utterance.timeline, utterance.cancelled,
+                                                    voice_id=session.voice_id, model_id=session.model_id):
+                if chunk and not self._deliver(loop, utterance, chunk):
+                    break
+        except Exception as e:
+            print(f"{colorama.Fore.RED}[Server] Session {session.number}: {type(e).__name__}: {e}{colorama.Style.RESET_ALL}")
+            traceback.print_exc()
+            utterance.timeline.set("error", f"{type(e).__name__}: {e}")
+        finally:
+            self._deliver(loop, utterance, None)
+
+    @staticmethod
+    def _deliver(loop, utterance: Utterance, chunk) -> bool:
+        """Queue a chunk for the session's sender; blocks (pausing the API stream) while the client is behind."""
+        future = asyncio.run_coroutine_threadsafe(utterance.chunks.put(chunk), loop)
+        while True:
+            try:
+                future.result(CANCEL_POLL)
+                return True
+            except TimeoutError:
+                if utterance.cancelled.is_set() or loop.is_closed():
+                    future.cancel()
+                    return False
@@ -1,20 +1,112 @@
 import os
 
 class AudioSettings:
-    def __init__(self, mode: int = 0, sample_rate=48000, channels=1, input_device=None):
+    def __init__(self, mode: int = 0, sample_rate=48000, channels=1, input_device=None,
+                 convert_workers=2, max_pending=4, max_utterance_seconds=120,
+                 trim_silence=True, trim_margin=0.1, trim_threshold_db=12.0,
+                 upload_format="wav", upload_sample_rate=None, stream_upload=False,
+                 denoise=False, denoise_strength=2.0, denoise_floor_db=-15.0,
+                 metrics_jsonl=None, metrics_prometheus=None, metrics_window=1000,
+                 vad_frame_ms=10.0, vad_onset_db=9.0, vad_offset_db=5.0, vad_min_level_db=-55.0,
+                 vad_max_flatness=0.45, vad_onset_ms=30.0, vad_calibration_seconds=1.0,
+                 vad_silence_duration=0.8, vad_min_duration=0.3, vad_pre_buffer=0.5,
+                 split_pause=0.0, split_min_seconds=2.0, split_crossfade_ms=15.0, barge_in="queue",
+                 jitter_buffer=True, jitter_min_ms=40.0, jitter_max_ms=1000.0,
+                 audio_input="sounddevice", audio_output="sounddevice", audio_pace=1.0):
         self.mode = mode
         self.sample_rate = sample_rate
         self.channels = channels
         self.input_device = input_device  # Device index or None for default
+        self.convert_workers = convert_workers  # Concurrent API conversions
+        self.max_pending = max_pending  # Utterances queued between capture and playback
+        self.max_utterance_seconds = max_utterance_seconds  # Capture history kept for cutting utterances
+        self.trim_silence = trim_silence  # Strip lead-in and silence tail before upload
+        self.trim_margin = trim_margin  # Seconds kept around detected speech
+        self.trim_threshold_db = trim_threshold_db  # Speech threshold above the utterance's noise floor
+        self.upload_format = upload_format  # wav, flac or opus
+        self.upload_sample_rate = upload_sample_rate or sample_rate  # Rate sent to the API
+        self.stream_upload = stream_upload  # Open the request at speech start and upload while speaking
+        self.denoise = denoise  # Local spectral noise suppression before upload
+        self.denoise_strength = denoise_strength  # Noise over-subtraction factor
+        self.denoise_floor_db = denoise_floor_db  # Most a frequency bin is attenuated
+        self.metrics_jsonl = metrics_jsonl  # Append one JSON line per utterance here
+        self.metrics_prometheus = metrics_prometheus  # Prometheus text-format file, rewritten per utterance
+        self.metrics_window = metrics_window  # Utterances kept for rolling percentiles
+        self.vad_frame_ms = vad_frame_ms  # VAD decision frame length
+        self.vad_onset_db = vad_onset_db  # Level above the noise floor that opens speech
+        self.vad_offset_db = vad_offset_db  # Lower level that keeps speech open (hysteresis)
+        self.vad_min_level_db = vad_min_level_db  # Absolute dBFS below which nothing is speech
+        self.vad_max_flatness = vad_max_flatness  # Spectral flatness above this is treated as noise
+        self.vad_onset_ms = vad_onset_ms  # Voiced run needed before speech starts
+        self.vad_calibration_seconds = vad_calibration_seconds  # Noise floor calibration at startup
+        self.vad_silence_duration = vad_silence_duration  # Hangover: silence that ends an utterance
+        self.vad_min_duration = vad_min_duration  # Shortest utterance the VAD will cut
+        self.vad_pre_buffer = vad_pre_buffer  # Seconds kept before the detected onset
+        self.split_pause = split_pause  # Pause that splits long speech into parts (0 = never split)
+        self.split_min_seconds = split_min_seconds  # Shortest part worth its own request
+        self.split_crossfade_ms = split_crossfade_ms  # Crossfade between converted parts
+        self.barge_in = barge_in  # New speech while earlier speech converts/plays: queue, replace or ignore
+        self.jitter_buffer = jitter_buffer  # Delay playback start by measured arrival rate (off = play at once)
+        self.jitter_min_ms = jitter_min_ms  # Smallest cushion kept on top of the projection
+        self.jitter_max_ms = jitter_max_ms  # Largest cushion after repeated underruns
+        self.audio_input = audio_input  # sounddevice, file:<raw pcm> or pipe:<fifo or ->
+        self.audio_output = audio_output  # sounddevice, pipe:<fifo or -> or null
+        self.audio_pace = audio_pace  # Clock of the file/pipe/null backends (1 = real time)
+
+    def capture_frames(self) -> int:
+        """Size of the preallocated capture ring, in frames."""
+        # Headroom so an utterance can still be read while the next one is captured
+        return int(self.max_utterance_seconds * self.sample_rate * 2)
+
+    def valid_upload_formats(self):
+        return ["wav", "flac", "opus"]
 
     def valid_modes(self):
         return [0, 1]
 
+    def valid_barge_in(self):
+        return ["queue", "replace", "ignore"]
+
     @classmethod
-    def from_env(cls, input_device=None):
+    def from_env(cls, input_device=None, sample_rate=None):
         return cls(
             mode=int(os.getenv("MODE", 0)),
-            sample_rate=int(os.getenv("SAMPLE_RATE", 48000)),
+            sample_rate=sample_rate or int(os.getenv("SAMPLE_RATE", 48000)),
             channels=int(os.getenv("CHANNELS", 1)),
-            input_device=input_device
+            input_device=input_device,
+            convert_workers=int(os.getenv("CONVERT_WORKERS", 2)),
+            max_pending=int(os.getenv("MAX_PENDING_UTTERANCES", 4)),
+            max_utterance_seconds=float(os.getenv("MAX_UTTERANCE_SECONDS", 120)),
+            trim_silence=os.getenv("TRIM_SILENCE", "1") == "1",
+            trim_margin=float(os.getenv("TRIM_MARGIN", 0.1)),
+            trim_threshold_db=float(os.getenv("TRIM_THRESHOLD_DB", 12.0)),
+            upload_format=os.getenv("UPLOAD_FORMAT", "wav").lower(),
+            upload_sample_rate=int(os.getenv("UPLOAD_SAMPLE_RATE", 0)) or None,
+            stream_upload=os.getenv("STREAM_UPLOAD", "0") == "1",
+            denoise=os.getenv("DENOISE", "0") == "1",
+            denoise_strength=float(os.getenv("DENOISE_STRENGTH", 2.0)),
+            denoise_floor_db=float(os.getenv("DENOISE_FLOOR_DB", -15.0)),
+            metrics_jsonl=os.getenv("METRICS_JSONL"),
+            metrics_prometheus=os.getenv("METRICS_PROMETHEUS"),
+            metrics_window=int(os.getenv("METRICS_WINDOW", 1000)),
+            vad_frame_ms=float(os.getenv("VAD_FRAME_MS", 10.0)),
+            vad_onset_db=float(os.getenv("VAD_ONSET_DB", 9.0)),
+            vad_offset_db=float(os.getenv("VAD_OFFSET_DB", 5.0)),
+            vad_min_level_db=float(os.getenv("VAD_MIN_LEVEL_DB", -55.0)),
+            vad_max_flatness=float(os.getenv("VAD_MAX_FLATNESS", 0.45)),
+            vad_onset_ms=float(os.getenv("VAD_ONSET_MS", 30.0)),
+            vad_calibration_seconds=float(os.getenv("VAD_CALIBRATION_SECONDS", 1.0)),
+            vad_silence_duration=float(os.getenv("VAD_SILENCE_DURATION", 0.8)),
+            vad_min_duration=float(os.getenv("VAD_MIN_DURATION", 0.3)),
+            vad_pre_buffer=float(os.getenv("VAD_PRE_BUFFER", 0.5)),
+            split_pause=float(os.getenv("SPLIT_PAUSE", 0.0)),
+            split_min_seconds=float(os.getenv("SPLIT_MIN_SECONDS", 2.0)),
+            split_crossfade_ms=float(os.getenv("SPLIT_CROSSFADE_MS", 15.0)),
+            barge_in=os.getenv("BARGE_IN", "queue").lower(),
+            jitter_buffer=os.getenv("JITTER_BUFFER", "1") == "1",
+            jitter_min_ms=float(os.getenv("JITTER_MIN_MS", 40.0)),
+            jitter_max_ms=float(os.getenv("JITTER_MAX_MS", 1000.0)),
+            audio_input=os.getenv("AUDIO_INPUT", "sounddevice"),
+            audio_output=os.getenv("AUDIO_OUTPUT", "sounddevice"),
+            audio_pace=float(os.getenv("AUDIO_PACE", 1.0))
         )
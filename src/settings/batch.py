@@ -0,0 +1,18 @@
+import os
+
+class BatchSettings:
+    def __init__(self, workers=4, output_dir="converted", manifest=None, pcm_rate=22050):
+        self.workers = workers  # Files converted at once (concurrent API requests)
+        self.output_dir = output_dir  # Converted WAV files go here, mirroring the input folders
+        self.manifest = manifest or os.path.join(output_dir, "manifest.jsonl")  # One JSON line per finished file
+        self.pcm_rate = pcm_rate  # Sample rate of headerless .pcm inputs (mono int16)
+
+    @classmethod
+    def from_env(cls, output_dir=None, manifest=None):
+        output_dir = output_dir or os.getenv("BATCH_OUTPUT_DIR", "converted")
+        return cls(
+            workers=int(os.getenv("BATCH_WORKERS", 4)),
+            output_dir=output_dir,
+            manifest=manifest or os.getenv("BATCH_MANIFEST") or None,
+            pcm_rate=int(os.getenv("BATCH_PCM_RATE", 22050))
+        )
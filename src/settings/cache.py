@@ -0,0 +1,16 @@
+import os
+
+class CacheSettings:
+    def __init__(self, directory=None, max_mb=500.0, live=False):
+        # Converted audio cache, next to recordings/
+        self.directory = directory or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "cache")
+        self.max_mb = max_mb  # Disk budget before least recently used entries are evicted (0 = cache off)
+        self.live = live  # Also look up and store microphone utterances, not just played/pre-rendered clips
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("CACHE_DIR") or None,
+            max_mb=float(os.getenv("CACHE_MAX_MB", 500)),
+            live=os.getenv("CACHE_LIVE", "0") == "1"
+        )
@@ -0,0 +1,24 @@
+import os
+
+class DebugSettings:
+    def __init__(self, enabled=True, directory=None, max_mb=200.0, retention_minutes=10.0,
+                 segment_mb=16.0, queue_size=32):
+        self.enabled = enabled  # Keep the converted audio of every utterance
+        # Archive of converted audio, inside recordings/ but apart from the replay corpus
+        self.directory = directory or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "recordings", "archive")
+        self.max_mb = max_mb  # Oldest segments are deleted beyond this total size
+        self.retention_minutes = retention_minutes  # ... and once they are this old
+        self.segment_mb = segment_mb  # A new segment file is started at this size
+        self.queue_size = queue_size  # Utterances waiting for the writer before new ones are dropped
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.getenv("DEBUG_RECORDINGS", "1") == "1",
+            directory=os.getenv("DEBUG_DIR") or None,
+            max_mb=float(os.getenv("DEBUG_MAX_MB", 200)),
+            retention_minutes=float(os.getenv("DEBUG_RETENTION_MINUTES", 10)),
+            segment_mb=float(os.getenv("DEBUG_SEGMENT_MB", 16)),
+            queue_size=int(os.getenv("DEBUG_QUEUE_SIZE", 32))
+        )
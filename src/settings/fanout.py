@@ -0,0 +1,34 @@
+import os
+
+class FanoutSettings:
+    def __init__(self, voices=None, output="mix", workers=0):
+        self.voices = voices or []  # (voice_id, gain, output device name or None) per voice; empty = VOICE_ID only
+        self.output = output  # "mix": one stream with per-voice gain, "devices": each voice to its own output
+        self.workers = workers  # Voice requests in flight across utterances (0 = voices x CONVERT_WORKERS)
+
+    def valid_outputs(self):
+        return ["mix", "devices"]
+
+    def pool_workers(self, convert_workers: int) -> int:
+        return self.workers or len(self.voices) * convert_workers
+
+    @staticmethod
+    def parse_voices(text: str):
+        """'id1, id2:0.5, id3:0.8@CABLE-A Input' -> [(voice_id, gain, device name or None), ...]"""
+        voices = []
+        for entry in text.split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            entry, _, device = entry.partition("@")
+            voice_id, _, gain = entry.partition(":")
+            voices.append((voice_id.strip(), float(gain) if gain.strip() else 1.0, device.strip() or None))
+        return voices
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            voices=cls.parse_voices(os.getenv("FANOUT_VOICES", "")),
+            output=os.getenv("FANOUT_OUTPUT", "mix").strip().lower(),
+            workers=int(os.getenv("FANOUT_WORKERS", 0))
+        )
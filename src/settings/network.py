@@ -0,0 +1,48 @@
+import os
+
+class NetworkSettings:
+    def __init__(self, pool_size=8, keepalive_expiry=60.0, http2=True, preconnect=1, keepalive_interval=20.0,
+                 connect_timeout=3.0, first_byte_timeout=8.0, stream_timeout=10.0,
+                 hedge=True, hedge_percentile=95.0, hedge_min_ms=250.0, hedge_initial_ms=2000.0,
+                 retries=2, retry_backoff_ms=200.0,
+                 breaker_failures=3, breaker_reset_seconds=30.0, passthrough=True):
+        self.pool_size = pool_size  # Pooled connections to the API
+        self.keepalive_expiry = keepalive_expiry  # Seconds an idle pooled connection is kept
+        self.http2 = http2  # Use HTTP/2 when h2 is installed
+        self.preconnect = preconnect  # Connections opened at startup (0 = none)
+        self.keepalive_interval = keepalive_interval  # Idle seconds before a background probe (0 = off)
+        self.connect_timeout = connect_timeout  # TCP + TLS setup limit per request
+        self.first_byte_timeout = first_byte_timeout  # From request (or end of a live upload) to first byte
+        self.stream_timeout = stream_timeout  # Longest silence on the socket once a request is running
+        self.hedge = hedge  # Race a duplicate request when the first one is slow
+        self.hedge_percentile = hedge_percentile  # Hedge after this percentile of recent time to first byte
+        self.hedge_min_ms = hedge_min_ms  # Never hedge sooner than this
+        self.hedge_initial_ms = hedge_initial_ms  # Hedge delay until enough latencies have been seen
+        self.retries = retries  # Extra attempts when a request fails before its first byte
+        self.retry_backoff_ms = retry_backoff_ms  # Base of the jittered exponential backoff
+        self.breaker_failures = breaker_failures  # Consecutive failures that open the circuit
+        self.breaker_reset_seconds = breaker_reset_seconds  # Open time before a trial request
+        self.passthrough = passthrough  # Play the unconverted voice when conversion is unavailable
+
+    @classmethod
+    def from_env(cls, convert_workers=1):
+        return cls(
+            pool_size=int(os.getenv("HTTP_POOL_SIZE", 8)),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60)),
+            http2=os.getenv("HTTP2", "1") == "1",
+            # One connection per conversion worker
+            preconnect=convert_workers if os.getenv("HTTP_PRECONNECT", "1") == "1" else 0,
+            keepalive_interval=float(os.getenv("HTTP_KEEPALIVE_INTERVAL", 20)),
+            connect_timeout=float(os.getenv("CONNECT_TIMEOUT", 3.0)),
+            first_byte_timeout=float(os.getenv("FIRST_BYTE_TIMEOUT", 8.0)),
+            stream_timeout=float(os.getenv("STREAM_TIMEOUT", 10.0)),
+            hedge=os.getenv("HEDGE", "1") == "1",
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", 95)),
+            hedge_min_ms=float(os.getenv("HEDGE_MIN_MS", 250)),
+            hedge_initial_ms=float(os.getenv("HEDGE_INITIAL_MS", 2000)),
+            retries=int(os.getenv("RETRIES", 2)),
+            retry_backoff_ms=float(os.getenv("RETRY_BACKOFF_MS", 200)),
+            breaker_failures=int(os.getenv("BREAKER_FAILURES", 3)),
+            breaker_reset_seconds=float(os.getenv("BREAKER_RESET_SECONDS", 30)),
+            passthrough=os.getenv("PASSTHROUGH", "1") == "1"
+        )
@@ -0,0 +1,30 @@
+import os
+
+class ServerSettings:
+    def __init__(self, host="127.0.0.1", port=8765, max_sessions=32, max_conversions=8, session_conversions=1,
+                 session_pending=4, send_queue=64, sample_rate=16000, max_utterance_seconds=30.0,
+                 max_message_bytes=1 << 20):
+        self.host = host  # Interface to listen on (0.0.0.0 for every interface)
+        self.port = port  # One port for raw TCP and WebSocket clients
+        self.max_sessions = max_sessions  # Connected clients; more are turned away
+        self.max_conversions = max_conversions  # API requests in flight across all sessions
+        self.session_conversions = session_conversions  # API requests in flight per session
+        self.session_pending = session_pending  # Utterances a session may have waiting before its input is paused
+        self.send_queue = send_queue  # Response chunks held per utterance before its API stream is paused
+        self.sample_rate = sample_rate  # Input PCM rate when the client's hello does not give one
+        self.max_utterance_seconds = max_utterance_seconds  # Longer speech is cut (sizes each session's capture ring)
+        self.max_message_bytes = max_message_bytes  # Largest message a client may send
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            host=os.getenv("SERVER_HOST", "127.0.0.1"),
+            port=int(os.getenv("SERVER_PORT", 8765)),
+            max_sessions=int(os.getenv("SERVER_MAX_SESSIONS", 32)),
+            max_conversions=int(os.getenv("SERVER_MAX_CONVERSIONS", 8)),
+            session_conversions=int(os.getenv("SERVER_SESSION_CONVERSIONS", 1)),
+            session_pending=int(os.getenv("SERVER_SESSION_PENDING", 4)),
+            send_queue=int(os.getenv("SERVER_SEND_QUEUE", 64)),
+            sample_rate=int(os.getenv("SERVER_SAMPLE_RATE", 16000)),
+            max_utterance_seconds=float(os.getenv("SERVER_MAX_UTTERANCE_SECONDS", 30))
+        )
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class Stitcher:
+    """Joins the converted parts of a split utterance with a short equal-power crossfade.
+
+    The last `length` samples of each part are held back. If another part of
+    the same utterance follows, its first samples are faded against them;
+    otherwise they are released when the part ends.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        t = (np.arange(length, dtype=np.float32) + 0.5) / max(length, 1)
+        self._fade_in = np.sin(t * np.pi / 2).astype(np.float32)
+        self._fade_out = np.cos(t * np.pi / 2).astype(np.float32)
+        self._empty = np.zeros(0, dtype=np.float32)
+        self._buf = self._empty  # Current part's samples not yet written
+        self._join = None  # Tail of the previous part, waiting for this part's start
+
+    def reset(self):
+        """Forget any held tail, e.g. when playback is cancelled."""
+        self._buf = self._empty
+        self._join = None
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        """Return what can be written now, holding back the last length samples."""
+        if self.length == 0:
+            return samples
+        buf = np.concatenate([self._buf, samples])
+        if self._join is not None:
+            if len(buf) < self.length:
+                self._buf = buf
+                return self._empty
+            buf[:self.length] = self._join * self._fade_out + buf[:self.length] * self._fade_in
+            self._join = None
+        self._buf = buf[-self.length:]
+        return buf[:-self.length]
+
+    def end_part(self, continues: bool) -> np.ndarray:
+        """Finish the current part. Returns the samples to write now (nothing if it continues)."""
+        if self.length == 0:
+            return self._empty
+        buf, self._buf = self._buf, self._empty  # Never longer than length
+        if self._join is not None:
+            # The part was shorter than the fade: mix it into the previous tail
+            tail = self._join * self._fade_out
+            tail[:len(buf)] += buf * self._fade_in[:len(buf)]
+            buf, self._join = tail, None
+        if continues and len(buf):
+            self._join = np.zeros(self.length, dtype=np.float32)
+            self._join[self.length - len(buf):] = buf
+            return self._empty
+        return buf
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class VADEngine:
+    """Frame-based voice activity decisions with an adaptive noise floor.
+
+    Features are computed for a whole block of frames at once: level in dBFS,
+    zero-crossing rate and spectral flatness. A frame opens speech when its
+    level is onset_db above the noise floor and its spectrum is not noise-flat.
+    Once in speech the bar drops to offset_db (hysteresis), and fricatives are
+    accepted through their high zero-crossing rate. The floor is calibrated
+    from the first calibration_seconds of input and then follows non-speech
+    frames, falling quickly and rising slowly.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms=10.0, onset_db=9.0, offset_db=5.0, min_level_db=-55.0,
+                 max_flatness=0.45, fricative_zcr=0.25, calibration_seconds=1.0,
+                 floor_rise=0.02, floor_fall=0.2):
+        self.sample_rate = sample_rate
+        self.frame = max(1, int(sample_rate * frame_ms / 1000))
+        self.onset_db = onset_db
+        self.offset_db = offset_db
+        self.min_level_db = min_level_db
+        self.max_flatness = max_flatness
+        self.fricative_zcr = fricative_zcr
+        self.calibration_frames = int(calibration_seconds * sample_rate / self.frame)
+        self.floor_rise = floor_rise
+        self.floor_fall = floor_fall
+        self._window = np.hanning(self.frame).astype(np.float32)
+        self.recalibrate()
+
+    def recalibrate(self):
+        self.noise_floor_db = min(-70.0, self.min_level_db)
+        self._calibration = [] if self.calibration_frames else None
+
+    @property
+    def calibrated(self) -> bool:
+        return self._calibration is None
+
+    def features(self, frames: np.ndarray):
+        """(level dB, zero-crossing rate, spectral flatness) for each row of frames."""
+        power = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        level_db = 10 * np.log10(power + 1e-12)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1)[:, 1:]) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+        return level_db, zcr, flatness
+
+    def decide(self, level_db: float, zcr: float, flatness: float, in_speech: bool) -> bool:
+        """Is this frame speech? Non-speech frames also move the noise floor."""
+        if self._calibration is not None:
+            self._calibration.append(level_db)
+            if len(self._calibration) >= self.calibration_frames:
+                self.noise_floor_db = max(float(np.median(self._calibration)), -90.0)
+                self._calibration = None
+            return False
+
+        if in_speech:
+            voiced = level_db > max(self.noise_floor_db + self.offset_db, self.min_level_db) and (
+                flatness < self.max_flatness or zcr > self.fricative_zcr)
+        else:
+            voiced = level_db > max(self.noise_floor_db + self.onset_db, self.min_level_db) and (
+                flatness < self.max_flatness)
+
+        if not voiced and not in_speech:
+            rate = self.floor_fall if level_db < self.noise_floor_db else self.floor_rise
+            self.noise_floor_db += rate * (level_db - self.noise_floor_db)
+        return voiced